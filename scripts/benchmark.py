@@ -0,0 +1,204 @@
+import argparse
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+import sys
+
+import pandas as pd
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src import engine
+from src.charts import CHARTS, build_chart, build_country_map
+from src.dataset import Snapshot
+from src.engine import FilterSpec, filter_mask
+from src.helpers import add_decade_column
+from src.prepare import prepare_movies
+from src.search import SearchIndex
+from src.synthetic import SIZES, synthetic_file, write_movies
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+BENCHMARK_DIR = ROOT_DIR / "data" / "benchmarks"
+BASELINE_FILE = BENCHMARK_DIR / "baseline.json"
+
+# A benchmark regresses when it is slower (or uses more memory) than its baseline by more
+# than the tolerance AND by more than these absolute margins, which absorb timer noise
+MIN_REGRESSION_MS = 5.0
+MIN_REGRESSION_MB = 1.0
+
+# One filter per sidebar control, with values present in the synthetic data
+SIDEBAR_FILTERS = {
+    "country": FilterSpec(countries=("France", "Italy")),
+    "usa": FilterSpec(usa="Non-USA"),
+    "decade": FilterSpec(decades=("1990s", "2000s")),
+    "language": FilterSpec(languages=("French",)),
+    "english": FilterSpec(english="Non-English"),
+    "genre": FilterSpec(genres=("Drama", "Crime")),
+    "search": FilterSpec(search="kurosawa"),
+}
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+
+def benchmarks(path):
+    """
+    (name, stage, function) of every step of the dashboard pipeline, in order.
+
+    Later steps use the results of earlier ones, so each function stores what the next
+    steps need in `state`.
+    """
+    state = {}
+
+    def load():
+        state["raw"] = pd.read_csv(path)
+
+    def prepare():
+        state["df"] = prepare_movies(state["raw"])
+
+    def snapshot():
+        state["snapshot"] = Snapshot(state["df"], version="benchmark")
+        # charts are counted under a filter, since the unfiltered counts are precomputed
+        state["mask"] = filter_mask(state["snapshot"], SIDEBAR_FILTERS["genre"])
+
+    steps = [
+        ("read_csv", "load", load),
+        ("add_decade_column", "prepare", lambda: add_decade_column(state["raw"])),
+        ("prepare_movies", "prepare", prepare),
+        ("snapshot indexes", "load", snapshot),
+        ("search index", "load", lambda: SearchIndex.build(state["snapshot"])),
+    ]
+    for name, spec in SIDEBAR_FILTERS.items():
+        steps.append((f"filter {name}", "filter", lambda spec=spec: filter_mask(state["snapshot"], spec)))
+    for key, chart in CHARTS.items():
+        steps.append((f"count {key}", "aggregate",
+                      lambda column=chart["column"]: engine.value_counts(state["snapshot"], column, state["mask"])))
+    columns = [chart["column"] for chart in CHARTS.values()]
+    steps.append(("count all charts", "aggregate",
+                  lambda: engine.value_counts_many(state["snapshot"], columns, state["mask"])))
+
+    top = {CHARTS[key]["column"]: CHARTS[key]["top_n"] for key in ("director", "actor", "screenwriter", "cinematographer")}
+
+    def toggle_genre():
+        # like a click in the sidebar: alternates between the genre filter and the same filter with
+        # one more genre, so every run after the first updates the counts of the previous one
+        if "counts" not in state:
+            state["counts"] = engine.IncrementalCounts()
+            state["wider"] = filter_mask(state["snapshot"], FilterSpec(genres=("Crime", "Drama", "Western")))
+            state["counts"].update(state["snapshot"], columns, state["mask"])
+        state["toggled"] = not state.get("toggled")
+        state["counts"].update(state["snapshot"], columns, state["wider"] if state["toggled"] else state["mask"], top=top)
+
+    steps.append(("count all charts (genre toggled)", "aggregate", toggle_genre))
+    for key in CHARTS:
+        steps.append((f"plot_bar {key}", "render", lambda key=key: build_chart(
+            key, engine.top_n(state["snapshot"], CHARTS[key]["column"], state["mask"], n=50))))
+    steps.append(("plot_map country", "render", lambda: build_country_map(
+        engine.value_counts(state["snapshot"], CHARTS["country"]["column"], state["mask"]))))
+    return steps
+
+
+def run(path, repeat=5, memory=True):
+    """Best time of `repeat` runs of every benchmark, and its peak traced memory (one extra run)."""
+    results = {}
+    for name, stage, func in benchmarks(path):
+        times = []
+        for _ in range(repeat):
+            # like timeit: no garbage collection pauses from earlier steps inside the timing
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                func()
+                times.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+        result = {"stage": stage, "ms": round(min(times) * 1000, 3)}
+
+        if memory:
+            # separate run: tracemalloc slows down every allocation
+            tracemalloc.start()
+            func()
+            result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+        results[name] = result
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """Names and descriptions of the benchmarks that are worse than their baseline."""
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["ms"] > base["ms"] * (1 + tolerance) and result["ms"] - base["ms"] > MIN_REGRESSION_MS:
+            found.append(f"{name}: {result['ms']:.1f} ms (baseline {base['ms']:.1f} ms)")
+        if ("peak_mb" in result and "peak_mb" in base and result["peak_mb"] > base["peak_mb"] * (1 + tolerance)
+                and result["peak_mb"] - base["peak_mb"] > MIN_REGRESSION_MB):
+            found.append(f"{name}: {result['peak_mb']:.1f} MB (baseline {base['peak_mb']:.1f} MB)")
+    return found
+
+# ============================================================
+# Run the benchmarks on synthetic data of every size
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time and memory-profile the dashboard pipeline on synthetic data.")
+    parser.add_argument("--size", nargs="+", default=["10k", "100k"], choices=list(SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the best one counts")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed slowdown vs baseline, 1.0 = twice as slow")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    all_results, failures = {}, []
+    for size in args.size:
+        path = synthetic_file(size, args.seed)
+        if not path.exists():
+            print(f"Generating {SIZES[size]} synthetic films → {path}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_movies(path, SIZES[size], seed=args.seed)
+
+        print(f"\n=== {size} films ===")
+        results = run(path, repeat=args.repeat, memory=not args.no_memory)
+        all_results[size] = results
+
+        table = pd.DataFrame.from_dict(results, orient="index")
+        base = baseline.get("results", {}).get(size, {})
+        if base:
+            table["baseline_ms"] = [base.get(name, {}).get("ms") for name in table.index]
+        print(table.to_string())
+        failures += [f"[{size}] {failure}" for failure in regressions(results, base, args.tolerance)]
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        saved = baseline.get("results", {})
+        saved.update(all_results)
+        args.baseline.write_text(json.dumps({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "machine": f"{platform.node()} ({platform.machine()}, Python {platform.python_version()})",
+            "seed": args.seed,
+            "results": saved,
+        }, indent=2), encoding="utf-8")
+        print(f"\n💾 Baseline saved → {args.baseline}")
+    elif not baseline:
+        print("\nNo baseline yet, store one with --save-baseline")
+
+    if failures:
+        print(f"\n❌ {len(failures)} regression(s) over {args.tolerance:.0%} of the baseline:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    if baseline and not args.save_baseline:
+        print("\n✅ No regressions")
@@ -0,0 +1,97 @@
+import argparse
+import os
+from pathlib import Path
+import sys
+import time
+
+import pandas as pd
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src import metrics
+from src.config import CACHE_DIR, ensure_cache_dir
+from src.library import USERS_DIR, user_movie_files
+from src.staged_fetch import (BATCH_SIZE, IO_WORKERS, PARSE_WORKERS, PAYLOAD_DIR, QUEUE_SIZE, disk_source,
+                              http_source, run_staged, stored_payload_ids)
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+MOVIES_CSV = ROOT_DIR / "data" / "raw" / "sample_movies.csv"
+TMDB_DATA_FILE = CACHE_DIR / "tmdb_data.csv"
+
+# ============================================================
+# Fetch TMDb metadata at high concurrency, or rebuild the cache from stored payloads
+# ============================================================
+parser = argparse.ArgumentParser(
+    description="Fetch missing TMDb metadata with a staged pipeline (I/O threads, parser processes, one writer).")
+parser.add_argument("--movies", type=Path, nargs="+", default=[MOVIES_CSV], help="movie lists with a tmdb_id column")
+parser.add_argument("--users", action="store_true",
+                    help=f"also fetch the films of every user's movie list in {USERS_DIR.relative_to(ROOT_DIR)}")
+parser.add_argument("--from-payloads", action="store_true",
+                    help="rebuild the cache from the payloads stored in --payload-dir instead of fetching")
+parser.add_argument("--save-payloads", action="store_true",
+                    help="store every fetched response in --payload-dir, to rebuild the cache later")
+parser.add_argument("--payload-dir", type=Path, default=PAYLOAD_DIR, help="folder of raw /movie/{id} responses")
+parser.add_argument("--out", type=Path, default=TMDB_DATA_FILE, help="TMDb cache file")
+parser.add_argument("--io-workers", type=int, default=IO_WORKERS, help="concurrent requests (or file reads)")
+parser.add_argument("--max-concurrency", type=int, default=None,
+                    help="most requests in flight; the actual number adapts to 429s, errors and latency")
+parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS, help="parser processes")
+parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="payloads parsed and written at once")
+parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                    help="payloads waiting for a parser before the I/O workers pause")
+parser.add_argument("--metrics-port", type=int, default=None,
+                    help="serve Prometheus metrics on http://127.0.0.1:<port>/metrics while running")
+parser.add_argument("--metrics-file", type=Path, default=None,
+                    help="write Prometheus metrics to this .prom file at the end")
+
+# the parser processes import this script again (spawn): only run it in the main process
+if __name__ == "__main__":
+    args = parser.parse_args()
+    ensure_cache_dir()
+    if args.metrics_port is not None or args.metrics_file is not None:
+        metrics.enable()
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+        print(f"Serving metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+    start = time.time()
+    options = dict(io_workers=args.io_workers, parse_workers=args.parse_workers,
+                   batch_size=args.batch_size, queue_size=args.queue_size)
+
+    if args.from_payloads:
+        tmdb_ids = stored_payload_ids(args.payload_dir)
+        print(f"📦 Rebuilding {args.out} from {len(tmdb_ids)} payloads in {args.payload_dir}")
+        # build next to the cache and swap it in at the end, so readers never see a partial cache
+        tmp = args.out.with_name(args.out.name + ".rebuild.tmp")
+        tmp.unlink(missing_ok=True)
+        summary = run_staged(tmdb_ids, disk_source(args.payload_dir), tmp, **options)
+        if tmp.exists():
+            os.replace(tmp, args.out)
+    else:
+        movie_files = args.movies + (user_movie_files() if args.users else [])
+        wanted = pd.concat([pd.read_csv(path, usecols=["tmdb_id"]) for path in movie_files], ignore_index=True)
+        wanted = pd.to_numeric(wanted["tmdb_id"], errors="coerce").dropna().astype(int).unique()
+        existing = set()
+        if args.out.exists():
+            existing = set(pd.read_csv(args.out, usecols=["tmdb_id"])["tmdb_id"].dropna().astype(int))
+        tmdb_ids = [int(v) for v in wanted if int(v) not in existing]
+        print(f"🌐 Fetching {len(tmdb_ids)} films missing from {args.out}")
+        if args.save_payloads:
+            args.payload_dir.mkdir(parents=True, exist_ok=True)
+        from src import tmdb_api
+
+        if args.max_concurrency:
+            tmdb_api.limiter.set_maximum(args.max_concurrency)
+        tmdb_api.limiter.on_decision = lambda decision, window, reason: print(
+            f"{'⬆️' if decision == 'increase' else '⬇️'} {window} requests in flight ({reason})")
+        source = http_source(args.payload_dir if args.save_payloads else None)
+        summary = run_staged(tmdb_ids, source, args.out, **options)
+        print(f"🚦 Limiter: {tmdb_api.limiter.summary()}")
+
+    elapsed = time.time() - start
+    print(f"✅ {summary} in {elapsed:.1f} s")
+    if args.metrics_file:
+        metrics.write_textfile(args.metrics_file)
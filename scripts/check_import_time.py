@@ -0,0 +1,87 @@
+import argparse
+import os
+import subprocess
+from pathlib import Path
+import sys
+
+# Root folder, imports are run from here
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# -----------------------------
+# Import budgets
+# -----------------------------
+# Maximum cumulative import time per module in milliseconds (cold interpreter, no .env needed).
+# Most modules are bound by pandas itself; the budgets catch new slow imports on top of it.
+BUDGETS_MS = {
+    "src.config": 50,
+    "src.tmdb_api": 400,
+    "src.check_cache": 1500,
+    "src.helpers": 1500,
+    "src.graphs": 1500,
+    "src.charts": 1500,
+    "src.dataset": 1500,
+    "src.engine": 1500,
+    "src.dashboard": 3000,
+}
+
+# Heavy or side-effecting modules that must only be imported when first used
+FORBIDDEN = {
+    "src.config": ["dotenv"],
+    "src.tmdb_api": ["dotenv", "prometheus_client"],
+    "src.check_cache": ["dotenv", "plotly.express", "pycountry"],
+    "src.helpers": ["pycountry", "plotly.express"],
+    "src.graphs": ["plotly.express"],
+    "src.charts": ["plotly.express"],
+    "src.dashboard": ["plotly.express", "pycountry", "dotenv"],
+}
+
+
+def measure(module):
+    """Import `module` in a fresh interpreter; return (cumulative ms, set of imported modules)."""
+    env = {k: v for k, v in os.environ.items() if k != "TMDB_API_KEY"}  # must import without a key
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    cumulative_us, imported = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        imported.add(name)
+        if name == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, imported
+
+# ============================================================
+# Check every module against its budget
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import time and lazy imports of the src modules.")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply budgets, e.g. 2 on slow machines")
+    args = parser.parse_args()
+
+    failures = 0
+    for module, budget in BUDGETS_MS.items():
+        try:
+            ms, imported = measure(module)
+        except RuntimeError as e:
+            print(f"❌ {module}: import failed: {e}")
+            failures += 1
+            continue
+
+        eager = [m for m in FORBIDDEN.get(module, []) if m in imported]
+        ok = ms <= budget * args.scale and not eager
+        failures += not ok
+        status = "✅" if ok else "❌"
+        note = f", imports {', '.join(eager)} eagerly" if eager else ""
+        print(f"{status} {module}: {ms:.0f} ms (budget {budget * args.scale:.0f} ms){note}")
+
+    if failures:
+        print(f"\n{failures} module(s) over budget")
+        sys.exit(1)
+    print("\nAll modules within budget")
@@ -0,0 +1,36 @@
+import argparse
+import time
+from pathlib import Path
+import sys
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.dataset import MOVIE_DATA_FILE, load_snapshot
+from src.export import EXPORT_DIR, default_presets, export_presets, load_presets
+
+# ============================================================
+# Export the dashboard charts for filter presets as static files
+# ============================================================
+parser = argparse.ArgumentParser(description="Render the dashboard charts for filter presets to static HTML/JSON.")
+parser.add_argument("--presets", type=Path, help="JSON file with presets (default: all, USA, English and per decade)")
+parser.add_argument("--out", type=Path, default=EXPORT_DIR, help="output folder")
+parser.add_argument("--force", action="store_true", help="render all presets, even unchanged ones")
+args = parser.parse_args()
+
+start_time = time.time()
+snapshot = load_snapshot(MOVIE_DATA_FILE)
+print(f"Loaded {len(snapshot)} movies (version {snapshot.version})")
+
+try:
+    presets = load_presets(args.presets) if args.presets else default_presets(snapshot)
+    rendered, skipped = export_presets(snapshot, presets, out_dir=args.out, force=args.force)
+except ValueError as e:  # e.g. two presets with the same folder
+    parser.error(str(e))
+
+elapsed = time.time() - start_time
+print(f"✅ Rendered {len(rendered)} presets, {len(skipped)} unchanged → {args.out}")
+if rendered:
+    print("Rendered:", ", ".join(rendered))
+print(f"Export finished in {elapsed:.2f} seconds")
@@ -0,0 +1,62 @@
+import argparse
+from pathlib import Path
+import sys
+
+import pandas as pd
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.dataset import MOVIE_DATA_FILE
+from src.posters import (ASSET_DIR, DOWNLOAD_RATE, DOWNLOAD_WORKERS, IMAGE_SIZES, MAX_CACHE_BYTES, AssetCache,
+                         download_assets, film_image_paths, load_image_paths, save_image_paths)
+
+# ============================================================
+# Download poster (and backdrop) thumbnails into the asset cache
+# ============================================================
+parser = argparse.ArgumentParser(description="Download TMDb posters as small WebP thumbnails for the dashboard.")
+parser.add_argument("--movies", type=Path, default=MOVIE_DATA_FILE, help="processed movie file")
+parser.add_argument("--backdrops", action="store_true", help="also download backdrops")
+parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="concurrent downloads")
+parser.add_argument("--rate", type=float, default=DOWNLOAD_RATE, help="maximum requests per second, 0 = unlimited")
+parser.add_argument("--max-mb", type=float, default=MAX_CACHE_BYTES / 2 ** 20,
+                    help="size of the thumbnail cache, least recently used thumbnails are deleted beyond it")
+parser.add_argument("--base-url", default=None,
+                    help="image server (default: $TMDB_IMAGE_BASE_URL or the TMDb CDN), e.g. a local stub server")
+parser.add_argument("--no-lookup", action="store_true",
+                    help="skip films without image paths instead of asking the TMDb API for them")
+args = parser.parse_args()
+
+columns = pd.read_csv(args.movies, nrows=0).columns
+path_columns = [spec["column"] for spec in IMAGE_SIZES.values() if spec["column"] in columns]
+df = pd.read_csv(args.movies, usecols=["tmdb_id"] + path_columns)
+cache = AssetCache(ASSET_DIR, max_bytes=int(args.max_mb * 2 ** 20))
+
+# films cached before search_movie kept image paths: look them up once and remember them
+image_paths = load_image_paths()
+
+
+def lookup(kind):
+    from src.tmdb_api import get_image_paths
+
+    def lookup_path(tmdb_id):
+        if tmdb_id not in image_paths:
+            image_paths[tmdb_id] = get_image_paths(tmdb_id)
+        return image_paths[tmdb_id][IMAGE_SIZES[kind]["column"]]
+    return None if args.no_lookup else lookup_path
+
+
+kinds = ["poster", "backdrop"] if args.backdrops else ["poster"]
+try:
+    for kind in kinds:
+        films = film_image_paths(df, kind)
+        print(f"🖼 {len(films)} {kind}s → {cache.root / kind}")
+        summary = download_assets(films, cache, kind, workers=args.workers, rate=args.rate,
+                                  base_url=args.base_url, lookup=lookup(kind))
+        print(f"✅ {kind}s: {summary}")
+finally:
+    if image_paths:
+        save_image_paths(image_paths)
+
+print(f"💾 Thumbnail cache: {cache.total_bytes / 2 ** 20:.1f} MB of {args.max_mb:g} MB")
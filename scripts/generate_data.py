@@ -0,0 +1,33 @@
+import argparse
+import time
+from pathlib import Path
+import sys
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.synthetic import SIZES, synthetic_file, write_movies
+
+# ============================================================
+# Generate synthetic TMDb caches for scale tests
+# ============================================================
+parser = argparse.ArgumentParser(description="Write deterministic synthetic TMDb metadata caches.")
+parser.add_argument("--size", nargs="+", default=["10k"], choices=list(SIZES),
+                    help="named sizes to generate (number of films)")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--out", type=Path, default=None,
+                    help="output CSV (only with a single size), default data/synthetic/tmdb_data_<size>_seed<seed>.csv")
+args = parser.parse_args()
+
+if args.out and len(args.size) > 1:
+    parser.error("--out can only be used with a single --size")
+
+for size in args.size:
+    path = args.out or synthetic_file(size, args.seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    start_time = time.time()
+    write_movies(path, SIZES[size], seed=args.seed, verbose=SIZES[size] > 100_000)
+    print(f"✅ {SIZES[size]} synthetic films in {time.time() - start_time:.1f} seconds → {path}")
+
+print("\nRun scripts/benchmark.py to time the dashboard pipeline on them.")
@@ -0,0 +1,47 @@
+import argparse
+import time
+from pathlib import Path
+import sys
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.importers import BATCH_SIZE, ID_CACHE_FILE, IMPORTED_MOVIES_FILE, IdCache, import_exports
+from src.library import USERS_DIR, partition_files, validate_user_id
+from src.pipeline import write_csv_atomic
+
+# ============================================================
+# Import Letterboxd / IMDb exports as a movie list
+# ============================================================
+parser = argparse.ArgumentParser(
+    description="Turn Letterboxd (watched.csv, diary.csv) and IMDb (ratings.csv) exports into a movie list."
+)
+parser.add_argument("files", nargs="+", type=Path, help="export CSV files")
+parser.add_argument("--out", type=Path, default=IMPORTED_MOVIES_FILE, help="movie list to write (title, year, tmdb_id)")
+parser.add_argument("--diary-out", type=Path, default=None,
+                    help="also write the viewings of Letterboxd diaries (watched_date, tmdb_id), e.g. data/raw/diary.csv")
+parser.add_argument("--user", default=None,
+                    help="import into this user's library instead (data/users/<user>/movies.csv and diary.csv)")
+parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="films resolved between two saves")
+parser.add_argument("--id-cache", type=Path, default=ID_CACHE_FILE)
+args = parser.parse_args()
+if args.user:
+    args.out, args.diary_out = partition_files(USERS_DIR / validate_user_id(args.user))
+
+start_time = time.time()
+movies, viewings, summary = import_exports(args.files, IdCache(args.id_cache), batch_size=args.batch_size)
+
+args.out.parent.mkdir(parents=True, exist_ok=True)
+write_csv_atomic(movies, args.out)
+print(f"\n✅ {len(movies)} films → {args.out}")
+if args.diary_out:
+    write_csv_atomic(viewings, args.diary_out)
+    # a user's diary is counted when the dashboard loads their library
+    hint = "" if args.user else " (run scripts/update_diary.py to count them)"
+    print(f"✅ {len(viewings)} viewings → {args.diary_out}{hint}")
+
+print(f"\nRows read: {summary['rows']}, distinct films: {summary['films']}")
+print(f"Resolved now: {summary['resolved_now']}, from earlier imports: {summary['films'] - summary['resolved_now'] - summary['errors']}")
+print(f"Not on TMDb: {summary['unmatched'] - summary['errors']}, lookup errors (retried next time): {summary['errors']}")
+print(f"Finished in {time.time() - start_time:.2f} seconds")
@@ -1,3 +1,4 @@
+import argparse
 import pandas as pd
 from pathlib import Path
 import sys
@@ -7,7 +8,11 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT_DIR))
 
 from src.config import CACHE_DIR
-from src.helpers import add_decade_column
+from src.arrow_snapshot import publish_snapshot
+from src.collab import COLLAB_FILE, build_collab_index, save_collab_index
+from src.pipeline import write_csv_atomic
+from src.prepare import PREPARE_WORKERS, prepare_movies, prepare_sharded
+from src.similar import SIMILAR_FILE, build_similar_index
 
 # Set the option to display all columns
 pd.set_option('display.max_columns', None)
@@ -22,55 +27,90 @@ OUTPUT_DIR = ROOT_DIR / "data" / "processed"
 
 TMDB_DATA_FILE = CACHE_DIR / "tmdb_data.csv"
 
-# ============================================================
-# STEP 1: Retrieve all TMDB data
-# ============================================================
-
-df = pd.read_csv(TMDB_DATA_FILE)
-
-print(f"\nTMDb metadata cache has {len(df)} movies")
-
-#print(df.info())
-#print(df.head())
-
-# ============================================================
-# STEP 2: Add extra columns and clean data
-# ============================================================
-print(f"\nAdding extra columns and cleaning data...")
-
-df = add_decade_column(df).copy()
-
-# Fix Jr. by removing the leading comma
-df['actors'] = df['actors'].str.replace(', Jr.', ' Jr.')
-
-# Add main production country (first country)
-df["main_country"] = df["production_countries"].str.split(", ").str[0]
-
-# Take the first language if multiple are listed
-df["main_language"] = df["spoken_languages"].str.split(", ").str[0]
-
-# inspect NAs
-#print(df.isna().sum())
-
-# actors
-#print(df[df['actors'].isna()])
-# All rows without actors seem correct, experimental or animation films
-
-# screenwriters
-#print(df[df['screenwriters'].isna()])
-# Mostly are documentaries
-
-# cinematographers
-#print(df[df['cinematographers'].isna()])
-# Mostly are documentaries
-
-# spoken_languages
-#print(df[df['spoken_languages'].isna()])
-# no spoken dialogue
-
-# ============================================================
-# STEP 3: Save final dataframe
-# ============================================================
-
-df.to_csv(OUTPUT_DIR / "final_movies.csv", index=False)
-print("\nFile update completed!")
\ No newline at end of file
+parser = argparse.ArgumentParser(description="Prepare the TMDb metadata cache for the dashboard and build its indexes.")
+parser.add_argument("--workers", type=int, default=1,
+                    help=f"processes preparing shards of the cache and scoring similar films (this machine: "
+                         f"{PREPARE_WORKERS}); with more than one the films are written sorted by tmdb_id")
+
+# the worker processes import this script again (spawn): only run it in the main process
+if __name__ == "__main__":
+    args = parser.parse_args()
+    final_file = OUTPUT_DIR / "final_movies.csv"
+
+    # ============================================================
+    # STEP 1: Retrieve all TMDB data
+    # ============================================================
+
+    df = pd.read_csv(TMDB_DATA_FILE)
+
+    print(f"\nTMDb metadata cache has {len(df)} movies")
+
+    #print(df.info())
+    #print(df.head())
+
+    # ============================================================
+    # STEP 2: Add extra columns and clean data
+    # STEP 3: Save final dataframe
+    # ============================================================
+    print(f"\nAdding extra columns and cleaning data...")
+
+    if args.workers > 1:
+        # shards of tmdb_ids prepared, written and indexed in parallel, then merged
+        prepared = prepare_sharded(df, final_file, workers=args.workers, verbose=True)
+        indexes = prepared.indexes
+        df = pd.DataFrame({"tmdb_id": prepared.tmdb_ids})
+        for column in ("genres", "directors", "actors"):
+            if column in indexes:
+                top = prepared.value_counts(column, top=1)
+                print(f"{column}: {len(indexes[column].labels)} values, most frequent {top.index[0]} ({top.iloc[0]})")
+    else:
+        indexes = None
+        df = prepare_movies(df)
+
+        # inspect NAs
+        #print(df.isna().sum())
+
+        # actors
+        #print(df[df['actors'].isna()])
+        # All rows without actors seem correct, experimental or animation films
+
+        # screenwriters
+        #print(df[df['screenwriters'].isna()])
+        # Mostly are documentaries
+
+        # cinematographers
+        #print(df[df['cinematographers'].isna()])
+        # Mostly are documentaries
+
+        # spoken_languages
+        #print(df[df['spoken_languages'].isna()])
+        # no spoken dialogue
+
+        # atomically: a running dashboard keeps its current version until the new file is complete
+        write_csv_atomic(df, final_file)
+
+    # ============================================================
+    # STEP 4: Build collaboration index (director <-> actor, ...)
+    # ============================================================
+    print(f"\nBuilding collaboration index...")
+    collab_pairs = build_collab_index(df, indexes)
+    save_collab_index(collab_pairs, df["tmdb_id"], COLLAB_FILE)
+    for name, pair in collab_pairs.items():
+        print(f"{name}: {len(pair.pair_a)} distinct pairs")
+
+    # ============================================================
+    # STEP 5: Precompute similar films ("more like this")
+    # ============================================================
+    print(f"\nPrecomputing similar films...")
+    similar_index = build_similar_index(df, verbose=True, workers=args.workers, indexes=indexes)
+    similar_index.save(SIMILAR_FILE)
+    print(f"Stored {similar_index.neighbours.shape[1]} similar films for {len(df)} movies")
+
+    # ============================================================
+    # STEP 6: Publish the Arrow snapshot the dashboard workers map
+    # ============================================================
+    print(f"\nPublishing Arrow snapshot...")
+    snapshot_dir = publish_snapshot(final_file, similar=similar_index, indexes=indexes)
+    print(f"Published version {snapshot_dir.name} → {snapshot_dir}")
+
+    print("\nFile update completed!")
\ No newline at end of file
@@ -0,0 +1,25 @@
+import argparse
+from pathlib import Path
+import sys
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.api import DEFAULT_HOST, DEFAULT_PORT, make_server
+
+# ============================================================
+# Serve the dashboard aggregations as a local JSON API
+# ============================================================
+parser = argparse.ArgumentParser(description="Serve the movie dashboard aggregations as a JSON API.")
+parser.add_argument("--host", default=DEFAULT_HOST)
+parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+args = parser.parse_args()
+
+server = make_server(args.host, args.port)
+print(f"Serving movie API on http://{args.host}:{args.port} (try /version or /top/actor?n=5)")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    print("\nServer stopped.")
+    server.server_close()
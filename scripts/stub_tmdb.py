@@ -0,0 +1,110 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================================
+# Local stand-in for the TMDb API with rate limiting, to try the fetch scripts without TMDb
+# ============================================================
+# Serves /movie/{id} (with credits) for any ID; start the fetch scripts with
+# TMDB_API_BASE_URL=http://127.0.0.1:<port> and any TMDB_API_KEY.
+parser = argparse.ArgumentParser(description="Serve fake TMDb /movie/{id} responses with TMDb-like rate limits.")
+parser.add_argument("--port", type=int, default=8010)
+parser.add_argument("--rate", type=float, default=40, help="requests per second before answering 429")
+parser.add_argument("--burst", type=int, default=20, help="requests allowed at once above the rate")
+parser.add_argument("--concurrency", type=int, default=16,
+                    help="requests handled at once; beyond it the latency grows with the queue")
+parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+args = parser.parse_args()
+
+MOVIE_PATH = re.compile(r"^/movie/(\d+)$")
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate, self.burst = rate, burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """True if a request is allowed, else the seconds until the next one is."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return (1 - self.tokens) / self.rate
+
+
+bucket = TokenBucket(args.rate, args.burst)
+workers = threading.Semaphore(args.concurrency)
+stats = {"ok": 0, "throttled": 0, "errors": 0}
+stats_lock = threading.Lock()
+
+
+def movie(tmdb_id):
+    rng = random.Random(tmdb_id)
+    return {
+        "id": tmdb_id, "title": f"Stub Film {tmdb_id}", "release_date": f"{rng.randint(1950, 2024)}-01-01",
+        "runtime": rng.randint(70, 180), "genres": [{"id": 18, "name": "Drama"}],
+        "spoken_languages": [{"english_name": "English"}],
+        "production_countries": [{"iso_3166_1": "US", "name": "United States of America"}],
+        "poster_path": f"/stub{tmdb_id}.jpg", "backdrop_path": None,
+        "credits": {"cast": [{"name": f"Actor {rng.randint(1, 500)}"} for _ in range(10)],
+                    "crew": [{"name": f"Director {rng.randint(1, 100)}", "job": "Director"}]},
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = MOVIE_PATH.match(self.path.split("?")[0])
+        if not match:
+            return self.reply(404, {"status_code": 34, "status_message": "Not found"})
+        allowed = bucket.take()
+        if allowed is not True:
+            return self.reply(429, {"status_code": 25, "status_message": "Rate limit exceeded"},
+                              {"Retry-After": f"{allowed:.2f}"}, "throttled")
+        with workers:  # beyond --concurrency requests wait here, like an overloaded server
+            time.sleep(args.latency)
+        if random.random() < args.error_rate:
+            return self.reply(503, {"status_message": "Service unavailable"}, stats_key="errors")
+        self.reply(200, movie(int(match.group(1))))
+
+    def reply(self, status, body, headers=None, stats_key="ok"):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        if status != 404:
+            with stats_lock:
+                stats[stats_key] += 1
+
+    def log_message(self, *_):
+        pass
+
+
+def report():
+    while True:
+        time.sleep(5)
+        with stats_lock:
+            print(f"📊 {stats}")
+
+
+server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+threading.Thread(target=report, daemon=True).start()
+print(f"Stub TMDb API on http://127.0.0.1:{args.port} ({args.rate:g} requests/s, burst {args.burst})")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
@@ -0,0 +1,36 @@
+import argparse
+import time
+from pathlib import Path
+import sys
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.dataset import MOVIE_DATA_FILE
+from src.sketch import CAPACITY, CHUNKSIZE, EPSILON, stream_top_people
+
+# ============================================================
+# Top people of a large movie CSV in bounded memory
+# ============================================================
+parser = argparse.ArgumentParser(description="Most frequent people of a movie CSV, using streaming sketches.")
+parser.add_argument("--file", type=Path, default=MOVIE_DATA_FILE, help="CSV with a comma-separated people column")
+parser.add_argument("--column", default="actors", help="actors, directors, screenwriters or cinematographers")
+parser.add_argument("--top", type=int, default=10)
+parser.add_argument("--workers", type=int, default=1, help="processes that sketch chunks in parallel")
+parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+parser.add_argument("--capacity", type=int, default=CAPACITY, help="candidates tracked next to the sketch")
+parser.add_argument("--epsilon", type=float, default=EPSILON, help="maximum overcount as share of all entries")
+parser.add_argument("--approximate", action="store_true", help="skip the exact recount of the candidates")
+args = parser.parse_args()
+
+start_time = time.time()
+top = stream_top_people(
+    args.file, args.column, top_n=args.top, exact=not args.approximate, workers=args.workers,
+    chunksize=args.chunksize, capacity=args.capacity, epsilon=args.epsilon,
+)
+elapsed = time.time() - start_time
+
+print(f"Top {args.top} {args.column} ({'approximate' if args.approximate else 'exact'}):")
+print(top.to_string())
+print(f"\nFinished in {elapsed:.2f} seconds")
@@ -1,3 +1,4 @@
+import argparse
 import pandas as pd
 import json
 import requests
@@ -12,8 +13,11 @@ import sys
 ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT_DIR))
 
+from src import metrics
 from src.tmdb_api import search_movie
-from src.config import CACHE_DIR
+from src.config import CACHE_DIR, ensure_cache_dir
+from src.library import USERS_DIR, user_movie_files
+from src.pipeline import write_csv_atomic
 
 # -----------------------------
 # Constants / Default paths
@@ -23,11 +27,35 @@ DATA_DIR = ROOT_DIR / "data" / "raw"
 
 MOVIES_CSV = DATA_DIR / "sample_movies.csv"
 TMDB_DATA_FILE = CACHE_DIR / "tmdb_data.csv"
+ensure_cache_dir()
+
+# -----------------------------
+# Metrics (optional)
+# -----------------------------
+parser = argparse.ArgumentParser(description="Fetch missing TMDb metadata into the cache.")
+parser.add_argument("--movies", type=Path, nargs="+", default=[MOVIES_CSV],
+                    help="movie lists with a tmdb_id column, e.g. data/raw/imported_movies.csv")
+parser.add_argument("--users", action="store_true",
+                    help=f"also fetch the films of every user's movie list in {USERS_DIR.relative_to(ROOT_DIR)}")
+parser.add_argument("--metrics-port", type=int, default=None,
+                    help="serve Prometheus metrics on http://127.0.0.1:<port>/metrics while running")
+parser.add_argument("--metrics-file", type=Path, default=None,
+                    help="write Prometheus metrics to this .prom file (node_exporter textfile collector)")
+args = parser.parse_args()
+
+if args.metrics_port is not None or args.metrics_file is not None:
+    metrics.enable()
+if args.metrics_port is not None:
+    metrics.serve(args.metrics_port)
+    print(f"Serving metrics on http://127.0.0.1:{args.metrics_port}/metrics")
 
 # ============================================================
 # STEP 1: Load Sample Data
 # ============================================================
-movies_df = pd.read_csv(MOVIES_CSV)
+# films shared by several lists (or users) are fetched once
+movie_files = args.movies + (user_movie_files() if args.users else [])
+movies_df = pd.concat([pd.read_csv(path) for path in movie_files], ignore_index=True)
+movies_df = movies_df.dropna(subset=["tmdb_id"]).drop_duplicates(subset=["tmdb_id"])
 print(f"Loaded {len(movies_df)} sample movies:")
 print(movies_df.head())
 
@@ -50,6 +78,7 @@ else:
 remaining_ids = [int(v) for v in movies_df["tmdb_id"] if int(v) not in existing_ids]
 total_missing_metadata = len(remaining_ids)
 print(f"Total films missing metadata: {total_missing_metadata}\n")
+metrics.set_remaining(total_missing_metadata)
 
 # Initialize counters (reuse same logic)
 found_count = 0
@@ -62,8 +91,10 @@ for tmdb_id in tqdm(remaining_ids, desc="Fetching TMDb metadata"):
     if movie_data:
         new_records.append(movie_data)
         found_count += 1
+        metrics.count_film("found", remaining=total_missing_metadata - found_count)
     else:
         not_found_count += 1
+        metrics.count_film("failed")
         print(f"⚠️ Skipped TMDb ID {tmdb_id} (no data or error)")
 
     # Save progress every 50
@@ -72,14 +103,17 @@ for tmdb_id in tqdm(remaining_ids, desc="Fetching TMDb metadata"):
         new_df = pd.DataFrame(new_records)
         if not existing_df.empty:
             combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-            combined_df.drop_duplicates(subset=["tmdb_id"], inplace=True)
+            combined_df.drop_duplicates(subset=["tmdb_id"], keep="last", inplace=True)
         else:
             combined_df = new_df
-        combined_df.to_csv(TMDB_DATA_FILE, index=False)
+        with metrics.checkpoint_timer():
+            write_csv_atomic(combined_df, TMDB_DATA_FILE)
         print(f"💾 Saved progress after {(found_count + not_found_count)} films")
         # update in-memory existing_df and clear new_records
         existing_df = combined_df
         new_records.clear()
+        if args.metrics_file:
+            metrics.write_textfile(args.metrics_file)
     time.sleep(uniform(2.5, 5))  # random delay between requests
 
 # final: if any remaining new_records: Merge and save
@@ -91,8 +125,9 @@ if new_records:
     else:
         combined_df = new_df
 
-    combined_df.drop_duplicates(subset=["tmdb_id"], inplace=True)
-    combined_df.to_csv(TMDB_DATA_FILE, index=False)
+    combined_df.drop_duplicates(subset=["tmdb_id"], keep="last", inplace=True)
+    with metrics.checkpoint_timer():
+        write_csv_atomic(combined_df, TMDB_DATA_FILE)
     print(f"✅ Saved {len(new_records)} new entries (total {len(combined_df)}) → {TMDB_DATA_FILE}")
 else:
     print("✅ No new metadata to fetch — all up to date.")
@@ -104,6 +139,9 @@ print(f"Total films processed: {found_count + not_found_count}")
 print(f"✅ Metadata fetched: {found_count}")
 print(f"❌ Failed fetches: {not_found_count}")
 print(f"Remaining missing metadata: {total_missing_metadata - found_count}")
+if args.metrics_file:
+    metrics.write_textfile(args.metrics_file)
+    print(f"Metrics written to {args.metrics_file}")
 
 # -----------------------------
 # Inspect TMDb metadata cache
@@ -0,0 +1,30 @@
+import time
+from pathlib import Path
+import sys
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.diary import DIARY_FILE, GRAINS, ROLLUP_FILE, update_rollups
+
+# ============================================================
+# Count new diary entries into the watch-over-time rollups
+# ============================================================
+if not DIARY_FILE.exists():
+    print(f"Diary file not found: {DIARY_FILE}")
+    print("It needs the columns 'watched_date' and 'tmdb_id', one row per viewing.")
+    sys.exit(1)
+
+start_time = time.time()
+state = update_rollups()
+elapsed = time.time() - start_time
+
+print(f"✅ Diary rollups updated in {elapsed:.2f} seconds → {ROLLUP_FILE}")
+print(f"Total watch events: {state['events']}")
+for grain in GRAINS:
+    print(f"{grain.capitalize()} buckets: {len(state['rollups'][grain])}")
+
+if state["unmatched_ids"]:
+    print(f"⚠️ {len(state['unmatched_ids'])} watched films are missing from the TMDb cache, "
+          f"add them to your movie list and run scripts/update_cache.py")
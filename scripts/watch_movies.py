@@ -0,0 +1,39 @@
+import argparse
+from pathlib import Path
+import sys
+
+# add project root to import path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.library import USERS_DIR
+from src.pipeline import RAW_DIR, WATCH_INTERVAL, MovieRefresher
+
+# ============================================================
+# Keep the cache and processed data in sync with the movie lists
+# ============================================================
+parser = argparse.ArgumentParser(
+    description="Watch the raw movie lists and fetch, prepare and publish only new or removed films."
+)
+parser.add_argument("--raw-dir", type=Path, default=RAW_DIR, help="folder with CSV movie lists (tmdb_id column)")
+parser.add_argument("--users-dir", type=Path, default=USERS_DIR,
+                    help="folder with one folder per user (<user>/movies.csv), their films are fetched once for all")
+parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="seconds between checks")
+parser.add_argument("--once", action="store_true", help="refresh once and exit")
+parser.add_argument("--similar", action="store_true",
+                    help="rebuild the similar films index after every refresh (slow for large libraries)")
+parser.add_argument("--similar-every", type=float, default=None, metavar="MINUTES",
+                    help="rebuild the similar films index at most every MINUTES once films changed")
+args = parser.parse_args()
+
+refresher = MovieRefresher(raw_dir=args.raw_dir, users_dir=args.users_dir, rebuild_similar=args.similar,
+                           similar_interval=args.similar_every * 60 if args.similar_every else None)
+if args.once:
+    print(f"✅ Refreshed: {refresher.refresh()}")
+    sys.exit(0)
+
+print(f"👀 Watching {args.raw_dir} and {args.users_dir} every {args.interval:g} seconds (Ctrl+C to stop)")
+try:
+    refresher.watch(interval=args.interval)
+except KeyboardInterrupt:
+    print("\nStopped watching.")
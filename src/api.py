@@ -0,0 +1,217 @@
+import hashlib
+import json
+import threading
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from src import engine
+from src.dataset import MOVIE_DATA_FILE, get_shared_dataset
+from src.engine import COUNT_COLUMNS, ROLE_COLUMNS, FilterSpec
+
+# -----------------------------
+# Constants
+# -----------------------------
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+
+# Number of responses kept in memory
+RESPONSE_CACHE_SIZE = 1024
+
+# Largest page size of /movies
+MAX_LIMIT = 1000
+
+# Query parameters besides the filters that change a response (the last value counts, except for columns)
+RESPONSE_PARAMS = ("n", "offset", "limit", "columns")
+
+# -----------------------------
+# Query handling
+# -----------------------------
+
+class ApiError(Exception):
+    """Request error returned to the client as JSON with an HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(query, name, default, minimum=0, maximum=None):
+    try:
+        value = int(query.get(name, [default])[-1])
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer")
+    if maximum is None and value < minimum:
+        raise ApiError(400, f"'{name}' must be >= {minimum}")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ApiError(400, f"'{name}' must be between {minimum} and {maximum}")
+    return value
+
+
+def handle_query(snapshot, path, query):
+    """
+    Answer one API request from a snapshot.
+
+    Endpoints:
+        /version                  data version and number of movies
+        /counts/<dimension>       films per year, decade, country, language or genre
+        /top/<role>?n=10          most frequent directors, actors, screenwriters or cinematographers
+        /movies?offset=0&limit=50 page of the filtered films
+
+    All endpoints except /version accept the dashboard filters as query parameters:
+    country, usa, decade, language, english and genre (list filters can be repeated),
+    and q to search titles and people.
+    """
+    parts = [p for p in path.split("/") if p]
+
+    if parts == ["version"]:
+        return {
+            "version": snapshot.version,
+            "movies": len(snapshot),
+            "loaded_at": snapshot.loaded_at.isoformat(timespec="seconds"),
+        }
+
+    try:
+        spec = FilterSpec.from_query(query)
+        mask = engine.filter_mask(snapshot, spec)
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+    if len(parts) == 2 and parts[0] == "counts":
+        if parts[1] not in COUNT_COLUMNS:
+            raise ApiError(404, f"Unknown dimension '{parts[1]}' (expected one of {list(COUNT_COLUMNS)})")
+        counts = engine.value_counts(snapshot, COUNT_COLUMNS[parts[1]], mask)
+        return {"version": snapshot.version, "total": int(mask.sum()), "counts": _records(counts)}
+
+    if len(parts) == 2 and parts[0] == "top":
+        if parts[1] not in ROLE_COLUMNS:
+            raise ApiError(404, f"Unknown role '{parts[1]}' (expected one of {list(ROLE_COLUMNS)})")
+        n = _int_param(query, "n", 10, minimum=1, maximum=MAX_LIMIT)
+        counts = engine.top_n(snapshot, ROLE_COLUMNS[parts[1]], mask, n)
+        return {"version": snapshot.version, "total": int(mask.sum()), "top": _records(counts)}
+
+    if parts == ["movies"]:
+        offset = _int_param(query, "offset", 0)
+        limit = _int_param(query, "limit", 50, minimum=1, maximum=MAX_LIMIT)
+        columns = [c for v in query.get("columns", []) for c in v.split(",") if c] or None
+        try:
+            page = engine.listing(snapshot, mask, columns=columns, offset=offset, limit=limit)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        return {
+            "version": snapshot.version,
+            "total": int(mask.sum()),
+            "offset": offset,
+            "movies": json.loads(page.to_json(orient="records")),
+        }
+
+    raise ApiError(404, f"Unknown endpoint '{path}'")
+
+
+def _records(counts):
+    """Turn a value_counts Series into a JSON-friendly list of {value, count}."""
+    return [
+        {"value": value.item() if hasattr(value, "item") else value, "count": int(count)}
+        for value, count in counts.items()
+    ]
+
+# -----------------------------
+# HTTP server
+# -----------------------------
+
+class ResponseCache:
+    """Small thread-safe LRU of encoded responses, keyed by data version and request."""
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+def _canonical_request(path, query):
+    """
+    The request as the API reads it: the filters as `FilterSpec.to_key()` (the last value of
+    usa/english counts, list filters are sorted) and the other parameters that matter.
+    """
+    try:
+        filters = FilterSpec.from_query(query).to_key()
+    except ValueError:
+        filters = repr(sorted(query.items()))  # answered with a 400, which is not cached
+    params = [f"{name}={query[name] if name == 'columns' else query[name][-1]}"
+              for name in RESPONSE_PARAMS if name in query]
+    return "&".join([path + "?" + filters] + params)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    dataset = None
+    cache = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        snapshot = self.dataset.snapshot
+
+        # The same request on the same data version always gives the same answer,
+        # so the ETag only depends on those two
+        canonical = _canonical_request(url.path, query)
+        etag = '"' + hashlib.sha1(f"{snapshot.version}|{canonical}".encode()).hexdigest()[:20] + '"'
+
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            self._send(304, b"", etag)
+            return
+
+        key = (snapshot.version, canonical)
+        cached = self.cache.get(key)
+        if cached is None:
+            try:
+                body = handle_query(snapshot, url.path, query)
+                status = 200
+            except ApiError as e:
+                body, status = {"error": str(e)}, e.status
+            except Exception:
+                traceback.print_exc()
+                body, status = {"error": "Internal server error"}, 500
+            cached = (status, json.dumps(body).encode("utf-8"))
+            if status == 200:
+                self.cache.put(key, cached)
+
+        status, payload = cached
+        self._send(status, payload, etag if status == 200 else None)
+
+    def _send(self, status, payload, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # clients may store, but must revalidate
+        if payload:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # keep the terminal quiet; errors are returned to the client
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, path=MOVIE_DATA_FILE):
+    """Create (but do not start) the API server for the processed movie file at `path`."""
+    handler = type("Handler", (ApiHandler,), {
+        "dataset": get_shared_dataset(path),
+        "cache": ResponseCache(),
+    })
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import (COLUMN_DTYPES, LAZY_COLUMNS, MOVIE_DATA_FILE, MULTI_VALUE_COLUMNS, SINGLE_VALUE_COLUMNS,
+                         Snapshot, ValueIndex, file_signature)
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Published snapshots of a processed file live next to it: <folder>/snapshots/<version>/
+SNAPSHOTS_FOLDER = "snapshots"
+
+# Name of the file holding the version that workers should open
+CURRENT_FILE = "CURRENT"
+
+# Files of one published version
+TABLE_FILE = "movies.arrow"
+META_FILE = "meta.json"
+SIMILAR_FILES = {"neighbours": "similar.neighbours.npy", "scores": "similar.scores.npy"}
+
+# Versions kept on disk: workers that still map an older one keep working until they reload
+KEEP_VERSIONS = 3
+
+# -----------------------------
+# Paths
+# -----------------------------
+
+def snapshot_root(path=MOVIE_DATA_FILE):
+    return Path(path).parent / SNAPSHOTS_FOLDER
+
+
+def current_pointer(path=MOVIE_DATA_FILE):
+    """The CURRENT file of the snapshots of the processed file `path` (may not exist)."""
+    return snapshot_root(path) / CURRENT_FILE
+
+
+def current_snapshot_dir(path=MOVIE_DATA_FILE):
+    """
+    Folder of the published snapshot of `path`, or None if there is none or it was
+    published for another version of the file (e.g. the watcher rewrote only the CSV).
+    """
+    try:
+        version = current_pointer(path).read_text(encoding="utf-8").strip()
+        with open(snapshot_root(path) / version / META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get("source") != Path(path).name or tuple(meta.get("signature") or ()) != file_signature(path):
+        return None
+    return snapshot_root(path) / version
+
+
+def _index_files(snapshot_dir, column):
+    return Path(snapshot_dir) / f"index.{column}.arrow", Path(snapshot_dir) / f"labels.{column}.arrow"
+
+# -----------------------------
+# Publishing
+# -----------------------------
+
+def _write_table(table, path):
+    import pyarrow as pa
+
+    # uncompressed, so readers can map the buffers instead of decompressing them
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def publish_snapshot(path=MOVIE_DATA_FILE, similar=None, keep=KEEP_VERSIONS, indexes=None):
+    """
+    Publish the processed file `path` as an Arrow IPC snapshot that workers memory-map.
+
+    The frame is stored with the same dtypes `load_snapshot` reads from the CSV, next to
+    the `ValueIndex` of every filter/chart column and, if given, the `SimilarIndex`. Indexes
+    already built for the file (`indexes`, e.g. by `prepare_sharded`) are stored as they are. The
+    version is written into a new folder and then made current by replacing the CURRENT
+    file, so workers always open a complete version. Returns the folder.
+    """
+    import pyarrow as pa
+
+    path = Path(path)
+    signature = file_signature(path)
+    df = pd.read_csv(path, dtype=COLUMN_DTYPES)
+    if "genres" in df.columns:
+        df["genres"] = df["genres"].fillna("").astype(str)
+
+    version = hashlib.sha1(repr(signature).encode()).hexdigest()[:12]  # same version as `load_snapshot`
+    root = snapshot_root(path)
+    target = root / version
+    tmp = root / f"{version}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    _write_table(pa.Table.from_pandas(df, preserve_index=False), tmp / TABLE_FILE)
+    indexes = {column: index for column, index in (indexes or {}).items() if index.n_rows == len(df)}
+    for column in SINGLE_VALUE_COLUMNS + MULTI_VALUE_COLUMNS:
+        if column in df.columns:
+            index = indexes.get(column)
+            if index is None:
+                index = ValueIndex.from_series(df[column], sep=", " if column in MULTI_VALUE_COLUMNS else None)
+            index_file, labels_file = _index_files(tmp, column)
+            _write_table(pa.table({"codes": index.codes, "rows": index.rows}), index_file)
+            _write_table(pa.table({"labels": pd.array(index.labels)}), labels_file)
+    if similar is not None and np.array_equal(similar.tmdb_ids, df["tmdb_id"].to_numpy()):
+        for attr, name in SIMILAR_FILES.items():
+            np.save(tmp / name, getattr(similar, attr))
+    with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "source": path.name, "signature": list(signature),
+                   "rows": len(df), "columns": df.columns.tolist()}, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    pointer = root / CURRENT_FILE
+    pointer_tmp = pointer.with_name(CURRENT_FILE + ".tmp")
+    pointer_tmp.write_text(version, encoding="utf-8")
+    os.replace(pointer_tmp, pointer)
+    _prune(root, keep=max(keep, 1), current=version)
+    return target
+
+
+def _prune(root, keep, current):
+    versions = sorted((d for d in root.iterdir() if d.is_dir() and not d.name.endswith(".tmp")),
+                      key=lambda d: d.stat().st_mtime, reverse=True)
+    for old in versions[keep:]:
+        if old.name != current:
+            # workers mapping it keep their pages until they reload (the files are only unlinked)
+            shutil.rmtree(old, ignore_errors=True)
+
+# -----------------------------
+# Loading
+# -----------------------------
+
+def _map_table(path):
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def _to_pandas(table):
+    """Like `Table.to_pandas`, with missing strings as NaN like `pd.read_csv` (not None)."""
+    df = table.to_pandas()
+    for column in df.columns:
+        if df[column].dtype == object and df[column].isna().any():
+            df[column] = df[column].fillna(np.nan)
+    return df
+
+
+def read_value_index(snapshot_dir, column, n_rows):
+    """The stored `ValueIndex` of a column: codes and rows point into the mapped file."""
+    index_file, labels_file = _index_files(snapshot_dir, column)
+    table = _map_table(index_file)
+    labels = _map_table(labels_file).column("labels").to_pandas().to_numpy()
+    return ValueIndex(
+        labels=labels,
+        codes=table.column("codes").to_numpy(),
+        rows=table.column("rows").to_numpy(),
+        n_rows=n_rows,
+    )
+
+
+class ArrowSnapshot(Snapshot):
+    """
+    `Snapshot` of a published Arrow version: the frame, indexes and similar films are read
+    from memory-mapped files instead of parsing the CSV, so every worker process shares the
+    same pages of the OS page cache. Lazy columns and indexes are taken from the mapped
+    table on first use; the strings of the loaded columns are still converted per process.
+    """
+
+    def __init__(self, snapshot_dir, table, df, version, path=None, signature=None):
+        self.dir = Path(snapshot_dir)
+        self.table = table
+        stored = {column for column in df.columns if _index_files(self.dir, column)[0].exists()}
+        indexes = {column: read_value_index(self.dir, column, len(df)) for column in stored}
+        super().__init__(df, version, path=path, columns=table.column_names, signature=signature, indexes=indexes)
+
+    def _read_column(self, column):
+        series = _to_pandas(self.table.select([column]))[column]
+        return pd.Series(series.to_numpy(), index=self.df.index, name=column)
+
+    def _load_index(self, column):
+        if _index_files(self.dir, column)[0].exists():
+            return self._set_index(column, read_value_index(self.dir, column, len(self.df)))
+        return super()._load_index(column)
+
+
+def load_arrow_snapshot(snapshot_dir, path=MOVIE_DATA_FILE, lazy_columns=LAZY_COLUMNS):
+    """Open a published snapshot folder; `lazy_columns` stay in the mapped table until first use."""
+    from src.similar import SimilarIndex
+
+    snapshot_dir = Path(snapshot_dir)
+    with open(snapshot_dir / META_FILE, encoding="utf-8") as f:
+        meta = json.load(f)
+    table = _map_table(snapshot_dir / TABLE_FILE)
+    if "tmdb_id" not in table.column_names:
+        lazy_columns = ()
+    df = _to_pandas(table.select([c for c in table.column_names if c not in lazy_columns]))
+
+    snapshot = ArrowSnapshot(snapshot_dir, table, df, version=meta["version"], path=Path(path),
+                             signature=tuple(meta["signature"]))
+    if all((snapshot_dir / name).exists() for name in SIMILAR_FILES.values()):
+        arrays = {attr: np.load(snapshot_dir / name, mmap_mode="r") for attr, name in SIMILAR_FILES.items()}
+        snapshot.cached("similar", lambda s: SimilarIndex(df["tmdb_id"].to_numpy(), **arrays))
+    return snapshot
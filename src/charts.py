@@ -0,0 +1,89 @@
+from src.graphs import plot_bar, plot_map
+
+# -----------------------------
+# Colors
+# -----------------------------
+# set colors and gradients
+ORANGE = "#FFA500"
+ORANGE_GRADIENT = ["#FFCC66", "#FFA500", "#FF8800"]
+BLUE = "#1E90FF"
+BLUE_GRADIENT = ["#66B2FF",  "#1E90FF", "#125E99"]
+GREEN = "#2BA42B"
+GREEN_GRADIENT = ["#70D070", "#2BA42B", "#238C23"]
+
+# -----------------------------
+# Charts of the dashboard
+# -----------------------------
+# Each chart counts the films per value of `column` and plots the counts with `plot_bar`.
+# `label` is the axis name of the values, the remaining keys are passed to `plot_bar`.
+CHARTS = {
+    "year": {
+        "column": "year", "label": "Year", "empty_message": "No release date information available for plotting.",
+        "title": "Movies by Release Year", "orientation": "v", "color": BLUE,
+        "order_axis": True,  # years in chronological order
+    },
+    "decade": {
+        "column": "decade", "label": "Decade", "empty_message": "No decade information available.",
+        "title": "Movies by Release Year", "orientation": "v", "color": BLUE_GRADIENT, "order_axis": False,
+    },
+    "language": {
+        "column": "main_language", "label": "Language", "empty_message": "No spoken language data available.",
+        "title": "Top 10 Languages", "orientation": "h", "top_n": 10, "color": GREEN_GRADIENT,
+    },
+    "genre": {
+        "column": "genres", "label": "Genre", "empty_message": "No genre data available.",
+        "title": "Top 10 Genres", "orientation": "h", "top_n": 10, "color": GREEN_GRADIENT,
+    },
+    "director": {
+        "column": "directors", "label": "Director", "empty_message": "No director data available.",
+        "title": "Top 10 Directors", "orientation": "h", "top_n": 10, "color": BLUE_GRADIENT,
+    },
+    "actor": {
+        "column": "actors", "label": "Actor", "empty_message": "No actor data available.",
+        "title": "Top 10 Actors", "orientation": "h", "top_n": 10, "color": GREEN_GRADIENT,
+    },
+    "screenwriter": {
+        "column": "screenwriters", "label": "Screenwriter", "empty_message": "No screenwriter data available.",
+        "title": "Top 10 Screenwriters", "orientation": "h", "top_n": 10, "color": BLUE_GRADIENT,
+    },
+    "cinematographer": {
+        "column": "cinematographers", "label": "Cinematographer", "empty_message": "No cinematographer data available.",
+        "title": "Top 10 Cinematographers", "orientation": "h", "top_n": 10, "color": GREEN_GRADIENT,
+    },
+    "country": {
+        "column": "main_country", "label": "Country", "empty_message": "No country data available.",
+        "title": "Movies per Main Production Country", "orientation": "h", "top_n": 10, "color": ORANGE_GRADIENT,
+    },
+}
+
+# Settings of the world map next to the country chart
+COUNTRY_MAP = {"title": "Number of Movies per Main Production Country", "color": ORANGE_GRADIENT}
+
+# -----------------------------
+# Functions
+# -----------------------------
+
+def counts_frame(counts, label):
+    """Turn a value_counts Series into the two-column frame expected by the plot functions."""
+    frame = counts.reset_index()
+    frame.columns = [label, "Count"]
+    return frame
+
+
+def build_chart(key, counts):
+    """Create the bar chart `key` of `CHARTS` from the counts of its column."""
+    settings = dict(CHARTS[key])
+    label = settings.pop("label")
+    settings.pop("column")
+    settings.pop("empty_message")
+
+    if settings["orientation"] == "h":
+        x_col, y_col = "Count", label
+    else:
+        x_col, y_col = label, "Count"
+    return plot_bar(counts_frame(counts, label), x_col=x_col, y_col=y_col, **settings)
+
+
+def build_country_map(counts):
+    """Create the world map of films per main production country."""
+    return plot_map(counts_frame(counts, "Country"), country_col="Country", y_col="Count", **COUNTRY_MAP)
@@ -1,46 +1,433 @@
 # check_cache.py
+import argparse
+import csv
+import io
 import json
-import pandas as pd
+import os
+import zlib
+from pathlib import Path
+
+import numpy as np
+
 from src.config import CACHE_DIR
+from src.tmdb_api import CACHE_COLUMNS
 
 TMDB_ID_CACHE = CACHE_DIR / "tmdb_id_cache.json"
 TMDB_DATA_CSV = CACHE_DIR / "tmdb_data.csv"
 
+# Offset, length and checksum of every record of tmdb_data.csv, kept up to date incrementally
+MANIFEST_FILE = CACHE_DIR / "tmdb_data.manifest.json"
+
+# Films to fetch again (tmdb_id -> reason), filled by `schedule_repairs`
+REPAIR_QUEUE_FILE = CACHE_DIR / "repair_queue.json"
+
+# Bump when the manifest layout changes, so it is rebuilt
+MANIFEST_VERSION = 1
+
+# Bytes before the indexed end of the file whose checksum must still match: if they differ,
+# the file was rewritten (e.g. by update_cache.py) and the manifest is rebuilt
+TAIL_BYTES = 4096
+
+# Bytes read or moved at once
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# State of a record
+OK = "ok"
+TRUNCATED = "truncated"     # fewer or more fields than the header (cut off, or two rows run together)
+BAD_ID = "bad_id"           # no usable tmdb_id
+
 # -----------------------------
-# Test code
+# Manifest
+# -----------------------------
+
+def empty_manifest():
+    return {
+        "version": MANIFEST_VERSION,
+        "header": None,         # header line of the CSV
+        "offset": 0,            # bytes of the CSV that are indexed
+        "tail_crc": None,       # checksum of the TAIL_BYTES before `offset`
+        "incomplete": 0,        # bytes after `offset` that do not end with a line break yet
+        # one entry per record, in file order
+        "ids": [], "offsets": [], "lengths": [], "crcs": [], "states": [],
+    }
+
+
+def load_manifest(path=MANIFEST_FILE):
+    if not Path(path).exists():
+        return empty_manifest()
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest if manifest.get("version") == MANIFEST_VERSION else empty_manifest()
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    """Write the manifest via a temporary file, so it is never half-written."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _tail_crc(f, offset):
+    start = max(0, offset - TAIL_BYTES)
+    f.seek(start)
+    return zlib.crc32(f.read(offset - start))
+
+
+def split_records(data):
+    """
+    (start, end) of the complete CSV records in `data`, and where the incomplete rest starts.
+    A line break inside a quoted field does not end a record.
+    """
+    spans, start, pos, quotes = [], 0, 0, 0
+    while True:
+        end = data.find(b"\n", pos)
+        if end < 0:
+            break
+        quotes += data.count(b'"', pos, end)
+        pos = end + 1
+        if quotes % 2 == 0:
+            spans.append((start, pos))
+            start, quotes = pos, 0
+    return spans, start
+
+
+def parse_record(record, n_columns, id_column):
+    """(tmdb_id or None, state) of one CSV record (bytes)."""
+    try:
+        fields = next(csv.reader(io.StringIO(record.decode("utf-8"), newline="")))
+    except (UnicodeDecodeError, csv.Error, StopIteration):
+        return None, TRUNCATED
+    try:
+        tmdb_id = int(float(fields[id_column]))
+    except (IndexError, ValueError):
+        return None, BAD_ID
+    return tmdb_id, OK if len(fields) == n_columns else TRUNCATED
+
+
+def update_manifest(csv_path=TMDB_DATA_CSV, manifest_path=MANIFEST_FILE):
+    """
+    Index the records added to the CSV since the last run and save the manifest.
+
+    Appending records (as the refresh and import scripts do) only costs the new records.
+    If the file was rewritten or shortened, it is indexed again from the start.
+
+    Returns:
+        tuple: (manifest, number of records indexed now, whether it was rebuilt)
+    """
+    manifest = load_manifest(manifest_path)
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        size = os.fstat(f.fileno()).st_size
+        rebuilt = (manifest["header"] != header.decode("utf-8") or manifest["offset"] > size
+                   or _tail_crc(f, manifest["offset"]) != manifest["tail_crc"])
+        if rebuilt:
+            manifest = empty_manifest()
+            manifest["header"] = header.decode("utf-8")
+            manifest["offset"] = len(header)
+
+        columns = next(csv.reader([manifest["header"]]))
+        if "tmdb_id" not in columns:
+            raise ValueError(f"{Path(csv_path).name} has no tmdb_id column")
+        id_column = columns.index("tmdb_id")
+
+        base, rest, new = manifest["offset"], b"", 0
+        f.seek(base)
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            data = rest + block
+            spans, end = split_records(data)
+            for start, stop in spans:
+                record = data[start:stop]
+                tmdb_id, state = parse_record(record, len(columns), id_column)
+                manifest["ids"].append(tmdb_id)
+                manifest["offsets"].append(base + start)
+                manifest["lengths"].append(stop - start)
+                manifest["crcs"].append(zlib.crc32(record))
+                manifest["states"].append(state)
+            new += len(spans)
+            base, rest = base + end, data[end:]
+
+        manifest["offset"] = base
+        manifest["incomplete"] = len(rest)
+        manifest["tail_crc"] = _tail_crc(f, base)
+
+    save_manifest(manifest, manifest_path)
+    return manifest, new, rebuilt
+
+
+def _live_records(manifest):
+    """
+    Boolean array of the records that count: the last intact record of every tmdb_id
+    (a re-fetched film replaces its older record). If that record is an exact copy of
+    an earlier one, the earliest copy counts instead, so compacting moves fewer rows.
+    """
+    keep = np.zeros(len(manifest["ids"]), dtype=bool)
+    last, first_copy = {}, {}
+    for i, (tmdb_id, crc, state) in enumerate(zip(manifest["ids"], manifest["crcs"], manifest["states"])):
+        if state == OK:
+            last[tmdb_id] = i
+            first_copy.setdefault((tmdb_id, crc), i)
+    keep[[first_copy[tmdb_id, manifest["crcs"][i]] for tmdb_id, i in last.items()]] = True
+    return keep
+
+# -----------------------------
+# Checks
+# -----------------------------
+
+def check(manifest, wanted_ids=None, expected_columns=CACHE_COLUMNS):
+    """
+    Problems of the indexed cache, from the manifest alone (no CSV parsing).
+
+    Args:
+        wanted_ids (set, optional): tmdb_ids the movie lists (and ID cache) refer to, to
+            find films without a usable record and records no list needs anymore.
+
+    Returns:
+        dict: duplicates (tmdb_id -> intact copies), broken records (tmdb_id or None, state),
+        broken films without an intact copy, incomplete tail bytes, schema drift,
+        missing and orphaned tmdb_ids
+    """
+    ids = manifest["ids"]
+    states = np.array(manifest["states"], dtype=object)
+    live = _live_records(manifest)
+    intact = [tmdb_id for tmdb_id, state in zip(ids, states) if state == OK]
+    copies = np.unique(np.array(intact, dtype=np.int64), return_counts=True) if intact else ([], [])
+    cached = {ids[i] for i in np.flatnonzero(live)}
+    columns = next(csv.reader([manifest["header"]])) if manifest["header"] else []
+
+    report = {
+        "records": len(ids),
+        "live": int(live.sum()),
+        "duplicates": {int(i): int(n) for i, n in zip(*copies) if n > 1},
+        "broken": [(ids[i], states[i]) for i in np.flatnonzero(states != OK)],
+        "unrecoverable": sorted({ids[i] for i in np.flatnonzero(states != OK)} - cached - {None}),
+        "incomplete_tail": manifest["incomplete"],
+        "schema": {"missing": [c for c in expected_columns if c not in columns],
+                   "extra": [c for c in columns if c not in expected_columns]},
+    }
+    if wanted_ids is not None:
+        report["missing"] = sorted(set(wanted_ids) - cached)
+        report["orphans"] = sorted(cached - set(wanted_ids))
+    return report
+
+
+def read_id_cache(path=TMDB_ID_CACHE):
+    """tmdb_ids resolved by the importers (see `IdCache`), without the films TMDb did not have."""
+    if not Path(path).exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {int(v) for v in json.load(f).values() if v}
+
+
+def wanted_movie_ids(id_cache_path=TMDB_ID_CACHE):
+    """tmdb_ids of every movie list (raw lists and user libraries) and of the ID cache."""
+    from src.library import user_movie_files
+    from src.pipeline import raw_movie_files, read_movie_ids
+
+    return set(read_movie_ids(raw_movie_files() + user_movie_files())) | read_id_cache(id_cache_path)
+
+# -----------------------------
+# Repairs
+# -----------------------------
+
+def load_queue(path=REPAIR_QUEUE_FILE):
+    if not Path(path).exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {int(k): v for k, v in json.load(f).items()}
+
+
+def save_queue(queue, path=REPAIR_QUEUE_FILE):
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({str(k): v for k, v in sorted(queue.items())}, f, indent=1)
+    os.replace(tmp, path)
+
+
+def schedule_repairs(report, queue_path=REPAIR_QUEUE_FILE, schema_drift_ids=()):
+    """
+    Add the films that need fetching again to the repair queue: films with only broken
+    records, films missing from the cache and, optionally, `schema_drift_ids` (records
+    written before new columns were added). Returns the queue.
+    """
+    queue = load_queue(queue_path)
+    for tmdb_id in report["unrecoverable"]:
+        queue.setdefault(tmdb_id, "broken")
+    for tmdb_id in report.get("missing", []):
+        queue.setdefault(tmdb_id, "missing")
+    for tmdb_id in schema_drift_ids:
+        queue.setdefault(tmdb_id, "schema")
+    save_queue(queue, queue_path)
+    return queue
+
+
+def run_repairs(csv_path=TMDB_DATA_CSV, queue_path=REPAIR_QUEUE_FILE, fetch=None, limit=None, verbose=True):
+    """
+    Fetch the queued films again and append the fresh records to the cache, where they
+    replace the old ones (the last intact record counts, `compact` drops the others).
+    Films that could not be fetched stay in the queue. Returns a summary dict.
+    """
+    import pandas as pd
+
+    from src.pipeline import append_csv, fetch_movies
+
+    queue = load_queue(queue_path)
+    ids = list(queue)[:limit]
+    records, failed = fetch_movies(ids, fetch=fetch, verbose=verbose) if ids else ([], [])
+    if records:
+        append_csv(pd.DataFrame(records), csv_path)
+    for record in records:
+        queue.pop(int(record["tmdb_id"]), None)
+    save_queue(queue, queue_path)
+    return {"fetched": len(records), "failed": len(failed), "queued": len(queue)}
+
+# -----------------------------
+# Compaction
+# -----------------------------
+
+def _move(f, src, dst, length):
+    """Copy `length` bytes from `src` to `dst` <= `src` within the open file, in blocks."""
+    done = 0
+    while done < length:
+        size = min(BLOCK_SIZE, length - done)
+        f.seek(src + done)
+        data = f.read(size)
+        f.seek(dst + done)
+        f.write(data)
+        done += size
+
+
+def compact(csv_path=TMDB_DATA_CSV, manifest_path=MANIFEST_FILE, drop_ids=()):
+    """
+    Remove duplicate and broken records (and the records of `drop_ids`) from the CSV in place.
+
+    Everything before the first removed record stays untouched; the records after it are
+    moved up over the gaps and the file is truncated. Holds the lock the cache writers take
+    (see `pipeline.file_lock`) and raises `FileLocked` instead of waiting if one is writing,
+    so an incomplete last row is really broken, not a row being appended. Returns a summary dict.
+    """
+    from src.pipeline import file_lock
+
+    with file_lock(csv_path, blocking=False):
+        return _compact(csv_path, manifest_path, drop_ids)
+
+
+def _compact(csv_path, manifest_path, drop_ids):
+    manifest, _, _ = update_manifest(csv_path, manifest_path)
+    keep = _live_records(manifest)
+    if len(drop_ids):
+        keep &= ~np.isin(np.array([-1 if i is None else i for i in manifest["ids"]], dtype=np.int64),
+                         np.asarray(list(drop_ids), dtype=np.int64))
+    offsets = np.array(manifest["offsets"], dtype=np.int64)
+    lengths = np.array(manifest["lengths"], dtype=np.int64)
+    size_before = manifest["offset"] + manifest["incomplete"]
+
+    removed = np.flatnonzero(~keep)
+    if len(removed) == 0 and manifest["incomplete"] == 0:
+        return {"removed": 0, "moved": 0, "bytes_before": size_before, "bytes_after": size_before}
+
+    first = int(removed[0]) if len(removed) else len(keep)
+    write = int(offsets[first]) if first < len(keep) else manifest["offset"]
+    moved = 0
+    with open(csv_path, "r+b") as f:
+        i = first
+        while i < len(keep):
+            if not keep[i]:
+                i += 1
+                continue
+            # move runs of adjacent kept records at once
+            j = i + 1
+            while j < len(keep) and keep[j] and offsets[j] == offsets[j - 1] + lengths[j - 1]:
+                j += 1
+            length = int(offsets[j - 1] + lengths[j - 1] - offsets[i])
+            if offsets[i] != write:
+                _move(f, int(offsets[i]), write, length)
+            offsets[i:j] += write - offsets[i]
+            write += length
+            moved += j - i
+            i = j
+        f.truncate(write)
+        f.flush()
+        os.fsync(f.fileno())
+
+    for key in ("ids", "crcs", "states"):
+        manifest[key] = [value for value, k in zip(manifest[key], keep) if k]
+    manifest["offsets"] = offsets[keep].tolist()
+    manifest["lengths"] = lengths[keep].tolist()
+    manifest["offset"], manifest["incomplete"] = write, 0
+    with open(csv_path, "rb") as f:
+        manifest["tail_crc"] = _tail_crc(f, write)
+    save_manifest(manifest, manifest_path)
+    return {"removed": len(removed), "moved": moved, "bytes_before": size_before, "bytes_after": write}
+
+# -----------------------------
+# Command line
 # -----------------------------
 # Only runs when the file is executed directly, not when imported
 if __name__ == "__main__":
-    # Load ID cache
-    if TMDB_ID_CACHE.exists():
-        with open(TMDB_ID_CACHE, "r", encoding="utf-8") as f:
-            tmdb_id_cache = {k: v for k, v in json.load(f).items() if v}
-        print(f"TMDb ID cache entries: {len(tmdb_id_cache)}")
-    else:
-        tmdb_id_cache = {}
-        print("TMDb ID cache not found!")
-
-    # Load metadata CSV
-    if TMDB_DATA_CSV.exists():
-        tmdb_data = pd.read_csv(TMDB_DATA_CSV)
-        if "tmdb_id" in tmdb_data.columns:
-            tmdb_data["tmdb_id"] = tmdb_data["tmdb_id"].astype(int)
-            print(f"TMDb metadata rows: {len(tmdb_data)}")
-        else:
-            print("Warning: 'tmdb_id' column missing from metadata CSV")
-            tmdb_data["tmdb_id"] = pd.Series(dtype=int)
-    else:
-        tmdb_data = pd.DataFrame(columns=["tmdb_id"])
+    parser = argparse.ArgumentParser(description="Check, repair and compact the TMDb metadata cache.")
+    parser.add_argument("--cache", type=Path, default=TMDB_DATA_CSV)
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_FILE)
+    parser.add_argument("--repair", action="store_true",
+                        help="fetch broken and missing films again (targeted, see the repair queue)")
+    parser.add_argument("--schedule-only", action="store_true", help="only add them to the repair queue")
+    parser.add_argument("--refetch-schema", action="store_true",
+                        help="also queue every film if the cache lacks columns search_movie returns now")
+    parser.add_argument("--limit", type=int, default=None, help="films fetched at most in this run")
+    parser.add_argument("--compact", action="store_true", help="drop duplicate and broken rows in place")
+    parser.add_argument("--drop-orphans", action="store_true", help="with --compact: also drop films no list uses")
+    args = parser.parse_args()
+
+    if not args.cache.exists():
         print("TMDb metadata CSV not found!")
+        raise SystemExit(1)
+
+    manifest, new, rebuilt = update_manifest(args.cache, args.manifest)
+    print(f"Manifest: {len(manifest['ids'])} records ({'rebuilt' if rebuilt else f'{new} new'})")
+
+    id_cache_ids = read_id_cache()
+    print(f"TMDb ID cache entries: {len(id_cache_ids)}")
+    wanted = wanted_movie_ids()
+    report = check(manifest, wanted)
+
+    print(f"Intact films: {report['live']}")
+    print(f"Duplicate films: {len(report['duplicates'])} "
+          f"({sum(report['duplicates'].values()) - len(report['duplicates'])} extra rows)")
+    print(f"Broken rows: {len(report['broken'])} ({len(report['unrecoverable'])} films without an intact copy)"
+          + (f", incomplete last row: {report['incomplete_tail']} bytes" if report["incomplete_tail"] else ""))
+    if report["schema"]["missing"] or report["schema"]["extra"]:
+        print(f"Schema drift: missing columns {report['schema']['missing']}, extra columns {report['schema']['extra']}")
+    print(f"Films in the lists or ID cache without metadata: {len(report['missing'])}")
+    print(f"  of which in the ID cache: {len(id_cache_ids & set(report['missing']))}")
+    print(f"Cached films no list uses (orphans): {len(report['orphans'])}")
 
-    # Compare cache vs metadata
-    cache_ids = set(int(v) for v in tmdb_id_cache.values())
-    metadata_ids = set(tmdb_data["tmdb_id"].dropna().astype(int))
+    if args.repair or args.schedule_only:
+        drift = ()
+        if args.refetch_schema and report["schema"]["missing"]:
+            drift = [manifest["ids"][i] for i in np.flatnonzero(_live_records(manifest))]
+        queue = schedule_repairs(report, schema_drift_ids=drift)
+        print(f"Repair queue: {len(queue)} films → {REPAIR_QUEUE_FILE}")
+        if args.repair and queue:
+            summary = run_repairs(args.cache, limit=args.limit)
+            print(f"Repairs: {summary}")
+            args.compact = True  # the fresh records replace the old ones
 
-    matching_ids = cache_ids & metadata_ids
-    missing_in_metadata = cache_ids - metadata_ids
-    missing_in_cache = metadata_ids - cache_ids
+    if args.compact:
+        drop_ids = report["orphans"] if args.drop_orphans else ()
+        if args.drop_orphans and not wanted:
+            print("No movie lists found, keeping all films")
+            drop_ids = ()
+        from src.pipeline import FileLocked
 
-    print(f"TMDb IDs present in both cache & metadata: {len(matching_ids)}")
-    print(f"TMDb IDs missing in metadata CSV: {len(missing_in_metadata)}")
-    print(f"TMDb IDs missing in ID cache: {len(missing_in_cache)}")
+        try:
+            summary = compact(args.cache, args.manifest, drop_ids=drop_ids)
+        except FileLocked as e:
+            print(f"Not compacted: {e}, try again when it is done")
+            raise SystemExit(1)
+        print(f"Compacted: removed {summary['removed']} rows, moved {summary['moved']}, "
+              f"{summary['bytes_before']} → {summary['bytes_after']} bytes")
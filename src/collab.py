@@ -0,0 +1,195 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import ValueIndex
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+COLLAB_FILE = ROOT_DIR / "data" / "processed" / "collab_index.npz"
+
+# Role pairs with their two columns and display labels
+COLLAB_PAIRS = {
+    "director-actor": ("directors", "actors", "Director", "Actor"),
+    "director-cinematographer": ("directors", "cinematographers", "Director", "Cinematographer"),
+    "director-screenwriter": ("directors", "screenwriters", "Director", "Screenwriter"),
+}
+
+# -----------------------------
+# Co-occurrence matrices
+# -----------------------------
+
+class PairIndex:
+    """
+    Co-occurrence of two roles, e.g. which directors work with which actors.
+
+    This is the sparse product A^T · diag(mask) · B of the film x person incidence
+    matrices of both roles, stored as its non-zero structure: every distinct
+    (person a, person b) pair gets an id, and `entries` lists (film row, pair id) once
+    per film the pair shares. Counting pairs under a filter is then one `np.bincount`.
+    """
+
+    def __init__(self, labels_a, labels_b, pair_a, pair_b, rows, pair_ids):
+        self.labels_a = labels_a    # names of the first role
+        self.labels_b = labels_b    # names of the second role
+        self.pair_a = pair_a        # first person of each distinct pair
+        self.pair_b = pair_b        # second person of each distinct pair
+        self.rows = rows            # film row of each entry
+        self.pair_ids = pair_ids    # pair of each entry
+
+    @classmethod
+    def from_indexes(cls, index_a, index_b):
+        """Build the pairs of two `ValueIndex` objects over the same frame."""
+        # sort the entries of both roles by film
+        order_a = np.argsort(index_a.rows, kind="stable")
+        order_b = np.argsort(index_b.rows, kind="stable")
+        rows_a, codes_a = index_a.rows[order_a], index_a.codes[order_a]
+        rows_b, codes_b = index_b.rows[order_b], index_b.codes[order_b]
+
+        n_rows = max(index_a.n_rows, index_b.n_rows)
+        count_b = np.bincount(rows_b, minlength=n_rows)
+        start_b = np.concatenate([[0], np.cumsum(count_b)[:-1]])
+
+        # every entry of a is combined with all entries of b of the same film
+        repeats = count_b[rows_a]
+        entry_a = np.repeat(np.arange(len(rows_a)), repeats)
+        first = np.repeat(start_b[rows_a] - np.concatenate([[0], np.cumsum(repeats)[:-1]]), repeats)
+        entry_b = first + np.arange(repeats.sum())
+
+        keys = codes_a[entry_a].astype(np.int64) * len(index_b.labels) + codes_b[entry_b]
+        pair_ids, unique_keys = pd.factorize(keys, sort=True)
+        return cls(
+            labels_a=index_a.labels,
+            labels_b=index_b.labels,
+            pair_a=(unique_keys // len(index_b.labels)).astype(np.int32),
+            pair_b=(unique_keys % len(index_b.labels)).astype(np.int32),
+            rows=rows_a[entry_a].astype(np.int32),
+            pair_ids=pair_ids.astype(np.int32),
+        )
+
+    def counts(self, mask=None):
+        """Number of shared (filtered) films per distinct pair."""
+        ids = self.pair_ids if mask is None else self.pair_ids[mask[self.rows]]
+        return np.bincount(ids, minlength=len(self.pair_a))
+
+    def top_pairs(self, mask=None, k=10, label_a="a", label_b="b"):
+        """The `k` pairs with the most shared films, as a frame with both names and Count."""
+        counts = self.counts(mask)
+        top = _top_k(counts, k)
+        return pd.DataFrame({
+            label_a: self.labels_a[self.pair_a[top]],
+            label_b: self.labels_b[self.pair_b[top]],
+            "Count": counts[top],
+        })
+
+    def collaborators(self, name, mask=None, k=10):
+        """
+        Frequent collaborators of `name` (on either side of the pair) under the filter,
+        as a frame with Name, Side ("a"/"b") and Count.
+        """
+        counts = self.counts(mask)
+        frames = []
+        for own_labels, own_pair, other_labels, other_pair, side in (
+            (self.labels_a, self.pair_a, self.labels_b, self.pair_b, "b"),
+            (self.labels_b, self.pair_b, self.labels_a, self.pair_a, "a"),
+        ):
+            code = np.searchsorted(own_labels, name)
+            if code >= len(own_labels) or own_labels[code] != name:
+                continue
+            pairs = np.flatnonzero((own_pair == code) & (counts > 0))
+            frames.append(pd.DataFrame({
+                "Name": other_labels[other_pair[pairs]],
+                "Side": side,
+                "Count": counts[pairs],
+            }))
+        if not frames:
+            return pd.DataFrame(columns=["Name", "Side", "Count"])
+        result = pd.concat(frames, ignore_index=True)
+        return result.sort_values("Count", ascending=False, kind="stable").head(k).reset_index(drop=True)
+
+
+def _top_k(counts, k):
+    """Positions of the `k` largest non-zero counts, largest first."""
+    nonzero = np.flatnonzero(counts)
+    if len(nonzero) > k:
+        nonzero = nonzero[np.argpartition(-counts[nonzero], k - 1)[:k]]
+    return nonzero[np.argsort(-counts[nonzero], kind="stable")]
+
+# -----------------------------
+# Build, save and load
+# -----------------------------
+
+def build_collab_index(df, indexes=None):
+    """
+    Build the `PairIndex` of every role pair in `COLLAB_PAIRS` that is present in `df` or `indexes`.
+
+    Args:
+        df (pd.DataFrame | None): Prepared movie frame.
+        indexes (dict, optional): Existing `ValueIndex` per column, e.g. from `snapshot.index`.
+    """
+    indexes = dict(indexes or {})
+    columns = set(indexes) | (set(df.columns) if df is not None else set())
+    result = {}
+    for name, (col_a, col_b, _, _) in COLLAB_PAIRS.items():
+        if col_a not in columns or col_b not in columns:
+            continue
+        for col in (col_a, col_b):
+            if col not in indexes:
+                indexes[col] = ValueIndex.from_series(df[col], sep=", ")
+        result[name] = PairIndex.from_indexes(indexes[col_a], indexes[col_b])
+    return result
+
+
+def save_collab_index(pairs, tmdb_ids, path=COLLAB_FILE):
+    """Store the pair indexes with the film order they were built for."""
+    arrays = {"tmdb_ids": np.asarray(tmdb_ids)}
+    for name, pair in pairs.items():
+        for attr in ("labels_a", "labels_b", "pair_a", "pair_b", "rows", "pair_ids"):
+            arr = getattr(pair, attr)
+            arrays[f"{name}/{attr}"] = arr.astype(str) if arr.dtype == object else arr
+    # via a temporary file, so a running dashboard never reads a half-written index
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def load_collab_index(tmdb_ids, path=COLLAB_FILE):
+    """Read stored pair indexes, or None if missing or built for different films."""
+    if not Path(path).exists():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if not np.array_equal(data["tmdb_ids"], np.asarray(tmdb_ids)):
+            return None
+        pairs = {}
+        for name in COLLAB_PAIRS:
+            if f"{name}/rows" in data:
+                pairs[name] = PairIndex(**{
+                    attr: data[f"{name}/{attr}"]
+                    for attr in ("labels_a", "labels_b", "pair_a", "pair_b", "rows", "pair_ids")
+                })
+        return pairs
+
+
+def get_collab_index(snapshot):
+    """
+    Pair indexes of a snapshot, shared by all sessions. Uses the file written by
+    prepare_df.py when it matches the snapshot, otherwise builds them in memory.
+    """
+    def build(snapshot):
+        pairs = None
+        if "tmdb_id" in snapshot.df.columns:
+            pairs = load_collab_index(snapshot.df["tmdb_id"].to_numpy())
+        if pairs is not None:
+            return pairs
+        columns = {col for col_a, col_b, _, _ in COLLAB_PAIRS.values() for col in (col_a, col_b)}
+        indexes = {col: snapshot.index(col) for col in columns if snapshot.has_column(col)}
+        return build_collab_index(None, indexes)
+
+    return snapshot.cached("collab", build)
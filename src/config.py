@@ -1,17 +1,43 @@
 import os
-from dotenv import load_dotenv
 from pathlib import Path
 
-# Load .env from project root
+# Project root
 ROOT_DIR = Path(__file__).resolve().parent.parent
-load_dotenv(ROOT_DIR / ".env")
 
-# Retrieve TMDB_API_KEY
-TMDB_API_KEY = os.getenv("TMDB_API_KEY")
+# define CACHE_DIR for tmdb_ids (created on first write, see `ensure_cache_dir`)
+CACHE_DIR = ROOT_DIR / "data" / "cache"
 
-if TMDB_API_KEY is None:
-    raise ValueError("TMDB_API_KEY not found. Please add it to your .env file.")
+# Nothing is read or created on import: offline tools can import every module
+# without a .env file, and the .env file is only read when the API key is needed.
+_env_loaded = False
 
-# define CACHE_DIR for tmdb_ids
-CACHE_DIR = ROOT_DIR / "data" / "cache"
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+
+def load_env():
+    """Load .env from project root (once)."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv(ROOT_DIR / ".env")
+        _env_loaded = True
+
+
+def get_api_key():
+    """Retrieve TMDB_API_KEY from the environment or the .env file."""
+    load_env()
+    api_key = os.getenv("TMDB_API_KEY")
+    if api_key is None:
+        raise ValueError("TMDB_API_KEY not found. Please add it to your .env file.")
+    return api_key
+
+
+def ensure_cache_dir():
+    """Create CACHE_DIR if needed and return it."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return CACHE_DIR
+
+
+def __getattr__(name):
+    # keeps `from src.config import TMDB_API_KEY` working, resolved when it is imported
+    if name == "TMDB_API_KEY":
+        return get_api_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
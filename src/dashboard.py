@@ -1,17 +1,27 @@
-import streamlit as st
-from pathlib import Path
-import pandas as pd
-
-from src.graphs import plot_bar, plot_map
+from datetime import datetime
 
-# -----------------------------
-# Constants / Default paths
-# -----------------------------
-# Root folder
-ROOT_DIR = Path(__file__).resolve().parent.parent
-DATA_PROCESSED_DIR = ROOT_DIR / "data" / "processed"
+import numpy as np
+import pandas as pd
+import streamlit as st
 
-MOVIE_DATA_FILE = DATA_PROCESSED_DIR / "final_movies.csv"
+from src import engine
+from src.charts import CHARTS, ORANGE, ORANGE_GRADIENT, build_chart, build_country_map
+from src.collab import COLLAB_PAIRS, get_collab_index
+from src.dataset import MOVIE_DATA_FILE, get_shared_dataset
+from src.diary import ROLLUP_FILE, load_rollups
+from src.engine import FilterSpec, filter_mask
+from src.graphs import plot_bar
+from src.library import get_library_store
+from src.pipeline import get_background_refresh, refresh_interval
+from src.posters import AssetCache
+from src.profiling import Tracer, debug_enabled, span, start_trace
+from src.search import get_search_index
+from src.similar import similar_films, similar_index_state
+
+# Posters in the grid above the table, and the largest table that gets a poster column
+POSTER_GRID_SIZE = 24
+POSTER_GRID_COLUMNS = 8
+TABLE_POSTER_ROWS = 200
 
 # -----------------------------
 # Define Dashboard function
@@ -21,32 +31,79 @@ def run_dashboard():
     st.set_page_config(page_title="Movie Dashboard", layout="wide")
     st.title("🎬 My Movie Dashboard")
 
-    # set colors and gradients
-    orange = "#FFA500"
-    orange_gradient = ["#FFCC66", "#FFA500", "#FF8800"]
-    blue = "#1E90FF"
-    blue_gradient = ["#66B2FF",  "#1E90FF", "#125E99"]
-    green = "#2BA42B"
-    green_gradient = ["#70D070", "#2BA42B", "#238C23"]
+    # -----------------------------
+    # Debug instrumentation (opt-in)
+    # -----------------------------
+    # With MOVIE_DASHBOARD_DEBUG=1 or ?debug=1 every load, filter, aggregate and render
+    # step is timed, shown in a sidebar panel and appended to the trace log
+    debug = debug_enabled(st.query_params)
+    track_memory = debug and st.sidebar.checkbox("Track memory (slow)", value=False)
+    tracer = start_trace(Tracer(track_memory=track_memory) if debug else None)
 
     # -----------------------------
     # Load data
     # -----------------------------
-    # -- DIARY --
-
     # -- WATCHED --
-    df = pd.read_csv(MOVIE_DATA_FILE)
+    # One snapshot is shared by all sessions and reloaded in the background when the
+    # processed file changes. Keep a reference for the whole rerun and never modify it.
+    with span("snapshot", "load"):
+        dataset = get_shared_dataset(MOVIE_DATA_FILE)
+        snapshot = dataset.snapshot
+    df = snapshot.df
+
+    # With MOVIE_DASHBOARD_REFRESH=<minutes> new films are fetched and prepared in the
+    # background while the sessions keep using the current snapshot
+    background = get_background_refresh(dataset) if refresh_interval() else None
+    show_freshness(dataset, snapshot, background)
+    if tracer:
+        tracer.info.update(version=snapshot.version, films=len(df))
+
+    # -- USER --
+    # With ?user=<id> only that user's films (data/users/<id>) are shown: their library is
+    # a row mask over the shared snapshot, so the metadata is held once for all users
+    user_id = st.query_params.get("user")
+    library = None
+    if user_id:
+        with span("user library", "load"):
+            try:
+                library = get_library_store().get(user_id)
+            except (KeyError, ValueError):
+                st.error(f"Unknown user: {user_id}")
+                st.stop()
+        missing = library.missing(snapshot)
+        if missing:
+            st.caption(f"{missing} of your films are not loaded yet, their metadata is still being fetched.")
+
+    def options(column):
+        return library.options(snapshot, column) if library is not None else snapshot.options(column)
 
-    # Clean data after loading
-    df["genres"] = df["genres"].fillna("").astype(str)
+    # -- DIARY --
+    with span("diary rollups", "load"):
+        if library is not None:
+            diary_events, diary_rollups = library.rollups(snapshot)
+        else:
+            diary_events, diary_rollups = load_rollups(ROLLUP_FILE)
 
     # -----------------------------
     # Filters
     # -----------------------------
     st.sidebar.header("🎬 Filters")
 
+    # 0. Search titles and people (accents and small typos are ignored)
+    search_query = st.sidebar.text_input("🔎 Search titles and people:", value="").strip()
+    if search_query:
+        with span("search", "filter"):
+            matches = get_search_index(snapshot).search(search_query, limit=5)
+        if matches.empty:
+            st.sidebar.caption("No matching titles or people.")
+        else:
+            st.sidebar.caption("Matches: " + ", ".join(
+                f"{name} ({field.lower()}, {films})" for name, field, films in
+                zip(matches["Name"], matches["Field"], matches["Films"])
+            ))
+
     # 1. Country Filter
-    all_countries = sorted(df['main_country'].astype(str).dropna().unique())
+    all_countries = options("main_country")
     country_filter = st.sidebar.multiselect(
         "Production country:",
         options=all_countries,
@@ -60,7 +117,7 @@ def run_dashboard():
     )
 
     # 3. Decade filter
-    decades = sorted(df["decade"].unique())
+    decades = options("decade")
     decade_filter = st.sidebar.multiselect(
         "Decade:",
         options=decades,
@@ -68,7 +125,7 @@ def run_dashboard():
     )
 
     # 4. Spoken languages filter
-    all_languages = sorted(df['main_language'].astype(str).dropna().unique())
+    all_languages = options("main_language")
     language_filter = st.sidebar.multiselect(
         "Main Language:",
         options=all_languages,
@@ -82,119 +139,99 @@ def run_dashboard():
     )
 
     # 6. Genre filter
-    all_genres = sorted(set(g.strip() for genres in df["genres"].dropna() for g in genres.split(", ")))
+    all_genres = options("genres")
     genre_filter = st.sidebar.multiselect(
         "Genre:",
         options=all_genres,
         default=[]
     )
 
-    # Apply Filters
-    df_filtered = df.copy()
-
-    # Country filter
-    if country_filter:
-        df_filtered = df_filtered[df_filtered["main_country"].isin(country_filter)]
-
-    # USA filter
-    if usa_filter == "USA":
-        df_filtered = df_filtered[df_filtered["main_country"].str.contains("United States of America", case=False, na=False)]
-    elif usa_filter == "Non-USA":
-        df_filtered = df_filtered[~df_filtered["main_country"].str.contains("United States of America", case=False, na=False)]
-
-    # Decade filter
-    if decade_filter:
-        df_filtered = df_filtered[df_filtered["decade"].isin(decade_filter)]
-
-    # main languages (handle multiple)
-    if language_filter:
-        df_filtered = df_filtered[df_filtered["main_language"].isin(language_filter)]
-
-    # English language filter
-    if english_filter == "English":
-        df_filtered = df_filtered[df_filtered["main_language"].str.contains("English", case=False, na=False)]
-    elif english_filter == "Non-English":
-        df_filtered = df_filtered[~df_filtered["main_language"].str.contains("English", case=False, na=False)]
-
-    # Genre filter (handle multiple genres per movie)
-    if genre_filter:
-        df_filtered = df_filtered[
-            df_filtered["genres"].apply(
-                lambda x: isinstance(x,str) and any(g.strip() in genre_filter for g in x.split(","))
-            )]
+    # Apply Filters as a boolean mask, so the shared frame is never copied
+    spec = FilterSpec(
+        countries=tuple(country_filter),
+        usa=usa_filter,
+        decades=tuple(decade_filter),
+        languages=tuple(language_filter),
+        english=english_filter,
+        genres=tuple(genre_filter),
+        search=search_query,
+    )
+    with span("filter mask", "filter"):
+        mask = filter_mask(snapshot, spec)
+        if library is not None:
+            mask &= library.mask(snapshot)
+
+    # All chart counts are independent: count them at once, then render. The session keeps
+    # the counts of its previous mask, so adding or removing one filter value only counts
+    # the films that entered or left the selection.
+    # The people charts only show their top 10 (the country map needs all countries).
+    if "chart_counts" not in st.session_state:
+        st.session_state["chart_counts"] = engine.IncrementalCounts()
+    aggregator = st.session_state["chart_counts"]
+    top = {CHARTS[key]["column"]: CHARTS[key]["top_n"] for key in ("director", "actor", "screenwriter", "cinematographer")}
+    with span("count charts", "aggregate", charts=len(CHARTS)):
+        chart_counts = aggregator.update(snapshot, [chart["column"] for chart in CHARTS.values()], mask, top=top)
+
+    def value_counts(column):
+        if column in chart_counts:
+            return chart_counts[column]
+        with span(f"count {column}", "aggregate"):
+            return engine.value_counts(snapshot, column, mask)
+
+    def show_chart(key):
+        """Render one of the bar charts in `CHARTS`, or a message if there is no data for it."""
+        counts = value_counts(CHARTS[key]["column"])
+        if counts.empty:
+            st.write(CHARTS[key]["empty_message"])
+            return
+        with span(f"chart {key}", "render"):
+            st.plotly_chart(build_chart(key, counts), use_container_width=True)
 
     # -----------------------------
     # Summary stats
     # -----------------------------
     st.header("Summary")
-    st.write(f"Total movies watched: {len(df_filtered)}")
-    #st.write(f"Total movies in diary: {len(df_diary)}")
+    st.write(f"Total movies watched: {int(mask.sum())}")
+    if diary_events:
+        st.write(f"Total movies in diary: {diary_events}")
 
     # -----------------------------
     # Movies watched per year
     # -----------------------------
-#    st.header("Movies Watched Over Time")
-#    if 'Watched Year' in df_diary.columns and not df_diary['Watched Year'].isnull().all():
-#        movies_per_year = df_diary['Watched Year'].value_counts().reset_index()
-#        movies_per_year.columns = ["Watched Year", "Count"]
-#
-#        fig = plot_bar(
-#            movies_per_year,
-#            x_col="Watched Year",
-#            y_col="Count",
-#            title="Movies Watched Over Time",
-#            orientation="v",
-#            order_axis=True,  # years in chronological order
-#            color = orange
-#        )
-#        st.plotly_chart(fig, use_container_width=True)
-#
-#    else:
-#        st.write("No Date Watched information available for plotting.")
-
-    # -----------------------------
-    # Movies per release year
-    # -----------------------------
-    st.header("Release Years of Movies")
-    if 'year' in df_filtered.columns and not df_filtered['year'].isnull().all():
-        movies_per_year = df_filtered['year'].value_counts().reset_index()
-        movies_per_year.columns = ["Year", "Count"]
+    # The diary rollups are counted ahead of time by scripts/update_diary.py,
+    # so this chart does not depend on the size of the diary
+    st.header("Movies Watched Over Time")
+    if diary_rollups:
+        grain = st.radio("Per:", options=["year", "month", "week", "day"], horizontal=True,
+                         format_func=str.capitalize)
+        movies_per_period = diary_rollups[grain]
 
         fig = plot_bar(
-            movies_per_year,
-            x_col="Year",
+            movies_per_period,
+            x_col="Period",
             y_col="Count",
-            title="Movies by Release Year",
+            title="Movies Watched Over Time",
             orientation="v",
-            color = blue,
-            order_axis=True  # years in chronological order
+            order_axis=True,  # periods in chronological order
+            color = ORANGE
         )
-        st.plotly_chart(fig, use_container_width=True)
+        with span("chart diary", "render"):
+            st.plotly_chart(fig, use_container_width=True)
 
     else:
-        st.write("No release date information available for plotting.")
+        st.write("No Date Watched information available for plotting.")
+
+    # -----------------------------
+    # Movies per release year
+    # -----------------------------
+    st.header("Release Years of Movies")
+    show_chart("year")
 
     # -----------------------------
     # Movies per decade
     # -----------------------------
     st.header("Movies by Decade")
-    if 'decade' in df_filtered.columns and not df_filtered['decade'].isnull().all():
-        movies_per_year = df_filtered['decade'].value_counts().reset_index()
-        movies_per_year.columns = ["Decade", "Count"]
-
-        fig = plot_bar(
-            movies_per_year,
-            x_col="Decade",
-            y_col="Count",
-            title="Movies by Release Year",
-            orientation="v",
-            color = blue_gradient,
-            order_axis=False  # years in chronological order
-        )
-        st.plotly_chart(fig, use_container_width=True)
-
-    else:
-        st.write("No decade information available.")
+    show_chart("decade")
 
     # -----------------------------
     # Languages and Genres
@@ -206,32 +243,11 @@ def run_dashboard():
 
     # Movies per language
     with col1:
-        if "main_language" in df_filtered.columns and not df_filtered["main_language"].isnull().all():
-            lang_counts = df_filtered["main_language"].value_counts().reset_index()
-            lang_counts.columns = ["Language", "Count"]
-
-            fig = plot_bar(lang_counts, x_col="Count", y_col="Language", orientation="h"
-                           , title="Top 10 Languages", top_n=10, color=green_gradient)
-            st.plotly_chart(fig, use_container_width=True)
-
-        else:
-            st.write("No spoken language data available.")
+        show_chart("language")
 
     # Movies per genre
     with col2:
-        if "genres" in df_filtered.columns and not df_filtered["genres"].isnull().all():
-            genre_exploded = df_filtered.assign(
-                Genre_List=df_filtered["genres"].str.split(", ")
-            ).explode("Genre_List")
-
-            genre_counts = genre_exploded["Genre_List"].value_counts().reset_index()
-            genre_counts.columns = ["Genre", "Count"]
-
-            fig = plot_bar(genre_counts, x_col="Count", y_col="Genre", orientation="h"
-                           , title="Top 10 Genres", top_n=10, color=green_gradient)
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.write("No genre data available.")
+        show_chart("genre")
 
     # -----------------------------
     # Cast and Crew
@@ -242,113 +258,208 @@ def run_dashboard():
     col1, col2 = st.columns(2)
 
     # Most common directors
+    # (films with multiple directors count once for each director, same for the other roles)
     with col1:
-        if "directors" in df_filtered.columns and not df_filtered["directors"].isnull().all():
-            # Store all directors in separate rows if film has multiple directors
-            directors_exploded = df_filtered.assign(
-                Director_List=df_filtered["directors"].str.split(", ")
-            ).explode("Director_List")
-
-            director_counts = directors_exploded["Director_List"].value_counts().reset_index()
-            director_counts.columns = ["Director", "Count"]
-
-            fig = plot_bar(director_counts, x_col="Count", y_col="Director", orientation="h"
-                           , top_n = 10, title="Top 10 Directors", color=blue_gradient)
-            st.plotly_chart(fig, use_container_width=True)
-
-        else:
-            st.write("No director data available.")
+        show_chart("director")
 
     # Most common actors
     with col2:
-        if "actors" in df_filtered.columns and not df_filtered["actors"].isnull().all():
-            # Store all actors in separate rows
-            actors_exploded = df_filtered.assign(
-                Actor_List=df_filtered["actors"].str.split(", ")
-            ).explode("Actor_List")
-
-            actors_counts = actors_exploded["Actor_List"].value_counts().reset_index()
-            actors_counts.columns = ["Actor", "Count"]
-
-            fig = plot_bar(actors_counts, x_col="Count", y_col="Actor", orientation="h"
-                           , title="Top 10 Actors", top_n=10, color=green_gradient)
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.write("No actor data available.")
+        show_chart("actor")
 
     # create two columns
     col1, col2 = st.columns(2)
 
     # Most common screenwriters
     with col1:
-        if "screenwriters" in df_filtered.columns and not df_filtered["screenwriters"].isnull().all():
-            # Store all screenwriters in separate rows if film has multiple screenwriters
-            screenwriters_exploded = df_filtered.assign(
-                Screenwriter_List=df_filtered["screenwriters"].str.split(", ")
-            ).explode("Screenwriter_List")
-
-            screenwriter_counts = screenwriters_exploded["Screenwriter_List"].value_counts().reset_index()
-            screenwriter_counts.columns = ["Screenwriter", "Count"]
-
-            fig = plot_bar(screenwriter_counts, x_col="Count", y_col="Screenwriter", orientation="h"
-                           , top_n = 10, title="Top 10 Screenwriters", color=blue_gradient)
-            st.plotly_chart(fig, use_container_width=True)
-
-        else:
-            st.write("No screenwriter data available.")
+        show_chart("screenwriter")
 
     # Most common cinematographers
     with col2:
-        if "cinematographers" in df_filtered.columns and not df_filtered["cinematographers"].isnull().all():
-            # Store all cinematographers in separate rows if film has multiple cinematographers
-            cinematographers_exploded = df_filtered.assign(
-                Cinematographer_List=df_filtered["cinematographers"].str.split(", ")
-            ).explode("Cinematographer_List")
+        show_chart("cinematographer")
 
-            cinematographer_counts = cinematographers_exploded["Cinematographer_List"].value_counts().reset_index()
-            cinematographer_counts.columns = ["Cinematographer", "Count"]
 
-            fig = plot_bar(cinematographer_counts, x_col="Count", y_col="Cinematographer", orientation="h"
-                           , title="Top 10 Cinematographers", top_n=10, color=green_gradient)
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.write("No cinematographer data available.")
+    # -----------------------------
+    # Collaborations
+    # -----------------------------
+    st.header("Collaborations")
+    with span("collab index", "load"):
+        collab_pairs = get_collab_index(snapshot)
+
+    if collab_pairs:
+        col1, col2 = st.columns(2)
+
+        # Pairs that worked together on the most films
+        with col1:
+            pair_name = st.selectbox("Roles:", options=list(collab_pairs),
+                                     format_func=lambda name: name.replace("-", " & ").title())
+            _, _, label_a, label_b = COLLAB_PAIRS[pair_name]
+            with span(f"top pairs {pair_name}", "aggregate"):
+                top_pairs = collab_pairs[pair_name].top_pairs(mask, k=10, label_a=label_a, label_b=label_b)
+            if not top_pairs.empty:
+                top_pairs["Pair"] = top_pairs[label_a] + " & " + top_pairs[label_b]
+                fig = plot_bar(top_pairs, x_col="Count", y_col="Pair", orientation="h",
+                               title=f"Top 10 {label_a} & {label_b} Pairs", top_n=10, color=ORANGE_GRADIENT)
+                with span("chart top pairs", "render"):
+                    st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.write("No collaboration data available.")
+
+        # Frequent collaborators of one person
+        with col2:
+            person = st.selectbox(f"Frequent collaborators of ({label_a} or {label_b}):",
+                                  options=[""] + sorted(set(top_pairs[label_a]) | set(top_pairs[label_b])),
+                                  accept_new_options=True)
+            if person:
+                with span("collaborators", "aggregate"):
+                    collaborators = collab_pairs[pair_name].collaborators(person, mask, k=10)
+                if collaborators.empty:
+                    st.write(f"No {label_a.lower()} & {label_b.lower()} collaborations found for {person}.")
+                else:
+                    st.dataframe(collaborators.drop(columns="Side"), hide_index=True)
 
+    else:
+        st.write("No collaboration data available.")
 
     # -----------------------------
     # Movies per country
     # -----------------------------
 
-    if "main_country" in df_filtered.columns and not df_filtered["main_country"].isnull().all():
+    country_counts = value_counts(CHARTS["country"]["column"])
+    if not country_counts.empty:
         st.header("Movies by Country")
 
         col1, col2 = st.columns([1, 2])
         # Horizontal bar chart
-        country_counts = df_filtered["main_country"].value_counts().reset_index()
-        country_counts.columns = ["Country", "Count"]
-
-        with col1:
-            fig = plot_bar(country_counts, x_col="Count", y_col="Country", orientation="h",
-                           title="Movies per Main Production Country", top_n=10, color=orange_gradient)
-            st.plotly_chart(fig, use_container_width=True)
+        with col1, span("chart country", "render"):
+            st.plotly_chart(build_chart("country", country_counts), use_container_width=True)
 
         # World map choropleth
-        with col2:
-            fig_map =  plot_map(country_counts,
-                                country_col="Country",
-                                y_col="Count",
-                                title="Number of Movies per Main Production Country",
-                                color=orange_gradient)
-            st.plotly_chart(fig_map, use_container_width=True)
+        with col2, span("chart country map", "render"):
+            st.plotly_chart(build_country_map(country_counts), use_container_width=True)
 
     else:
-        st.write("No country data available.")
+        st.write(CHARTS["country"]["empty_message"])
 
     # -----------------------------
     # Movies table
     # -----------------------------
     st.header("Watched Movies")
-    st.dataframe(df_filtered)
+    # the long cast and crew texts are only read from the file when they are shown
+    show_people = st.checkbox("Show cast and crew columns", value=False)
+    # posters are served from the local thumbnail cache (scripts/fetch_posters.py), never from TMDb
+    show_posters = st.checkbox("Show posters", value=False)
+    if show_posters:
+        with span("poster grid", "render"):
+            show_poster_grid(df[mask])
+    with span("movies table", "render", rows=int(mask.sum())):
+        table_df = (snapshot.frame(snapshot.columns) if show_people else df)[mask]
+        column_config = None
+        if show_posters and len(table_df) <= TABLE_POSTER_ROWS:
+            cache = AssetCache()
+            table_df = table_df.assign(poster=[cache.data_uri("poster", i) for i in table_df["tmdb_id"]])
+            table_df = table_df[["poster"] + [c for c in table_df.columns if c != "poster"]]
+            column_config = {"poster": st.column_config.ImageColumn("Poster", width="small")}
+        elif show_posters:
+            st.caption(f"Posters are shown in the table for up to {TABLE_POSTER_ROWS} films, filter to see them.")
+        table = st.dataframe(table_df, column_config=column_config, on_select="rerun",
+                             selection_mode="single-row", key="movies_table")
+
+    # -----------------------------
+    # More like this
+    # -----------------------------
+    selected = table.selection.rows if table else []
+    # the table keeps its selection across reruns: a narrower filter may leave it past the last film
+    if selected and selected[0] < mask.sum():
+        row = int(np.flatnonzero(mask)[selected[0]])
+        st.subheader(f"More like {df['title'].iloc[row]}")
+        with span("similar films", "aggregate"):
+            similar = similar_films(snapshot, row)
+        if similar is None and "tmdb_id" in df.columns and similar_index_state(df["tmdb_id"].to_numpy()) == "stale":
+            rebuilt = "The background refresh rebuilds it soon, or run" if background else "Run"
+            st.write(f"The similar films index is from before the last change of the films. "
+                     f"{rebuilt} scripts/prepare_df.py to rebuild it.")
+        elif similar is None:
+            st.write("No similar films index found. Run scripts/prepare_df.py to build it.")
+        elif similar.empty:
+            st.write("No similar films found.")
+        else:
+            st.dataframe(similar, hide_index=True)
+    else:
+        st.caption("Select a film in the table to see similar films.")
+
+    # -----------------------------
+    # Debug panel
+    # -----------------------------
+    if tracer:
+        tracer.stop()
+        show_trace(tracer)
+        start_trace(None)
+
+
+def show_poster_grid(films):
+    """The cached posters of the first `POSTER_GRID_SIZE` films, in rows of `POSTER_GRID_COLUMNS`."""
+    cache = AssetCache()
+    posters = []
+    for tmdb_id, title in zip(films["tmdb_id"], films["title"]):
+        path = cache.get("poster", tmdb_id)
+        if path is not None:
+            posters.append((str(path), title))
+            if len(posters) == POSTER_GRID_SIZE:
+                break
+    if not posters:
+        st.caption("No posters cached for these films yet. Run scripts/fetch_posters.py to download them.")
+        return
+    for start in range(0, len(posters), POSTER_GRID_COLUMNS):
+        for col, (path, title) in zip(st.columns(POSTER_GRID_COLUMNS), posters[start:start + POSTER_GRID_COLUMNS]):
+            col.image(path, caption=title, width="stretch")
+
+
+def _ago(moment):
+    seconds = (datetime.now() - moment).total_seconds()
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f} min ago"
+    if seconds < 86400:
+        return f"{seconds // 3600:.0f} h ago"
+    return f"{seconds // 86400:.0f} days ago"
+
+
+def show_freshness(dataset, snapshot, background):
+    """Data version and age in the sidebar, and the state of the background refresh."""
+    st.sidebar.caption(f"Data version `{snapshot.version}` · {len(snapshot)} films · loaded {_ago(snapshot.loaded_at)}")
+    if dataset.last_error is not None:
+        st.sidebar.caption(f"⚠️ Could not load the latest data, showing the last good version: {dataset.last_error}")
+    if background is None:
+        return
+    if background.running:
+        st.sidebar.caption("🔄 Refreshing in the background, the new version appears on the next interaction")
+    elif background.last_error is not None:
+        st.sidebar.caption(f"⚠️ Last refresh failed {_ago(background.last_finished)}: {background.last_error}")
+    elif background.last_finished is not None:
+        summary = background.last_summary or {}
+        st.sidebar.caption(f"Checked for new films {_ago(background.last_finished)} "
+                           f"(+{summary.get('added', 0)} / -{summary.get('removed', 0)})")
+    if not background.running and st.sidebar.button("Refresh now"):
+        background.request()
+
+
+def show_trace(tracer):
+    """Show the spans of this run in the sidebar and append them to the trace log."""
+    with st.sidebar.expander("🛠 Debug", expanded=True):
+        st.write(f"Run took {tracer.total_ms:.0f} ms")
+        spans = pd.DataFrame(tracer.spans)
+        if not spans.empty:
+            spans["name"] = ["  " * depth + name for name, depth in zip(spans["name"], spans["depth"])]
+            st.dataframe(spans.drop(columns="depth"), hide_index=True)
+            st.caption("Time per stage: " + ", ".join(
+                f"{stage} {ms:.0f} ms" for stage, ms in
+                spans[spans["depth"] == 0].groupby("stage", sort=False)["ms"].sum().items()
+            ))
+        try:
+            tracer.write()
+        except OSError as e:
+            st.caption(f"Could not write the trace log: {e}")
 
 # -----------------------------
 # Optional: test dashboard locally
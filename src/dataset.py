@@ -0,0 +1,400 @@
+import hashlib
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DATA_PROCESSED_DIR = ROOT_DIR / "data" / "processed"
+
+MOVIE_DATA_FILE = DATA_PROCESSED_DIR / "final_movies.csv"
+
+# Columns that hold one value per film
+SINGLE_VALUE_COLUMNS = ["year", "decade", "main_country", "main_language"]
+
+# Columns that hold a comma-separated list of values per film
+MULTI_VALUE_COLUMNS = ["genres", "directors", "actors", "screenwriters", "cinematographers"]
+
+# Compact dtypes of the processed columns (others are read as strings/objects)
+COLUMN_DTYPES = {
+    "tmdb_id": "int64",
+    "year": "Int64",
+    "runtime": "Int64",
+    "decade": "category",
+    "main_country": "category",
+    "main_language": "category",
+}
+
+# Long text columns, only read from the file when a section needs them (see `Snapshot.column`).
+# The people columns are mostly needed as a `ValueIndex`, which is much smaller than their text.
+LAZY_COLUMNS = ["actors", "directors", "screenwriters", "cinematographers", "spoken_languages",
+                "production_countries", "poster_path", "backdrop_path"]
+
+# Seconds between two checks of the processed file for changes
+POLL_INTERVAL = 2.0
+
+# -----------------------------
+# Indexes
+# -----------------------------
+
+class ValueIndex:
+    """
+    Flat index of the values in one column of the movie frame.
+
+    Every (film, value) pair is stored as two aligned integer arrays: `rows` holds the
+    position of the film in the frame, `codes` the position of the value in `labels`.
+    Comma-separated columns (genres, actors, ...) get one entry per listed value,
+    so counting under a filter is a single `np.bincount` instead of an `explode`.
+    Entries are sorted by row, so the entries of a few films can be found without a scan.
+    """
+
+    def __init__(self, labels, codes, rows, n_rows):
+        self.labels = labels
+        self.codes = codes
+        self.rows = rows
+        self.n_rows = n_rows
+        self._offsets = None  # row -> first entry, built on first use by `counts_of_rows`
+        for arr in (self.labels, self.codes, self.rows):
+            arr.flags.writeable = False  # shared between sessions: read-only
+
+    @classmethod
+    def from_series(cls, series, sep=None):
+        """
+        Build the index for a column.
+
+        Args:
+            series (pd.Series): Column of the movie frame.
+            sep (str, optional): Separator for comma-separated columns. None for single-value columns.
+        """
+        values = series.reset_index(drop=True).dropna()
+        if sep is not None:
+            values = values.astype(str).str.split(sep).explode().str.strip()
+            values = values[values != ""]
+
+        codes, labels = pd.factorize(values, sort=True)
+        return cls(
+            labels=np.asarray(labels),
+            codes=codes.astype(np.int32),
+            rows=values.index.to_numpy(dtype=np.int32),
+            n_rows=len(series),
+        )
+
+    @classmethod
+    def concat(cls, parts):
+        """
+        Index of the frames of `parts` stacked in order (e.g. shards of the movie frame), without
+        reading the column again: same result as `from_series` on the stacked column.
+        """
+        # codes of every part's labels among all labels, sorted like `from_series`: the merged labels
+        # are in the same order as for the whole column, so the sharded build writes identical indexes
+        merged, labels = pd.factorize(np.concatenate([part.labels for part in parts]), sort=True)
+        ends = np.cumsum([len(part.labels) for part in parts])
+        remaps = np.split(merged.astype(np.int32), ends[:-1])
+        starts = np.cumsum([0] + [part.n_rows for part in parts])
+        codes = [remap[part.codes] for part, remap in zip(parts, remaps)]
+        rows = [part.rows.astype(np.int32) + start for part, start in zip(parts, starts)]
+        return cls(
+            labels=np.asarray(labels),
+            codes=np.concatenate(codes).astype(np.int32),
+            rows=np.concatenate(rows).astype(np.int32),
+            n_rows=int(starts[-1]),
+        )
+
+    def counts(self, mask=None):
+        """Number of films per label, optionally restricted to the rows where `mask` is True."""
+        codes = self.codes if mask is None else self.codes[mask[self.rows]]
+        return np.bincount(codes, minlength=len(self.labels))
+
+    def counts_of_rows(self, rows):
+        """Number of films per label among the films at positions `rows` (sorted, unique)."""
+        if self._offsets is None:
+            offsets = np.searchsorted(self.rows, np.arange(self.n_rows + 1)).astype(self.rows.dtype)
+            offsets.flags.writeable = False
+            self._offsets = offsets  # the same for every thread that builds it: no lock needed
+        starts, stops = self._offsets[rows], self._offsets[np.asarray(rows) + 1]
+        lengths = stops - starts
+        # positions of all entries of the rows: starts repeated per entry plus 0, 1, 2, ...
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.codes[entries], minlength=len(self.labels))
+
+    def value_counts(self, mask=None):
+        """Same output as `pd.Series.value_counts()` on the (exploded) column."""
+        return self.counts_to_series(self.counts(mask))
+
+    def counts_to_series(self, counts, top=None):
+        """
+        `value_counts` output from counts per label (as returned by `counts`), or only its
+        first `top` rows, without sorting all labels (e.g. 10 of 100,000 actors).
+        """
+        labels = self.labels
+        if top is not None and len(counts) > top:
+            # candidates: every label counted at least as often as the top-th largest count,
+            # so ties are broken by label order exactly like the full stable sort
+            threshold = max(np.partition(counts, len(counts) - top)[len(counts) - top], 1)
+            keep = np.flatnonzero(counts >= threshold)
+            counts, labels = counts[keep], labels[keep]
+        result = pd.Series(counts, index=labels, name="count")
+        result = result[result > 0]
+        result = result.sort_values(ascending=False, kind="stable")
+        return result if top is None else result.head(top)
+
+    def rows_with(self, values):
+        """Boolean row mask of the films that have at least one of `values`."""
+        wanted = np.isin(self.labels, list(values))
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows[wanted[self.codes]]] = True
+        return mask
+
+
+# -----------------------------
+# Snapshot
+# -----------------------------
+
+class Snapshot:
+    """
+    Read-only view of one version of the processed movie data.
+
+    Holds the frame, a `ValueIndex` per filter/chart column and the unfiltered counts
+    per column. One snapshot is shared by all sessions of the process, so nothing may
+    modify it: filter with boolean masks instead of copying or changing the frame.
+
+    `df` may leave out columns of the file (`columns`): they are read on first use by
+    `column`, `frame` and `index`, so a process only holds the text it actually shows.
+    """
+
+    def __init__(self, df, version, path=None, columns=None, signature=None, indexes=None):
+        self.df = df
+        self.version = version
+        self.path = path
+        self.columns = list(columns) if columns is not None else list(df.columns)
+        self.signature = signature
+        self.loaded_at = datetime.now()
+
+        # indexes and aggregates of the full library (used when no filter is active),
+        # built (or taken from `indexes`) for the loaded columns now and for lazy columns on first use
+        self.indexes = {}
+        self.totals = {}
+        for col in SINGLE_VALUE_COLUMNS + MULTI_VALUE_COLUMNS:
+            if indexes and col in indexes:
+                self._set_index(col, indexes[col])
+            elif col in df.columns:
+                self._add_index(col, df[col])
+
+        # derived structures that are only built when first needed, see `cached`
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._build_locks = {}  # one lock per structure, so different ones can be built concurrently
+
+    def __len__(self):
+        return len(self.df)
+
+    def _add_index(self, col, series):
+        return self._set_index(col, ValueIndex.from_series(series, sep=", " if col in MULTI_VALUE_COLUMNS else None))
+
+    def _set_index(self, col, index):
+        self.totals[col] = index.value_counts()
+        self.indexes[col] = index
+        return index
+
+    def has_column(self, column):
+        return column in self.columns
+
+    def column(self, column):
+        """A column of the films, read from the file on first use if it is not in `df`."""
+        if column in self.df.columns:
+            return self.df[column]
+        if column not in self.columns:
+            raise KeyError(column)
+        return self.cached(f"column:{column}", lambda snapshot: snapshot._read_column(column))
+
+    def frame(self, columns):
+        """Frame of the given columns (missing ones are skipped), loading lazy columns as needed."""
+        columns = [c for c in columns if c in self.columns]
+        return pd.DataFrame({c: self.column(c) for c in columns}, index=self.df.index, columns=columns)
+
+    def index(self, column):
+        """The `ValueIndex` of a filter/chart column, or None if the file does not have it."""
+        if column in self.indexes:
+            return self.indexes[column]
+        if column not in self.columns or column not in SINGLE_VALUE_COLUMNS + MULTI_VALUE_COLUMNS:
+            return None
+
+        return self.cached(f"index:{column}", lambda snapshot: snapshot._load_index(column))
+
+    def total(self, column):
+        """Unfiltered value counts of a filter/chart column."""
+        return self.totals[column] if self.index(column) is not None else None
+
+    def _load_index(self, column):
+        # read the text only for the index if no section needs the column itself
+        loaded = self._cache.get(f"column:{column}")
+        return self._add_index(column, loaded if loaded is not None else self._read_column(column))
+
+    def _read_column(self, column):
+        """Read one column of this snapshot's file, aligned with `df` by tmdb_id if the file changed since."""
+        data = pd.read_csv(self.path, usecols=["tmdb_id", column], dtype=COLUMN_DTYPES)
+        series = data[column]
+        if file_signature(self.path) != self.signature or len(data) != len(self.df):
+            # a newer file is about to be swapped in: keep this snapshot consistent meanwhile
+            series = series.groupby(data["tmdb_id"].to_numpy()).first().reindex(self.df["tmdb_id"].to_numpy())
+        return pd.Series(series.to_numpy(), index=self.df.index, name=column)
+
+    def cached(self, name, build):
+        """
+        Return the structure `name` derived from this snapshot, building it with
+        `build(snapshot)` on first use. Built once per snapshot and shared by all sessions.
+        """
+        if name not in self._cache:
+            with self._cache_lock:
+                lock = self._build_locks.setdefault(name, threading.RLock())
+            with lock:  # reentrant: builds may use other cached structures
+                if name not in self._cache:
+                    self._cache[name] = build(self)
+        return self._cache[name]
+
+    def options(self, column):
+        """Sorted distinct values of a column, for the sidebar filters."""
+        index = self.index(column)
+        if index is None:
+            return []
+        return index.labels.tolist()
+
+
+def file_signature(path):
+    """Modification time and size of a file, or None if it does not exist."""
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def dataset_signature(path=MOVIE_DATA_FILE):
+    """Signature of a processed file and of the pointer to its published Arrow snapshot, to detect changes."""
+    from src.arrow_snapshot import current_pointer
+
+    return file_signature(path), file_signature(current_pointer(path))
+
+
+def load_snapshot(path=MOVIE_DATA_FILE, lazy_columns=LAZY_COLUMNS):
+    """
+    Read the processed movie CSV with compact dtypes and build its indexes.
+    `lazy_columns` are left out of the frame and read when first needed.
+
+    If prepare_df.py published an Arrow snapshot of this version of the file, it is
+    memory-mapped instead (see src/arrow_snapshot.py): no parsing, and the pages are
+    shared by all processes that serve the dashboard.
+    """
+    from src.arrow_snapshot import current_snapshot_dir, load_arrow_snapshot
+
+    published = current_snapshot_dir(path)
+    if published is not None:
+        try:
+            return load_arrow_snapshot(published, path, lazy_columns)
+        except Exception as e:  # e.g. pruned by a newer publish meanwhile: the CSV is still there
+            print(f"⚠️ Could not open the Arrow snapshot {published.name}, reading {Path(path).name}: {e}")
+
+    signature = file_signature(path)
+    columns = pd.read_csv(path, nrows=0).columns.tolist()
+    if "tmdb_id" not in columns:
+        lazy_columns = ()  # lazy columns are aligned by tmdb_id
+    df = pd.read_csv(path, usecols=[c for c in columns if c not in lazy_columns], dtype=COLUMN_DTYPES)
+
+    # Clean data after loading
+    if "genres" in df.columns:
+        df["genres"] = df["genres"].fillna("").astype(str)
+
+    version = hashlib.sha1(repr(signature).encode()).hexdigest()[:12]
+    return Snapshot(df, version=version, path=Path(path), columns=columns, signature=signature)
+
+
+# -----------------------------
+# Shared dataset
+# -----------------------------
+
+class SharedDataset:
+    """
+    Process-wide holder of the current `Snapshot` of a processed movie file.
+
+    A daemon thread polls the file (and the pointer to its published Arrow snapshot) and,
+    once a change has settled, loads a new snapshot
+    next to the old one and swaps the reference. Sessions keep the snapshot they started
+    a rerun with, so a reload never blocks them or changes data under their feet; the
+    old snapshot is freed once the last session drops it.
+    """
+
+    def __init__(self, path=MOVIE_DATA_FILE, poll_interval=POLL_INTERVAL):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self.last_error = None
+
+        self._signature = dataset_signature(self.path)
+        self._snapshot = load_snapshot(self.path)
+        self._reload_lock = threading.Lock()  # the watcher and a background refresh may both reload
+
+        self._thread = threading.Thread(target=self._watch, name="dataset-watcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def snapshot(self):
+        """The most recently loaded snapshot."""
+        return self._snapshot
+
+    def reload(self):
+        """Load the file again and swap in the new snapshot. Keeps the old one on failure."""
+        with self._reload_lock:
+            signature = dataset_signature(self.path)
+            try:
+                snapshot = load_snapshot(self.path)
+            except Exception as e:
+                self.last_error = e
+                print(f"⚠️ Could not reload {self.path.name}, keeping version {self._snapshot.version}: {e}")
+                return False
+
+            self._signature = signature
+            self._snapshot = snapshot  # a single reference assignment: atomic for readers
+            self.last_error = None
+        print(f"🔄 Reloaded {self.path.name} (version {snapshot.version}, {len(snapshot)} movies)")
+        return True
+
+    def reload_if_changed(self):
+        """Reload right away if the file changed, instead of waiting for the watcher to notice."""
+        signature = dataset_signature(self.path)
+        if signature[0] is None or signature == self._signature:
+            return False
+        return self.reload()
+
+    def _watch(self):
+        pending = None
+        while True:
+            time.sleep(self.poll_interval)
+            signature = dataset_signature(self.path)
+            if signature[0] is None or signature == self._signature:
+                pending = None
+                continue
+            # only reload once the file stopped changing, to skip half-written files
+            if signature == pending:
+                self.reload()
+                pending = None
+            else:
+                pending = signature
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_dataset(path=MOVIE_DATA_FILE):
+    """Return the process-wide `SharedDataset` for `path`, creating it on first use."""
+    key = Path(path).resolve()
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = SharedDataset(key)
+        return _shared[key]
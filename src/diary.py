@@ -0,0 +1,185 @@
+import io
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from src.dataset import file_signature
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT_DIR / "data"
+
+# Watch-event log: one row per viewing, with at least the columns `watched_date` and `tmdb_id`.
+# New viewings are appended at the end of the file.
+DIARY_FILE = DATA_DIR / "raw" / "diary.csv"
+ROLLUP_FILE = DATA_DIR / "processed" / "diary_rollups.json"
+TMDB_DATA_FILE = DATA_DIR / "cache" / "tmdb_data.csv"
+
+# Time buckets of the rollups, from fine to coarse
+GRAINS = ["day", "week", "month", "year"]
+
+# Bytes of the log parsed at once
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# -----------------------------
+# Rollups
+# -----------------------------
+
+def empty_state():
+    return {
+        "offset": 0,            # bytes of the log that are already counted
+        "header": None,         # header line of the log, to detect a rewritten file
+        "events": 0,
+        "unmatched_ids": [],    # watched films that are missing from the TMDb cache
+        "rollups": {grain: {} for grain in GRAINS},
+    }
+
+
+def load_state(path=ROLLUP_FILE):
+    if not Path(path).exists():
+        return empty_state()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state, path=ROLLUP_FILE):
+    """Write the rollups via a temporary file, so readers never see a half-written file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _bucket_keys(days):
+    """Map a DatetimeIndex of days to the label of their day, week, month and year."""
+    week_start = days - pd.to_timedelta(days.weekday, unit="D")  # weeks start on Monday
+    return {
+        "day": days.strftime("%Y-%m-%d"),
+        "week": week_start.strftime("%Y-%m-%d"),
+        "month": days.strftime("%Y-%m"),
+        "year": days.strftime("%Y"),
+    }
+
+
+def add_events(state, events, runtimes):
+    """
+    Add a block of watch events to the rollups in `state`.
+
+    Args:
+        state (dict): Rollup state from `load_state`.
+        events (pd.DataFrame): Columns `watched_date` and `tmdb_id`.
+        runtimes (pd.Series): Runtime in minutes per tmdb_id, from the TMDb cache.
+    """
+    dates = pd.to_datetime(events["watched_date"], errors="coerce")
+    ids = pd.to_numeric(events["tmdb_id"], errors="coerce")
+    valid = dates.notna() & ids.notna()
+    dates, ids = dates[valid], ids[valid].astype("int64")
+
+    # join with the TMDb cache by tmdb_id
+    minutes = ids.map(runtimes)
+    unmatched = set(ids[~ids.isin(runtimes.index)].unique().tolist())
+    if unmatched:
+        state["unmatched_ids"] = sorted(unmatched.union(state["unmatched_ids"]))
+
+    # aggregate the block per day first: every coarser bucket is built from those few rows
+    per_day = (
+        pd.DataFrame({"day": dates.dt.normalize(), "minutes": minutes.fillna(0)})
+        .groupby("day")["minutes"]
+        .agg(["size", "sum"])
+    )
+    keys = _bucket_keys(per_day.index)
+    for grain in GRAINS:
+        block = per_day.groupby(keys[grain]).sum()
+        rollup = state["rollups"][grain]
+        for key, films, total_minutes in zip(block.index, block["size"], block["sum"]):
+            films_before, minutes_before = rollup.get(key, (0, 0))
+            rollup[key] = (films_before + int(films), minutes_before + int(total_minutes))
+
+    state["events"] += int(valid.sum())
+
+
+def update_rollups(diary_path=DIARY_FILE, tmdb_data_path=TMDB_DATA_FILE, state_path=ROLLUP_FILE,
+                   block_size=BLOCK_SIZE):
+    """
+    Count the new lines of the watch-event log into the stored rollups.
+
+    Only the bytes after the last processed offset are read, in blocks, so appending
+    events costs time proportional to the new events. If the log was rewritten (shorter
+    than before, or a different header) the rollups are rebuilt from scratch.
+
+    Returns:
+        dict: The updated state.
+    """
+    diary_path = Path(diary_path)
+    state = load_state(state_path)
+
+    runtimes = pd.Series(dtype="float64")
+    if Path(tmdb_data_path).exists():
+        cache = pd.read_csv(tmdb_data_path, usecols=["tmdb_id", "runtime"]).dropna(subset=["tmdb_id"])
+        cache = cache.drop_duplicates("tmdb_id", keep="last")  # repairs are appended
+        runtimes = pd.Series(cache["runtime"].to_numpy(), index=cache["tmdb_id"].astype("int64"))
+
+    with open(diary_path, "rb") as f:
+        header = f.readline()
+        size = os.fstat(f.fileno()).st_size
+        if state["header"] != header.decode("utf-8") or state["offset"] > size:
+            state = empty_state()
+            state["header"] = header.decode("utf-8")
+            state["offset"] = len(header)
+
+        # earlier unmatched films may be in the cache by now
+        state["unmatched_ids"] = [i for i in state["unmatched_ids"] if i not in runtimes.index]
+
+        f.seek(state["offset"])
+        remainder = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            block = remainder + block
+            # only parse complete lines; the rest waits for the next block (or the next run)
+            end = block.rfind(b"\n") + 1
+            block, remainder = block[:end], block[end:]
+            if block:
+                events = pd.read_csv(io.BytesIO(header + block), usecols=["watched_date", "tmdb_id"])
+                add_events(state, events, runtimes)
+                state["offset"] += len(block)
+
+    save_state(state, state_path)
+    return state
+
+
+def rollup_frames(state):
+    """The rollups of `state` as one frame per grain with the columns Period, Count and Minutes."""
+    rollups = {}
+    for grain in GRAINS:
+        rollup = state["rollups"].get(grain, {})
+        rollups[grain] = pd.DataFrame(
+            [(key, films, minutes) for key, (films, minutes) in sorted(rollup.items())],
+            columns=["Period", "Count", "Minutes"],
+        )
+    return rollups
+
+
+@lru_cache(maxsize=4)
+def _load_rollups(path, signature):
+    state = load_state(path)
+    return state["events"], rollup_frames(state)
+
+
+def load_rollups(path=ROLLUP_FILE):
+    """
+    Read the stored rollups as one frame per grain with the columns Period, Count and Minutes.
+    The result is cached until the file changes. Returns (0, {}) if there are no rollups yet.
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return 0, {}
+    return _load_rollups(Path(path), signature)
@@ -0,0 +1,277 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+from src.search import get_search_index
+
+# -----------------------------
+# Constants
+# -----------------------------
+# Columns that can be counted, by the name used in the API
+COUNT_COLUMNS = {
+    "year": "year",
+    "decade": "decade",
+    "country": "main_country",
+    "language": "main_language",
+    "genre": "genres",
+}
+
+# Cast and crew columns
+ROLE_COLUMNS = {
+    "director": "directors",
+    "actor": "actors",
+    "screenwriter": "screenwriters",
+    "cinematographer": "cinematographers",
+}
+
+# Columns returned by default in movie listings
+LISTING_COLUMNS = ["tmdb_id", "title", "year", "decade", "main_country", "main_language", "genres", "runtime"]
+
+# Above this share of films entering or leaving the filter, counting from scratch is cheaper than the delta
+DELTA_MAX_SHARE = 0.25
+
+# Threads counting independent columns at once, shared by all sessions of the process so
+# concurrent reruns do not oversubscribe the CPUs. With one CPU the columns are counted inline.
+AGGREGATION_WORKERS = min(8, os.cpu_count() or 1)
+
+# -----------------------------
+# Filters
+# -----------------------------
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """
+    The sidebar filters of the dashboard, independent of Streamlit.
+
+    Empty tuples and "All" mean the filter is not applied.
+    """
+    countries: tuple = ()
+    usa: str = "All"            # "All", "USA" or "Non-USA"
+    decades: tuple = ()
+    languages: tuple = ()
+    english: str = "All"        # "All", "English" or "Non-English"
+    genres: tuple = ()
+    search: str = ""            # free text, matched against titles and people
+
+    @classmethod
+    def from_query(cls, query):
+        """
+        Build a filter from URL query parameters, as returned by `urllib.parse.parse_qs`.
+        List filters accept repeated parameters: `?country=France&country=Italy`.
+        """
+        def values(name):
+            return tuple(sorted(v for v in query.get(name, []) if v))
+
+        def choice(name, options):
+            value = query.get(name, ["All"])[-1]
+            if value not in options:
+                raise ValueError(f"Invalid value for '{name}': {value!r} (expected one of {options})")
+            return value
+
+        return cls(
+            countries=values("country"),
+            usa=choice("usa", ("All", "USA", "Non-USA")),
+            decades=values("decade"),
+            languages=values("language"),
+            english=choice("english", ("All", "English", "Non-English")),
+            genres=values("genre"),
+            search=query.get("q", [""])[-1].strip(),
+        )
+
+    def is_empty(self):
+        return self == FilterSpec()
+
+    def to_key(self):
+        """Canonical string for the filter, used in cache keys."""
+        return "&".join(f"{f.name}={getattr(self, f.name)}" for f in fields(self))
+
+
+def _filter_index(snapshot, column):
+    """The `ValueIndex` of a filter column; ValueError if the movie data does not have the column."""
+    index = snapshot.index(column)
+    if index is None:
+        raise ValueError(f"Cannot filter on '{column}': the movie data has no such column")
+    return index
+
+
+def _filter_column(snapshot, column):
+    if not snapshot.has_column(column):
+        raise ValueError(f"Cannot filter on '{column}': the movie data has no such column")
+    return snapshot.column(column)
+
+
+def filter_mask(snapshot, spec):
+    """
+    Boolean row mask of the films in `snapshot` that pass the filter `spec`.
+    Raises ValueError if a filter is applied to a column the movie data does not have.
+    """
+    mask = np.ones(len(snapshot), dtype=bool)
+
+    # Country filter
+    if spec.countries:
+        mask &= _filter_index(snapshot, "main_country").rows_with(spec.countries)
+
+    # USA filter
+    if spec.usa != "All":
+        country = _filter_column(snapshot, "main_country")
+        is_usa = country.str.contains("United States of America", case=False, na=False).to_numpy()
+        mask &= is_usa if spec.usa == "USA" else ~is_usa
+
+    # Decade filter
+    if spec.decades:
+        mask &= _filter_index(snapshot, "decade").rows_with(spec.decades)
+
+    # main languages (handle multiple)
+    if spec.languages:
+        mask &= _filter_index(snapshot, "main_language").rows_with(spec.languages)
+
+    # English language filter
+    if spec.english != "All":
+        language = _filter_column(snapshot, "main_language")
+        is_english = language.str.contains("English", case=False, na=False).to_numpy()
+        mask &= is_english if spec.english == "English" else ~is_english
+
+    # Genre filter (handle multiple genres per movie)
+    if spec.genres:
+        mask &= _filter_index(snapshot, "genres").rows_with(spec.genres)
+
+    # Search on titles and people
+    if spec.search:
+        mask &= get_search_index(snapshot).rows_mask(spec.search)
+
+    return mask
+
+# -----------------------------
+# Aggregations
+# -----------------------------
+
+def value_counts(snapshot, column, mask):
+    """
+    Number of filtered films per value of `column`, largest first.
+    Comma-separated columns count a film once for every listed value.
+    Returns an empty Series if the column is missing.
+    """
+    index = snapshot.index(column)
+    if index is None:
+        return pd.Series(dtype="int64", name="count")
+    if mask.all():
+        return snapshot.total(column)
+    return index.value_counts(mask)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _aggregation_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=AGGREGATION_WORKERS, thread_name_prefix="aggregate")
+        return _pool
+
+
+def value_counts_many(snapshot, columns, mask, parallel=True):
+    """
+    `value_counts` of several columns under the same filter, as a dict by column.
+
+    The columns are independent, so they are counted concurrently: the time goes into
+    NumPy (bincount, fancy indexing) and, on first use, reading and indexing lazy columns,
+    which mostly run without the GIL. The result is complete before anything is rendered.
+    """
+    columns = list(dict.fromkeys(columns))
+    if not parallel or AGGREGATION_WORKERS < 2 or len(columns) < 2:
+        return {column: value_counts(snapshot, column, mask) for column in columns}
+    pool = _aggregation_pool()
+    futures = {column: pool.submit(value_counts, snapshot, column, mask) for column in columns}
+    return {column: future.result() for column, future in futures.items()}
+
+
+class IncrementalCounts:
+    """
+    Counts of several columns under the previous mask of one session, updated by the delta.
+
+    Each sidebar interaction usually adds or removes one filter value, so only a few films
+    enter or leave the mask: `update` finds them with the XOR of the old and new mask and
+    adds (or subtracts) only their counts, which takes time in proportion to the change
+    instead of the library. Large changes, a new snapshot or new columns count from scratch.
+    Holds no reference to the snapshot, so an idle session does not keep an old one alive.
+    """
+
+    def __init__(self, max_share=DELTA_MAX_SHARE):
+        self.max_share = max_share
+        self.version = None
+        self.mask = None
+        self.counts = {}  # column -> counts per label (array) under `mask`
+        self.last_update = None  # "full", "delta" or "unchanged", with the number of changed films
+
+    def update(self, snapshot, columns, mask, top=None):
+        """
+        `value_counts_many(snapshot, columns, mask)`, from the previous counts when possible.
+        `top` ({column: n}) keeps only the n largest counts of columns whose chart shows no more.
+        """
+        top = top or {}
+        columns = [column for column in dict.fromkeys(columns) if snapshot.index(column) is not None]
+        changed = None
+        if self.version == snapshot.version and self.mask is not None and set(columns) <= set(self.counts):
+            changed = np.flatnonzero(self.mask ^ mask)
+            if len(changed) > self.max_share * len(mask):
+                changed = None
+
+        if changed is None:
+            self.counts = _counts_many(snapshot, columns, mask)
+            self.last_update = {"mode": "full", "changed": int(mask.sum())}
+        elif len(changed):
+            entered, left = changed[mask[changed]], changed[~mask[changed]]
+            for column in columns:
+                index = snapshot.index(column)
+                delta = index.counts_of_rows(entered) - index.counts_of_rows(left)
+                self.counts[column] = self.counts[column] + delta
+            self.last_update = {"mode": "delta", "changed": len(changed)}
+        else:
+            self.last_update = {"mode": "unchanged", "changed": 0}
+
+        self.version, self.mask = snapshot.version, mask.copy()
+        if mask.all():  # no filter: the unfiltered counts are precomputed
+            return {column: snapshot.total(column) for column in columns}
+        return {column: snapshot.index(column).counts_to_series(self.counts[column], top=top.get(column))
+                for column in columns}
+
+
+def _counts_many(snapshot, columns, mask):
+    """Counts per label of several columns under `mask`, on the aggregation threads."""
+    if mask.all():
+        mask = None  # bincount of all entries, without selecting them first
+    if AGGREGATION_WORKERS < 2 or len(columns) < 2:
+        return {column: snapshot.index(column).counts(mask) for column in columns}
+    pool = _aggregation_pool()
+    futures = {column: pool.submit(snapshot.index(column).counts, mask) for column in columns}
+    return {column: future.result() for column, future in futures.items()}
+
+
+def top_n(snapshot, column, mask, n=10):
+    """The `n` most frequent values of `column` among the filtered films."""
+    return value_counts(snapshot, column, mask).head(n)
+
+
+def listing(snapshot, mask, columns=None, offset=0, limit=50):
+    """
+    Page of the filtered films.
+
+    Args:
+        snapshot (Snapshot): Data to list.
+        mask (np.ndarray): Boolean row mask from `filter_mask`.
+        columns (list, optional): Columns to return (default: `LISTING_COLUMNS`); ValueError if
+            the movie data does not have some of them.
+        offset (int): Index of the first film to return.
+        limit (int): Maximum number of films to return.
+    """
+    unknown = [c for c in columns or () if not snapshot.has_column(c)]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown} (expected some of {snapshot.columns})")
+    rows = np.flatnonzero(mask)[offset:offset + limit]
+    return snapshot.frame(columns or LISTING_COLUMNS).iloc[rows]
@@ -0,0 +1,193 @@
+import hashlib
+import html
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from src import engine
+from src.charts import CHARTS, build_chart, build_country_map
+from src.engine import FilterSpec
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+EXPORT_DIR = ROOT_DIR / "data" / "processed" / "static"
+
+# Bump when the chart layout changes, so all presets are rendered again
+EXPORT_VERSION = 1
+
+# -----------------------------
+# Presets
+# -----------------------------
+
+def default_presets(snapshot):
+    """All films, USA vs non-USA, English vs non-English, and one preset per decade."""
+    presets = {
+        "all": FilterSpec(),
+        "usa": FilterSpec(usa="USA"),
+        "non-usa": FilterSpec(usa="Non-USA"),
+        "english": FilterSpec(english="English"),
+        "non-english": FilterSpec(english="Non-English"),
+    }
+    for decade in snapshot.options("decade"):
+        # films without a year get a "<NA>s" pseudo-decade from add_decade_column: no preset for it
+        if re.fullmatch(r"\d+s", str(decade)):
+            presets[slugify(f"decade-{decade}")] = FilterSpec(decades=(decade,))
+    return presets
+
+
+def load_presets(path):
+    """
+    Read presets from a JSON file like:
+        [{"name": "french-dramas", "filters": {"country": ["France"], "genre": ["Drama"]}}]
+    Filter names and values are the same as the query parameters of the JSON API.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    presets, names = {}, {}
+    for entry in entries:
+        query = {
+            name: value if isinstance(value, list) else [value]
+            for name, value in entry.get("filters", {}).items()
+        }
+        slug = slugify(entry["name"])
+        if slug in names:
+            raise ValueError(f"Presets {names[slug]!r} and {entry['name']!r} would both be exported to '{slug}/'")
+        names[slug] = entry["name"]
+        presets[slug] = FilterSpec.from_query(query)
+    return presets
+
+
+def slugify(name):
+    """Turn a preset name into a safe directory name."""
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-") or "preset"
+
+
+def preset_folders(presets):
+    """Folder of every preset name; ValueError if two names slugify alike and would overwrite each other."""
+    folders, names = {}, {}
+    for name in presets:
+        folder = slugify(name)
+        if folder in names:
+            raise ValueError(f"Presets {names[folder]!r} and {name!r} would both be exported to '{folder}/'")
+        folders[name], names[folder] = folder, name
+    return folders
+
+# -----------------------------
+# Export
+# -----------------------------
+
+def row_hashes(snapshot):
+    """One 64-bit hash per film over all columns, to detect which presets changed."""
+    return pd.util.hash_pandas_object(snapshot.frame(snapshot.columns), index=False).to_numpy()
+
+
+def fingerprint(spec, hashes, mask):
+    """Hash of everything a preset page depends on: filter, films and export version."""
+    h = hashlib.sha1(f"{EXPORT_VERSION}|{spec.to_key()}".encode())
+    h.update(hashes[mask].tobytes())
+    return h.hexdigest()
+
+
+def render_preset(snapshot, spec, mask, out_dir, name):
+    """Write index.html, data.json and figures.json of one preset to `out_dir`."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    data = {"preset": name, "filters": spec.to_key(), "version": snapshot.version, "total": int(mask.sum())}
+    counts = {}
+    figures = {}
+    for key, chart in CHARTS.items():
+        series = engine.value_counts(snapshot, chart["column"], mask)
+        counts[key] = [{"value": v.item() if hasattr(v, "item") else v, "count": int(c)} for v, c in series.items()]
+        if not series.empty:
+            figures[key] = build_chart(key, series)
+            if key == "country":
+                figures["country_map"] = build_country_map(series)
+    data["counts"] = counts
+
+    html_parts = [f"<h1>🎬 {html.escape(name)}</h1>", f"<p>Total movies watched: {data['total']}</p>"]
+    for i, fig in enumerate(figures.values()):
+        # the first chart loads plotly.js shared by all presets, the others reuse it
+        html_parts.append(fig.to_html(full_html=False, include_plotlyjs="../plotly.min.js" if i == 0 else False))
+
+    _write_text(out_dir / "data.json", json.dumps(data))
+    _write_text(out_dir / "figures.json", json.dumps({k: json.loads(f.to_json()) for k, f in figures.items()}))
+    _write_text(out_dir / "index.html", _page(name, "\n".join(html_parts)))
+
+
+def export_presets(snapshot, presets, out_dir=EXPORT_DIR, force=False):
+    """
+    Render every preset to `out_dir/<slugified preset name>/`, skipping presets whose films did not change.
+
+    Args:
+        snapshot (Snapshot): Data to render.
+        presets (dict): Preset name -> FilterSpec.
+        out_dir (Path): Output folder, can be served by any static file server.
+        force (bool): Render all presets, even unchanged ones.
+
+    Returns:
+        tuple: (names of rendered presets, names of skipped presets)
+
+    Raises ValueError, before rendering anything, if two preset names have the same folder.
+    """
+    folders = preset_folders(presets)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_file = out_dir / "manifest.json"
+    manifest = json.loads(manifest_file.read_text(encoding="utf-8")) if manifest_file.exists() else {}
+
+    plotly_js = out_dir / "plotly.min.js"
+    if not plotly_js.exists():
+        from plotly.offline import get_plotlyjs
+        _write_text(plotly_js, get_plotlyjs())
+
+    hashes = row_hashes(snapshot)
+    rendered, skipped = [], []
+    for name, spec in presets.items():
+        mask = engine.filter_mask(snapshot, spec)
+        fp = fingerprint(spec, hashes, mask)
+        folder = folders[name]
+        if not force and manifest.get(name, {}).get("fingerprint") == fp and (out_dir / folder / "index.html").exists():
+            skipped.append(name)
+            continue
+
+        render_preset(snapshot, spec, mask, out_dir / folder, name)
+        manifest[name] = {
+            "fingerprint": fp,
+            "movies": int(mask.sum()),
+            "rendered_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        rendered.append(name)
+
+    # drop presets that are no longer configured from the index page (their files stay)
+    manifest = {name: manifest[name] for name in presets if name in manifest}
+    _write_text(manifest_file, json.dumps(manifest, indent=2))
+    links = "\n".join(
+        f'<li><a href="{html.escape(folders[name])}/index.html">{html.escape(name)}</a> ({entry["movies"]} movies)</li>'
+        for name, entry in manifest.items()
+    )
+    _write_text(out_dir / "index.html", _page("My Movie Dashboard", f"<h1>🎬 My Movie Dashboard</h1><ul>{links}</ul>"))
+    return rendered, skipped
+
+
+def _page(title, body):
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+        "<style>body{background:#1e1e1e;color:#f0f0f0;font-family:sans-serif} a{color:#FFA500}</style>"
+        f"</head><body>{body}</body></html>"
+    )
+
+
+def _write_text(path, text):
+    """Write via a temporary file, so a static file server never serves half a file."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
@@ -1,8 +1,10 @@
-import plotly.express as px
-import plotly.colors as pc
-import plotly.graph_objects as go
 import pandas as pd
 
+from src.profiling import traced
+
+# plotly is imported inside the functions: it takes longer to import than the rest of the
+# dashboard together, and is only needed once the first chart is drawn
+
 # Resources:
 # color codes: https://htmlcolorcodes.com/
 # plotly choropleth layout geo: https://plotly.com/python/reference/layout/geo/
@@ -13,6 +15,8 @@ def adjust_color(color, factor):
     """Lighten (>1) or darken (<1) a hex color.
     RGB values need to be between 0 and 255
     """
+    import plotly.colors as pc
+
     r, g, b = pc.hex_to_rgb(color)
     r = max(0, min(255, int(r * factor)))
     g = max(0, min(255, int(g * factor)))
@@ -21,6 +25,8 @@ def adjust_color(color, factor):
 
 def show_colorscale(base_color):
     """Display generated 3-step colorscale for a single base color."""
+    import plotly.graph_objects as go
+
     colors = [
         adjust_color(base_color, 0.75),  # darker
         base_color,                     # original
@@ -42,6 +48,7 @@ def show_colorscale(base_color):
     return fig
 
 
+@traced("plot_bar", "render")
 def plot_bar(df, x_col, y_col, title="", orientation="h", top_n=None
              , color="#FFA500", height=500, width=800, order_axis=False):
     """
@@ -62,6 +69,8 @@ def plot_bar(df, x_col, y_col, title="", orientation="h", top_n=None
         For horizontal bars: sorts descending (largest at top). If false, order by labels
         For vertical bars: sorts ascending. If false, order by labels
     """
+    import plotly.express as px
+
     plot_df = df.copy()
 
     # -- Filter top N rows if requested --
@@ -154,6 +163,7 @@ def plot_bar(df, x_col, y_col, title="", orientation="h", top_n=None
     )
     return fig
 
+@traced("plot_map", "render")
 def plot_map(df, country_col, y_col, title="", color=None):
     """
     Plot a choropleth map.
@@ -169,6 +179,8 @@ def plot_map(df, country_col, y_col, title="", color=None):
             - list of colors -> used as full scale
             - Plotly built-in name (e.g., 'Viridis')
     """
+    import plotly.express as px
+
 
     if color is None:
         color = ["#FFD580", "#FFA500", "#FF7F00"]
@@ -1,4 +1,3 @@
-import pycountry
 from pathlib import Path
 import pandas as pd
 
@@ -16,6 +15,8 @@ def get_language_name(iso_code):
     """
     if not iso_code:
         return None
+    import pycountry  # imported on first use, loading its databases is slow
+
     try:
         lang = pycountry.languages.get(alpha_2=iso_code)
         return lang.name if lang else None
@@ -0,0 +1,228 @@
+import json
+import os
+import time
+from pathlib import Path
+from random import uniform
+
+import pandas as pd
+
+from src.config import CACHE_DIR
+from src.pipeline import FETCH_DELAY, RAW_DIR, TMDB_DATA_FILE, append_csv, read_ids
+from src.search import fold
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Persistent mapping of resolved films ("imdb:tt0062622" or "title:<title>|<year>") to TMDb IDs
+ID_CACHE_FILE = CACHE_DIR / "tmdb_id_cache.json"
+IMPORTED_MOVIES_FILE = RAW_DIR / "imported_movies.csv"
+
+# Rows of an export read at once
+CHUNKSIZE = 10_000
+
+# Films resolved between two saves of the ID cache (and of the TMDb cache)
+BATCH_SIZE = 50
+
+# Supported export formats: the columns that identify them and the columns to read.
+# Checked in order, so the Letterboxd diary wins over watched.csv. Only the diary has
+# the dates of the viewings ("date"); the other dates are when a film was logged or rated.
+FORMATS = {
+    "letterboxd_diary": {"required": {"Name", "Year", "Watched Date"},
+                         "title": "Name", "year": "Year", "date": "Watched Date"},
+    "letterboxd_watched": {"required": {"Name", "Year", "Letterboxd URI"},
+                           "title": "Name", "year": "Year"},
+    "imdb": {"required": {"Const", "Title"},
+             "title": "Title", "year": "Year", "imdb_id": "Const", "type": "Title Type"},
+}
+
+# IMDb title types that are not films (TMDb /find returns them as TV results)
+IMDB_SKIPPED_TYPES = {"TV Series", "TV Mini Series", "TV Episode", "Podcast Series", "Podcast Episode",
+                      "tvSeries", "tvMiniSeries", "tvEpisode"}
+
+# -----------------------------
+# ID cache
+# -----------------------------
+
+class IdCache:
+    """
+    Persistent mapping of film keys to TMDb IDs (None = TMDb has no such film).
+
+    Lookups that failed because of request errors are not stored, so they are tried
+    again on the next import; everything else is resolved only once.
+    """
+
+    def __init__(self, path=ID_CACHE_FILE):
+        self.path = Path(path)
+        self.ids = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                self.ids = json.load(f)
+        self._dirty = False
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def get(self, key):
+        return self.ids.get(key)
+
+    def set(self, key, tmdb_id):
+        self.ids[key] = None if tmdb_id is None else int(tmdb_id)
+        self._dirty = True
+
+    def save(self):
+        """Write the cache via a temporary file, only if something changed."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.ids, f)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+def film_key(title=None, year=None, imdb_id=None):
+    """Key of a film in the ID cache: its IMDb ID if known, else its folded title and year."""
+    if isinstance(imdb_id, str) and imdb_id:
+        return f"imdb:{imdb_id}"
+    year = "" if year is None or pd.isna(year) else int(year)
+    return f"title:{fold(title)}|{year}"
+
+# -----------------------------
+# Reading exports
+# -----------------------------
+
+def detect_format(path):
+    """Name of the export format of a CSV (see `FORMATS`), or raise ValueError."""
+    columns = set(pd.read_csv(path, nrows=0).columns)
+    for name, spec in FORMATS.items():
+        if spec["required"] <= columns:
+            return name
+    raise ValueError(f"Unknown export format for {Path(path).name} (columns: {sorted(columns)})")
+
+
+def read_export(path, chunksize=CHUNKSIZE):
+    """
+    Stream a Letterboxd or IMDb export as chunks with the columns
+    key, title, year, imdb_id and watched_date (one row per film or viewing).
+    """
+    spec = FORMATS[detect_format(path)]
+    columns = set(pd.read_csv(path, nrows=0).columns)
+    wanted = {field: spec[field] for field in ("title", "year", "imdb_id", "date", "type")
+              if field in spec and spec[field] in columns}
+
+    for chunk in pd.read_csv(path, usecols=list(wanted.values()), dtype=str, chunksize=chunksize):
+        if "type" in wanted:
+            chunk = chunk[~chunk[wanted["type"]].isin(IMDB_SKIPPED_TYPES)]
+        title = chunk[wanted["title"]]
+        year = pd.to_numeric(chunk[wanted["year"]], errors="coerce").astype("Int64")
+        imdb_id = chunk[wanted["imdb_id"]] if "imdb_id" in wanted else pd.Series(None, index=chunk.index)
+        out = pd.DataFrame({
+            "title": title,
+            "year": year,
+            "imdb_id": imdb_id,
+            "watched_date": chunk[wanted["date"]] if "date" in wanted else None,
+        })
+        out = out[out["title"].notna() | out["imdb_id"].notna()]
+        out.insert(0, "key", [film_key(t, y, i) for t, y, i in zip(out["title"], out["year"], out["imdb_id"])])
+        yield out
+
+# -----------------------------
+# Resolving IDs
+# -----------------------------
+
+def _default_resolvers():
+    from src.tmdb_api import find_by_imdb_id, search_movie
+
+    def by_title(title, year):
+        return search_movie(title=title, year=None if pd.isna(year) else int(year), raise_errors=True)
+    return find_by_imdb_id, by_title
+
+
+def resolve_films(films, id_cache, find_imdb=None, search_title=None, batch_size=BATCH_SIZE,
+                  delay=FETCH_DELAY, cache_file=TMDB_DATA_FILE, verbose=True):
+    """
+    Resolve the TMDb IDs of `films` (key -> (title, year, imdb_id)) that are not in `id_cache`.
+
+    IMDb IDs are looked up with /find, other films by title and year with `search_movie`,
+    whose full record also goes into the TMDb cache so update_cache.py does not fetch it again.
+    The ID cache and TMDb cache are saved after every batch, so an interrupted import
+    keeps its progress.
+
+    Returns:
+        tuple: (number of resolved films, number of films that could not be looked up)
+    """
+    if find_imdb is None or search_title is None:
+        default_find, default_search = _default_resolvers()
+        find_imdb, search_title = find_imdb or default_find, search_title or default_search
+
+    todo = [key for key in films if key not in id_cache]
+    cached_ids = read_ids(cache_file)
+    resolved = errors = 0
+    for start in range(0, len(todo), batch_size):
+        records = []
+        for key in todo[start:start + batch_size]:
+            title, year, imdb_id = films[key]
+            if resolved + errors and delay:
+                time.sleep(uniform(*delay))
+            try:
+                tmdb_id = find_imdb(imdb_id) if imdb_id else None
+                if tmdb_id is None and title:
+                    record = search_title(title, year)
+                    tmdb_id = record["tmdb_id"] if record else None
+                    if record and int(record["tmdb_id"]) not in cached_ids:
+                        records.append(record)
+                        cached_ids.add(int(record["tmdb_id"]))
+            except Exception as e:
+                errors += 1
+                if verbose:
+                    print(f"⚠️ Could not look up '{title}' ({year}): {e}")
+                continue
+            id_cache.set(key, tmdb_id)
+            resolved += 1
+
+        id_cache.save()
+        if records:
+            append_csv(pd.DataFrame(records), cache_file)
+        if verbose:
+            print(f"Resolved {min(start + batch_size, len(todo))}/{len(todo)} films")
+    return resolved, errors
+
+# -----------------------------
+# Import
+# -----------------------------
+
+def import_exports(paths, id_cache=None, chunksize=CHUNKSIZE, **resolve_kwargs):
+    """
+    Import Letterboxd / IMDb exports: stream and deduplicate them, resolve new films and
+    return the movie list (title, year, tmdb_id) and the viewings (watched_date, tmdb_id).
+
+    Returns:
+        tuple: (movies DataFrame, viewings DataFrame, summary dict)
+    """
+    id_cache = id_cache or IdCache()
+    films, viewings, rows = {}, [], 0
+    for path in paths:
+        for chunk in read_export(path, chunksize):
+            rows += len(chunk)
+            for key, title, year, imdb_id in zip(chunk["key"], chunk["title"], chunk["year"], chunk["imdb_id"]):
+                if key not in films:
+                    films[key] = (title, year, None if pd.isna(imdb_id) else imdb_id)
+            dated = chunk[chunk["watched_date"].notna()]
+            viewings.append(dated[["watched_date", "key"]])
+
+    resolved, errors = resolve_films(films, id_cache, **resolve_kwargs)
+
+    movies = pd.DataFrame(
+        [(title, year, id_cache.get(key)) for key, (title, year, _) in films.items()],
+        columns=["title", "year", "tmdb_id"],
+    )
+    movies = movies[movies["tmdb_id"].notna()].astype({"tmdb_id": "int64"}).drop_duplicates(subset=["tmdb_id"])
+
+    viewings = pd.concat(viewings, ignore_index=True) if viewings else pd.DataFrame(columns=["watched_date", "key"])
+    viewings = viewings.assign(tmdb_id=viewings["key"].map(id_cache.get))
+    viewings = viewings[viewings["tmdb_id"].notna()].astype({"tmdb_id": "int64"})[["watched_date", "tmdb_id"]]
+
+    summary = {"rows": rows, "films": len(films), "resolved_now": resolved, "errors": errors,
+               "matched": len(movies), "unmatched": sum(id_cache.get(k) is None for k in films)}
+    return movies, viewings.drop_duplicates(), summary
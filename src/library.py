@@ -0,0 +1,228 @@
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import file_signature
+from src.diary import add_events, empty_state, rollup_frames
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# One folder per user with their movie list and diary. The TMDb metadata of all users'
+# films lives once in the shared cache and processed file; a user only stores tmdb_ids.
+USERS_DIR = ROOT_DIR / "data" / "users"
+USER_MOVIES_FILE = "movies.csv"     # column tmdb_id, like the lists in data/raw
+USER_DIARY_FILE = "diary.csv"       # columns watched_date and tmdb_id, like data/raw/diary.csv
+
+# Total memory of the user libraries kept loaded; the least recently used are dropped beyond it
+MEMORY_BUDGET = 256 * 2 ** 20
+
+# User IDs double as folder names
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# -----------------------------
+# User library
+# -----------------------------
+
+class UserLibrary:
+    """
+    One user's partition: the tmdb_ids of their films and their diary.
+
+    The films themselves are rows of the shared `Snapshot`; `mask` selects this user's
+    rows, so filters and charts run on the shared indexes like for the full library.
+    Structures derived from a snapshot are kept for the latest snapshot only.
+    """
+
+    def __init__(self, user_id, tmdb_ids, diary=None, signature=None):
+        self.user_id = user_id
+        self.tmdb_ids = np.unique(np.asarray(tmdb_ids, dtype=np.int64))
+        self.diary = diary
+        self.signature = signature
+        self._derived = {}  # name -> (snapshot version, value)
+        self._lock = threading.Lock()
+        self.nbytes = self._measure()
+
+    def __len__(self):
+        return len(self.tmdb_ids)
+
+    def _measure(self):
+        """Approximate memory held by this library, including its derived structures."""
+        total = self.tmdb_ids.nbytes
+        if self.diary is not None:
+            total += int(self.diary.memory_usage().sum())
+        for _, value in self._derived.values():
+            if isinstance(value, np.ndarray):
+                total += value.nbytes
+            elif isinstance(value, tuple):  # diary rollups
+                total += sum(int(frame.memory_usage(deep=True).sum()) for frame in value[1].values())
+        return total
+
+    def _for_snapshot(self, name, snapshot, build):
+        with self._lock:
+            version, value = self._derived.get(name, (None, None))
+            if version != snapshot.version:
+                value = build(snapshot)
+                self._derived[name] = (snapshot.version, value)
+                self.nbytes = self._measure()
+            return value
+
+    def mask(self, snapshot):
+        """Boolean row mask of this user's films in `snapshot` (read-only, combine with `&`)."""
+        def build(snapshot):
+            mask = np.isin(snapshot.df["tmdb_id"].to_numpy(), self.tmdb_ids)
+            mask.flags.writeable = False
+            return mask
+        return self._for_snapshot("mask", snapshot, build)
+
+    def missing(self, snapshot):
+        """Number of this user's films that are not in `snapshot` yet (metadata not fetched)."""
+        return len(self) - int(self.mask(snapshot).sum())
+
+    def options(self, snapshot, column):
+        """Sorted distinct values of a column among this user's films, for the sidebar filters."""
+        index = snapshot.index(column)
+        if index is None:
+            return []
+        return index.labels[index.counts(self.mask(snapshot)) > 0].tolist()
+
+    def rollups(self, snapshot):
+        """(number of viewings, rollup frames per grain) of this user's diary, like `load_rollups`."""
+        if self.diary is None or self.diary.empty:
+            return 0, {}
+
+        def build(snapshot):
+            df = snapshot.df
+            runtimes = pd.Series(df["runtime"].astype("float64").to_numpy() if "runtime" in df.columns
+                                 else np.nan, index=df["tmdb_id"].to_numpy()).dropna()
+            state = empty_state()
+            add_events(state, self.diary, runtimes[~runtimes.index.duplicated()])
+            return state["events"], rollup_frames(state)
+        return self._for_snapshot("rollups", snapshot, build)
+
+
+def validate_user_id(user_id):
+    if not isinstance(user_id, str) or not USER_ID_PATTERN.fullmatch(user_id):
+        raise ValueError(f"Invalid user ID: {user_id!r} (letters, digits, '_' and '-' only)")
+    return user_id
+
+
+def partition_files(user_dir):
+    user_dir = Path(user_dir)
+    return user_dir / USER_MOVIES_FILE, user_dir / USER_DIARY_FILE
+
+
+def load_user_library(user_id, root=USERS_DIR):
+    """Read a user's movie list and diary. Raises KeyError if the user has no movie list."""
+    movies_file, diary_file = partition_files(Path(root) / validate_user_id(user_id))
+    signature = (file_signature(movies_file), file_signature(diary_file))
+    if signature[0] is None:
+        raise KeyError(user_id)
+
+    ids = pd.to_numeric(pd.read_csv(movies_file, usecols=["tmdb_id"])["tmdb_id"], errors="coerce")
+    diary = None
+    if signature[1] is not None:
+        diary = pd.read_csv(diary_file, usecols=["watched_date", "tmdb_id"])
+        diary = pd.DataFrame({
+            "watched_date": pd.to_datetime(diary["watched_date"], errors="coerce"),
+            "tmdb_id": pd.to_numeric(diary["tmdb_id"], errors="coerce").astype("Int64"),
+        }).dropna()
+    return UserLibrary(user_id, ids.dropna().astype("int64"), diary, signature)
+
+
+def user_movie_files(root=USERS_DIR):
+    """The movie lists of all users, to fetch the metadata of every user's films once."""
+    return sorted(Path(root).glob(f"*/{USER_MOVIES_FILE}"))
+
+# -----------------------------
+# Store
+# -----------------------------
+
+class LibraryStore:
+    """
+    Process-wide cache of user libraries.
+
+    A library is read on first access and kept in memory while the libraries together
+    stay under `memory_budget`; beyond it the least recently used ones are dropped and
+    read again when their user comes back. A library whose files changed is read again
+    on its next access.
+    """
+
+    def __init__(self, root=USERS_DIR, memory_budget=MEMORY_BUDGET):
+        self.root = Path(root)
+        self.memory_budget = memory_budget
+        self._libraries = OrderedDict()  # user_id -> UserLibrary, least recently used first
+        self._lock = threading.Lock()
+        self._loading = {}  # user_id -> lock, so a library is only read once at a time
+
+    def users(self):
+        """IDs of all users with a movie list."""
+        return [path.parent.name for path in user_movie_files(self.root)]
+
+    def get(self, user_id):
+        """The library of `user_id`. Raises ValueError for invalid IDs and KeyError for unknown users."""
+        validate_user_id(user_id)
+        library = self._cached(user_id)
+        if library is not None:
+            return library
+
+        with self._lock:
+            loading = self._loading.setdefault(user_id, threading.Lock())
+        with loading:
+            library = self._cached(user_id)  # loaded by another session meanwhile
+            if library is None:
+                library = load_user_library(user_id, self.root)
+                with self._lock:
+                    self._libraries[user_id] = library
+                    self._evict(keep=user_id)
+        return library
+
+    def _cached(self, user_id):
+        signature = tuple(file_signature(f) for f in partition_files(self.root / user_id))
+        with self._lock:
+            library = self._libraries.get(user_id)
+            if library is None:
+                return None
+            if library.signature != signature:
+                del self._libraries[user_id]
+                return None
+            self._libraries.move_to_end(user_id)
+            # libraries grow after loading (masks, rollups), so check the budget on every access
+            self._evict(keep=user_id)
+            return library
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(library.nbytes for library in self._libraries.values())
+
+    def _evict(self, keep):
+        total = sum(library.nbytes for library in self._libraries.values())
+        for user_id in list(self._libraries):
+            if total <= self.memory_budget:
+                break
+            if user_id != keep:
+                total -= self._libraries.pop(user_id).nbytes
+
+    def __contains__(self, user_id):
+        with self._lock:
+            return user_id in self._libraries
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_library_store(root=USERS_DIR):
+    """Return the process-wide `LibraryStore` for `root`, creating it on first use."""
+    key = Path(root).resolve()
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = LibraryStore(key)
+        return _stores[key]
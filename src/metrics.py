@@ -0,0 +1,126 @@
+import time
+from contextlib import contextmanager
+
+# -----------------------------
+# Prometheus metrics of the cache refresh
+# -----------------------------
+# prometheus_client is only imported by `enable()`: without it (the default) every
+# function below is a no-op, so search_movie can always report to this module.
+
+# Latency buckets of TMDb requests in seconds (requests time out after 5 s)
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+# Duration buckets of checkpoint writes in seconds (grows with the size of tmdb_data.csv)
+CHECKPOINT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = None
+_window = None  # last concurrency window, set on the gauge by `enable()` if it comes later
+
+
+def enable():
+    """Create the metrics in their own registry (once) and return the registry."""
+    global _metrics
+    if _metrics is None:
+        from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+        registry = CollectorRegistry()
+        _metrics = {
+            "registry": registry,
+            "requests": Counter("tmdb_requests", "TMDb API requests by endpoint and HTTP status",
+                                ["endpoint", "status"], registry=registry),
+            "latency": Histogram("tmdb_request_duration_seconds", "Duration of TMDb API requests",
+                                 ["endpoint"], buckets=REQUEST_BUCKETS, registry=registry),
+            "errors": Counter("tmdb_errors", "Failed movie lookups by error class",
+                              ["error"], registry=registry),
+            "retries": Counter("tmdb_retries", "Repeated TMDb requests by reason",
+                               ["reason"], registry=registry),
+            "window": Gauge("tmdb_concurrency_window", "Concurrent TMDb requests allowed by the adaptive limiter",
+                            registry=registry),
+            "decisions": Counter("tmdb_concurrency_decisions", "Changes of the concurrency window by decision and reason",
+                                 ["decision", "reason"], registry=registry),
+            "films": Counter("cache_refresh_films", "Films processed by the cache refresh by result",
+                             ["result"], registry=registry),
+            "remaining": Gauge("cache_refresh_remaining_films", "Films still missing metadata",
+                               registry=registry),
+            "checkpoint": Histogram("cache_refresh_checkpoint_duration_seconds",
+                                    "Duration of writing tmdb_data.csv", buckets=CHECKPOINT_BUCKETS,
+                                    registry=registry),
+            "last_checkpoint": Gauge("cache_refresh_last_checkpoint_timestamp_seconds",
+                                     "Unix time of the last successful checkpoint", registry=registry),
+        }
+        if _window is not None:
+            _metrics["window"].set(_window)
+    return _metrics["registry"]
+
+
+def enabled():
+    return _metrics is not None
+
+
+def observe_request(endpoint, seconds, status):
+    """Record one TMDb request: `status` is the HTTP status code, or an error class if there was no response."""
+    if _metrics:
+        _metrics["requests"].labels(endpoint=endpoint, status=str(status)).inc()
+        _metrics["latency"].labels(endpoint=endpoint).observe(seconds)
+
+
+def count_error(error):
+    """Count a failed lookup: connection, http, timeout, not_found or unexpected."""
+    if _metrics:
+        _metrics["errors"].labels(error=error).inc()
+
+
+def count_retry(reason):
+    if _metrics:
+        _metrics["retries"].labels(reason=reason).inc()
+
+
+def set_concurrency_window(window):
+    global _window
+    _window = window
+    if _metrics:
+        _metrics["window"].set(window)
+
+
+def count_concurrency_decision(decision, reason):
+    """Count a change of the adaptive limiter: increase (healthy) or decrease (throttled, server_error, ...)."""
+    if _metrics:
+        _metrics["decisions"].labels(decision=decision, reason=reason).inc()
+
+
+def count_film(result, remaining=None):
+    """Count a processed film (`result` is found or failed) and update the films still missing."""
+    if _metrics:
+        _metrics["films"].labels(result=result).inc()
+        if remaining is not None:
+            _metrics["remaining"].set(remaining)
+
+
+def set_remaining(remaining):
+    if _metrics:
+        _metrics["remaining"].set(remaining)
+
+
+@contextmanager
+def checkpoint_timer():
+    """Time the `with` block as a checkpoint write; only successful writes update the timestamp."""
+    start = time.perf_counter()
+    yield
+    if _metrics:
+        _metrics["checkpoint"].observe(time.perf_counter() - start)
+        _metrics["last_checkpoint"].set_to_current_time()
+
+
+def serve(port, addr="127.0.0.1"):
+    """Expose the metrics on http://addr:port/metrics for Prometheus to scrape."""
+    from prometheus_client import start_http_server
+
+    start_http_server(port, addr=addr, registry=enable())
+
+
+def write_textfile(path):
+    """Write the metrics for the node_exporter textfile collector (atomically)."""
+    if _metrics:
+        from prometheus_client import write_to_textfile
+
+        write_to_textfile(str(path), _metrics["registry"])
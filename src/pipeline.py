@@ -0,0 +1,520 @@
+import math
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from random import uniform
+
+import pandas as pd
+
+from src.config import CACHE_DIR
+from src.dataset import MOVIE_DATA_FILE, file_signature
+from src.library import USERS_DIR, user_movie_files
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RAW_DIR = ROOT_DIR / "data" / "raw"
+TMDB_DATA_FILE = CACHE_DIR / "tmdb_data.csv"
+
+# Files in the raw folder that are not movie lists
+IGNORED_RAW_FILES = {"diary.csv"}
+
+# Seconds between two checks of the raw movie lists
+WATCH_INTERVAL = 2.0
+
+# Random delay between two TMDb requests in seconds (update_cache.py waits 2.5-5 s for bulk runs)
+FETCH_DELAY = (0.5, 1.0)
+
+# Minutes between two background refreshes of a running dashboard; off unless this is set
+REFRESH_ENV_VAR = "MOVIE_DASHBOARD_REFRESH"
+
+# Seconds between two rebuilds of the similar films index by the background refresh (once films changed)
+SIMILAR_REFRESH_INTERVAL = 60 * 60
+
+# -----------------------------
+# Files
+# -----------------------------
+
+def raw_movie_files(raw_dir=RAW_DIR):
+    """CSV movie lists in `raw_dir`: every CSV with a `tmdb_id` column except the diary."""
+    files = []
+    for path in sorted(Path(raw_dir).glob("*.csv")):
+        if path.name in IGNORED_RAW_FILES:
+            continue
+        try:
+            if "tmdb_id" in pd.read_csv(path, nrows=0).columns:
+                files.append(path)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError):
+            continue
+    return files
+
+
+def read_movie_ids(files):
+    """Distinct TMDb IDs of the movie lists, in order of first appearance."""
+    ids = []
+    for path in files:
+        column = pd.read_csv(path, usecols=["tmdb_id"])["tmdb_id"]
+        ids.extend(pd.to_numeric(column, errors="coerce").dropna().astype(int).tolist())
+    return list(dict.fromkeys(ids))
+
+
+def read_ids(path):
+    """TMDb IDs stored in a cache or processed CSV (empty if it does not exist yet)."""
+    if not Path(path).exists():
+        return set()
+    return set(pd.read_csv(path, usecols=["tmdb_id"])["tmdb_id"].dropna().astype(int))
+
+
+class FileLocked(RuntimeError):
+    """Another process holds the lock of a file (see `file_lock`)."""
+
+
+def _lock(f, blocking):
+    """Take the exclusive lock of the open lock file `f`. Returns False if it is held and not `blocking`."""
+    try:
+        import fcntl
+    except ImportError:  # Windows: a byte-range lock, polled
+        import msvcrt
+
+        while True:
+            try:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.05)
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _unlock(f):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """
+    Hold the exclusive lock of `path` (on a `<path>.lock` file next to it) during the `with` block.
+
+    Every writer of the cache and processed CSVs takes it (`append_csv`, `write_csv_atomic`),
+    and `check_cache.compact` takes it without waiting, so it never truncates a row that is
+    being appended. With `blocking=False`, raises `FileLocked` if another process holds it.
+    Not reentrant: do not take it again inside the block.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "a+b") as f:
+        if not _lock(f, blocking):
+            raise FileLocked(f"{path} is being written by another process")
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+def _replace_csv(df, path):
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def write_csv_atomic(df, path):
+    """Write a CSV via a temporary file, so readers (like the dashboard) never see half of it."""
+    path = Path(path)
+    with file_lock(path):
+        _replace_csv(df, path)
+
+
+def append_csv(df, path, atomic=False):
+    """
+    Append rows to a CSV in the column order of its header (or create it).
+
+    With `atomic`, the rows are appended to a copy of the file that then replaces it, so readers
+    that do not wait for the file to stop changing (a new `load_snapshot`) never see a half-written
+    row. This costs a copy of the file: the cache, only read by its writers, is appended in place.
+    """
+    path = Path(path)
+    with file_lock(path):
+        if path.exists() and path.stat().st_size > 0:
+            columns = pd.read_csv(path, nrows=0).columns
+            if set(df.columns) - set(columns):
+                # new columns (e.g. added to search_movie): rewrite once with the wider header
+                _replace_csv(pd.concat([pd.read_csv(path), df], ignore_index=True), path)
+                return
+            target = path.with_name(path.name + ".tmp") if atomic else path
+            if atomic:
+                shutil.copyfile(path, target)
+            df.reindex(columns=columns).to_csv(target, mode="a", header=False, index=False)
+            if atomic:
+                os.replace(target, path)
+        elif atomic:
+            _replace_csv(df, path)
+        else:
+            df.to_csv(path, index=False)
+
+# -----------------------------
+# Fetching
+# -----------------------------
+
+def fetch_movies(tmdb_ids, fetch=None, delay=FETCH_DELAY, verbose=True):
+    """
+    Fetch the TMDb metadata of `tmdb_ids` one by one.
+
+    Args:
+        fetch (callable, optional): tmdb_id -> dict or None, `search_movie` by default.
+        delay (tuple): Range of the random pause between two requests in seconds.
+
+    Returns:
+        tuple: (list of records, list of IDs that could not be fetched)
+    """
+    if fetch is None:
+        from src.tmdb_api import search_movie
+
+        def fetch(tmdb_id):
+            return search_movie(tmdb_id=tmdb_id)
+
+    records, failed = [], []
+    for i, tmdb_id in enumerate(tmdb_ids):
+        if i and delay:
+            time.sleep(uniform(*delay))
+        record = fetch(tmdb_id)
+        if record:
+            records.append(record)
+        else:
+            failed.append(tmdb_id)
+        if verbose:
+            print(f"{'✅' if record else '⚠️'} TMDb ID {tmdb_id} ({i + 1}/{len(tmdb_ids)})")
+    return records, failed
+
+# -----------------------------
+# Incremental refresh
+# -----------------------------
+
+class MovieRefresher:
+    """
+    Keeps the TMDb cache and the processed movie file in sync with the raw movie lists
+    and the movie lists of all users (`users_dir`): a film in several lists is fetched once.
+
+    Every `refresh` only fetches the films that are new in the lists, prepares only those
+    and appends them to a copy of the processed file that replaces it at once (without
+    preparing the other films again). The dashboard notices the new file on its own (see
+    `SharedDataset`).
+
+    The similar films index covers the whole library and takes minutes for large ones, so
+    it is not rebuilt per refresh unless `rebuild_similar`; with `similar_interval` (seconds)
+    `watch` rebuilds it at most that often once the films changed. Until then the dashboard
+    does not show similar films for a library the index was not built for.
+    """
+
+    def __init__(self, raw_dir=RAW_DIR, cache_file=TMDB_DATA_FILE, processed_file=MOVIE_DATA_FILE,
+                 fetch=None, delay=FETCH_DELAY, rebuild_similar=False, similar_interval=None, verbose=True,
+                 users_dir=USERS_DIR):
+        self.raw_dir = Path(raw_dir)
+        self.users_dir = Path(users_dir) if users_dir is not None else None
+        self.cache_file = Path(cache_file)
+        self.processed_file = Path(processed_file)
+        self.fetch = fetch
+        self.delay = delay
+        self.rebuild_similar = rebuild_similar
+        self.similar_interval = similar_interval
+        self.similar_stale = False  # films changed since the similar films index was last built
+        self.similar_built = None  # time.monotonic() of the last build by this refresher
+        self.verbose = verbose
+        self.failed = set()  # IDs TMDb had no data for, retried when the lists change again
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def movie_files(self):
+        """The raw movie lists followed by the movie lists of all users."""
+        users = user_movie_files(self.users_dir) if self.users_dir is not None else []
+        return raw_movie_files(self.raw_dir) + users
+
+    def refresh(self):
+        """Bring the cache and processed file up to date with the raw lists. Returns a summary dict."""
+        from src.prepare import prepare_movies
+
+        wanted = read_movie_ids(self.movie_files())
+        wanted_set = set(wanted)
+        cached = read_ids(self.cache_file)
+
+        # 1. fetch the films that are not in the cache yet
+        missing = [i for i in wanted if i not in cached and i not in self.failed]
+        records, failed = fetch_movies(missing, self.fetch, self.delay, self.verbose) if missing else ([], [])
+        self.failed.update(failed)
+        new_cache = pd.DataFrame(records)
+        if not new_cache.empty:
+            append_csv(new_cache, self.cache_file)
+
+        # 2. diff the processed films against the lists (only their IDs are read)
+        processed_ids = read_ids(self.processed_file)
+        removed = processed_ids - wanted_set
+        added = wanted_set - processed_ids
+
+        # new records of films already in the processed file (e.g. after their cache entry was
+        # dropped) are only cached; films in the cache that were never prepared (e.g. first run,
+        # or fetched by update_cache.py) are added too
+        to_prepare = new_cache[new_cache["tmdb_id"].isin(added)] if not new_cache.empty else new_cache
+        unprepared = (added & cached) - set(new_cache.get("tmdb_id", []))
+        if unprepared:
+            cache = pd.read_csv(self.cache_file)
+            # the last record of a film is the current one (repairs are appended, see check_cache.py)
+            from_cache = cache[cache["tmdb_id"].isin(unprepared)].drop_duplicates(subset=["tmdb_id"], keep="last")
+            to_prepare = pd.concat([to_prepare, from_cache], ignore_index=True)
+
+        summary = {"wanted": len(wanted), "fetched": len(records), "failed": len(failed),
+                   "added": len(to_prepare), "removed": len(removed)}
+        if to_prepare.empty and not removed:
+            return summary
+
+        # 3. prepare only the new films; append them, or rewrite the file without the removed ones
+        prepared = prepare_movies(to_prepare.reset_index(drop=True)) if not to_prepare.empty else None
+        self.processed_file.parent.mkdir(parents=True, exist_ok=True)
+        if removed:
+            processed = pd.read_csv(self.processed_file)
+            processed = processed[~processed["tmdb_id"].isin(removed)]
+            updated = pd.concat([processed, prepared], ignore_index=True) if prepared is not None else processed
+            updated = updated[list(processed.columns) + [c for c in updated.columns if c not in processed.columns]]
+            write_csv_atomic(updated, self.processed_file)
+        else:
+            # a new version of the file with the rows added, so no reader sees half of a row
+            append_csv(prepared, self.processed_file, atomic=True)
+        total = len(processed_ids) - len(removed) + len(to_prepare)
+        self.log(f"💾 {self.processed_file.name}: +{len(to_prepare)} / -{len(removed)} films ({total} total)")
+
+        # 4. derived indexes, after the dashboard already got the new films
+        self.similar_stale = True
+        similar = self.rebuild_indexes()
+
+        # 5. the Arrow snapshot, if the dashboard workers use one (published by prepare_df.py)
+        self.publish(similar)
+        return summary
+
+    def rebuild_indexes(self):
+        """
+        Rebuild the collaboration index (fast) and, if `rebuild_similar`, the similar films index.
+        Returns the similar films index, or None.
+        """
+        from src.collab import COLLAB_FILE, COLLAB_PAIRS, build_collab_index, save_collab_index
+
+        # only the people columns of the pairs are read
+        columns = {"tmdb_id"} | {column for pair in COLLAB_PAIRS.values() for column in pair[:2]}
+        df = pd.read_csv(self.processed_file, usecols=lambda column: column in columns)
+        save_collab_index(build_collab_index(df), df["tmdb_id"], COLLAB_FILE)
+        self.log("🔗 Rebuilt collaboration index")
+        return self.rebuild_similar_index() if self.rebuild_similar else None
+
+    def rebuild_similar_index(self):
+        """Rebuild the similar films index of the whole processed file. Returns it."""
+        from src.similar import FEATURES, SIMILAR_FILE, build_similar_index
+
+        columns = {"tmdb_id"} | set(FEATURES)
+        df = pd.read_csv(self.processed_file, usecols=lambda column: column in columns)
+        similar = build_similar_index(df)
+        similar.save(SIMILAR_FILE)
+        self.similar_stale, self.similar_built = False, time.monotonic()
+        self.log("🔗 Rebuilt similar films index")
+        return similar
+
+    def similar_due(self):
+        """True if `watch` should rebuild the similar films index now (see `similar_interval`)."""
+        if not self.similar_stale or self.similar_interval is None:
+            return False
+        return self.similar_built is None or time.monotonic() - self.similar_built >= self.similar_interval
+
+    def publish(self, similar=None):
+        """Publish the Arrow snapshot of the processed file if the dashboard workers use one."""
+        from src.arrow_snapshot import current_pointer, publish_snapshot
+
+        if current_pointer(self.processed_file).exists():
+            publish_snapshot(self.processed_file, similar=similar)
+            self.log("🏹 Published the Arrow snapshot")
+
+    def signatures(self):
+        """Signature of every movie list, to detect changes."""
+        return {path: file_signature(path) for path in self.movie_files()}
+
+    def watch(self, interval=WATCH_INTERVAL, stop=None):
+        """
+        Refresh once, then every time the raw movie lists changed and stopped changing; with
+        `similar_interval`, also rebuild the similar films index when it is due.
+        Runs until `stop` (a threading.Event) is set or the process is interrupted.
+        """
+        self.refresh()
+        current, pending = self.signatures(), None
+        while stop is None or not stop.is_set():
+            time.sleep(interval)
+            if self.similar_due():
+                try:
+                    self.publish(self.rebuild_similar_index())
+                except Exception as e:
+                    self.similar_built = time.monotonic()  # try again after the next interval
+                    self.log(f"⚠️ Rebuilding the similar films index failed: {e}")
+            signatures = self.signatures()
+            if signatures == current:
+                pending = None
+                continue
+            # only refresh once the lists stopped changing, to skip half-saved files
+            if signatures != pending:
+                pending = signatures
+                continue
+            self.log("👀 Movie lists changed")
+            self.failed.clear()
+            try:
+                summary = self.refresh()
+                self.log(f"✅ Refreshed: {summary}")
+            except Exception as e:
+                self.log(f"⚠️ Refresh failed, retrying on the next change: {e}")
+            current, pending = signatures, None
+
+# -----------------------------
+# Background refresh
+# -----------------------------
+
+def _refresh_in_child(refresher):
+    # the child works on a copy: return the state the parent keeps between refreshes
+    summary = refresher.refresh()
+    return summary, refresher.failed, refresher.similar_stale
+
+
+def _rebuild_similar_in_child(refresher):
+    refresher.publish(refresher.rebuild_similar_index())
+
+
+class BackgroundRefresh:
+    """
+    Refreshes the data of a running dashboard without blocking it (stale-while-revalidate).
+
+    A daemon thread runs `MovieRefresher.refresh` every `interval` seconds, or when
+    `request`ed, in a child process: fetching, preparing and rebuilding the indexes never
+    compete with the sessions for the GIL. The sessions keep the current snapshot until
+    the new processed file is written, which `SharedDataset` then swaps in at once.
+
+    Once films changed, the similar films index is rebuilt in the child too, at most every
+    `similar_interval` seconds (see `MovieRefresher.similar_due`). The refresher's state
+    (films TMDb had no data for, whether the index is stale) is kept here between refreshes.
+    """
+
+    def __init__(self, dataset, refresher=None, interval=15 * 60, similar_interval=SIMILAR_REFRESH_INTERVAL):
+        self.dataset = dataset
+        self.refresher = refresher or MovieRefresher(processed_file=dataset.path, similar_interval=similar_interval,
+                                                     verbose=False)
+        self.interval = interval
+        self.running = False
+        self.last_started = None
+        self.last_finished = None
+        self.last_summary = None
+        self.last_error = None
+        self._signatures = None  # of the movie lists at the last refresh
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="background-refresh", daemon=True)
+        self._thread.start()
+
+    def request(self):
+        """Start a refresh now (or right after the running one). Returns immediately."""
+        self._wake.set()
+
+    def refresh(self):
+        """Run one refresh in a child process and swap in its result. Errors are kept in `last_error`."""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        refresher = self.refresher
+        self.running, self.last_started = True, datetime.now()
+        try:
+            signatures = refresher.signatures()
+            if signatures != self._signatures:
+                refresher.failed.clear()  # the lists changed: try the films TMDb had no data for again
+            # spawn: forking a process with running threads (Streamlit's) is not safe
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                self.last_summary, refresher.failed, refresher.similar_stale = (
+                    pool.submit(_refresh_in_child, refresher).result())
+                self._signatures = signatures
+                self.dataset.reload_if_changed()
+                if refresher.similar_due():
+                    try:
+                        pool.submit(_rebuild_similar_in_child, refresher).result()
+                        refresher.similar_stale = False
+                    finally:
+                        refresher.similar_built = time.monotonic()  # after a failure, try again after the interval
+                    self.dataset.reload_if_changed()  # a published Arrow snapshot holds the index
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+            print(f"⚠️ Background refresh failed, keeping version {self.dataset.snapshot.version}: {e}")
+        finally:
+            self.running, self.last_finished = False, datetime.now()
+
+    def _run(self):
+        from src.similar import similar_index_state
+
+        # an index left behind by an earlier process (e.g. it refreshed, then stopped) is rebuilt too
+        snapshot = self.dataset.snapshot
+        try:
+            if "tmdb_id" in snapshot.df.columns:
+                state = similar_index_state(snapshot.df["tmdb_id"].to_numpy())
+                self.refresher.similar_stale = self.refresher.similar_stale or state == "stale"
+        except Exception as e:  # unreadable index: prepare_df.py writes a new one
+            print(f"⚠️ Could not read the similar films index: {e}")
+        while True:
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+_background = {}
+_background_lock = threading.Lock()
+
+
+def refresh_interval():
+    """Seconds between background refreshes from `REFRESH_ENV_VAR` (minutes), or None if off or invalid."""
+    value = os.getenv(REFRESH_ENV_VAR, "").strip()
+    if not value:
+        return None
+    try:
+        minutes = float(value)
+    except ValueError:
+        minutes = None
+    if minutes is None or not math.isfinite(minutes) or minutes < 0:
+        # a typo must not take the dashboard down: run without background refresh
+        _warn_once(f"⚠️ Ignoring {REFRESH_ENV_VAR}={value!r}: expected minutes (a positive number)")
+        return None
+    return minutes * 60 if minutes > 0 else None
+
+
+_warned = set()
+
+
+def _warn_once(message):
+    # refresh_interval runs on every rerun of the dashboard: print each warning once per process
+    if message not in _warned:
+        _warned.add(message)
+        print(message)
+
+
+def get_background_refresh(dataset, interval=None):
+    """Return the process-wide `BackgroundRefresh` of `dataset`, starting it on first use."""
+    with _background_lock:
+        if dataset.path not in _background:
+            _background[dataset.path] = BackgroundRefresh(dataset, interval=interval or refresh_interval())
+        return _background[dataset.path]
@@ -0,0 +1,240 @@
+import base64
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+
+from src.config import CACHE_DIR
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Thumbnails of posters and backdrops, one folder per kind
+ASSET_DIR = CACHE_DIR / "posters"
+
+# Poster and backdrop paths looked up for films cached before search_movie kept them
+IMAGE_PATHS_FILE = ASSET_DIR / "image_paths.json"
+
+# TMDb image CDN; TMDB_IMAGE_BASE_URL points the downloads somewhere else (e.g. a local stub server)
+IMAGE_BASE_URL = "https://image.tmdb.org/t/p"
+
+# Size downloaded from the CDN and size of the stored WebP thumbnail, per kind
+IMAGE_SIZES = {
+    "poster": {"download": "w342", "thumbnail": (154, 231), "column": "poster_path"},
+    "backdrop": {"download": "w780", "thumbnail": (300, 169), "column": "backdrop_path"},
+}
+WEBP_QUALITY = 80
+
+# The least recently used thumbnails are deleted once the folder grows past this size
+MAX_CACHE_BYTES = 200 * 2 ** 20
+
+# Concurrent downloads and requests per second (the CDN is not rate limited like the API, but be polite)
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_RATE = 20.0
+
+
+def image_base_url():
+    return os.getenv("TMDB_IMAGE_BASE_URL", IMAGE_BASE_URL).rstrip("/")
+
+# -----------------------------
+# Disk cache
+# -----------------------------
+
+class AssetCache:
+    """
+    Size-bounded LRU cache of WebP thumbnails on disk (`<root>/<kind>/<tmdb_id>.webp`).
+
+    The modification time of a file is its last use: `get` touches it, and `put` deletes
+    the oldest files once the folder is larger than `max_bytes`. Thread-safe, so the
+    download workers can share one cache.
+    """
+
+    def __init__(self, root=ASSET_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files = None  # path -> [last use, size in bytes], scanned on first write
+
+    def path_for(self, kind, tmdb_id):
+        return self.root / kind / f"{int(tmdb_id)}.webp"
+
+    def __contains__(self, item):
+        kind, tmdb_id = item
+        return self.path_for(kind, tmdb_id).exists()
+
+    def get(self, kind, tmdb_id):
+        """Path of the cached thumbnail (marked as just used), or None."""
+        path = self.path_for(kind, tmdb_id)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if self._files is not None and path in self._files:
+                self._files[path][0] = time.time()
+        return path
+
+    def put(self, kind, tmdb_id, data):
+        """Store a thumbnail (atomically) and evict the least recently used ones if needed."""
+        path = self.path_for(kind, tmdb_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._scan()
+            self._files[path] = [time.time(), len(data)]
+            self._evict()
+        return path
+
+    def data_uri(self, kind, tmdb_id):
+        """The cached thumbnail as a data: URI (for st.column_config.ImageColumn), or None."""
+        path = self.get(kind, tmdb_id)
+        if path is None:
+            return None
+        return "data:image/webp;base64," + base64.b64encode(path.read_bytes()).decode("ascii")
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            self._scan()
+            return sum(size for _, size in self._files.values())
+
+    def _scan(self):
+        if self._files is None:
+            self._files = {}
+            for path in self.root.glob("*/*.webp"):
+                stat = path.stat()
+                self._files[path] = [stat.st_mtime, stat.st_size]
+
+    def _evict(self):
+        total = sum(size for _, size in self._files.values())
+        if total <= self.max_bytes:
+            return
+        for path, (_, size) in sorted(self._files.items(), key=lambda item: item[1][0]):
+            path.unlink(missing_ok=True)
+            del self._files[path]
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+# -----------------------------
+# Download
+# -----------------------------
+
+class RateLimiter:
+    """Spaces calls to `wait` at least 1 / `rate` seconds apart, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def make_thumbnail(data, size):
+    """Shrink an image (bytes) to fit into `size` and return it as WebP bytes."""
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail(size)
+        out = BytesIO()
+        image.save(out, "WEBP", quality=WEBP_QUALITY)
+    return out.getvalue()
+
+
+def load_image_paths(path=IMAGE_PATHS_FILE):
+    if Path(path).exists():
+        with open(path, encoding="utf-8") as f:
+            return {int(k): v for k, v in json.load(f).items()}
+    return {}
+
+
+def save_image_paths(paths, path=IMAGE_PATHS_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({str(k): v for k, v in paths.items()}, f)
+    os.replace(tmp, path)
+
+
+def download_assets(films, cache=None, kind="poster", workers=DOWNLOAD_WORKERS, rate=DOWNLOAD_RATE,
+                    base_url=None, lookup=None, verbose=True):
+    """
+    Download and thumbnail the images of `films` that are not cached yet, `workers` at a time.
+
+    Args:
+        films (iterable): (tmdb_id, image path like "/abc.jpg" or None) pairs.
+        kind (str): "poster" or "backdrop", see `IMAGE_SIZES`.
+        rate (float): Maximum requests per second over all workers (0 = unlimited).
+        base_url (str, optional): Image server, `TMDB_IMAGE_BASE_URL` or the TMDb CDN by default.
+        lookup (callable, optional): tmdb_id -> image path for films without one (e.g. via the API).
+
+    Returns:
+        dict: number of films downloaded, already cached, without image and failed
+    """
+    import requests
+
+    cache = cache or AssetCache()
+    size = IMAGE_SIZES[kind]
+    base_url = (base_url or image_base_url()).rstrip("/")
+    limiter = RateLimiter(rate)
+    local = threading.local()  # one connection pool per worker
+
+    summary = {"downloaded": 0, "cached": 0, "no_image": 0, "failed": 0}
+    todo = []
+    for tmdb_id, image_path in films:
+        if (kind, tmdb_id) in cache:
+            summary["cached"] += 1
+        elif (isinstance(image_path, str) and image_path) or lookup:
+            todo.append((tmdb_id, image_path))
+        else:
+            summary["no_image"] += 1
+
+    def download(tmdb_id, image_path):
+        if not (isinstance(image_path, str) and image_path):
+            limiter.wait()
+            image_path = lookup(tmdb_id)
+            if not image_path:
+                return False
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        limiter.wait()
+        r = local.session.get(f"{base_url}/{size['download']}{image_path}", timeout=10)
+        r.raise_for_status()
+        cache.put(kind, tmdb_id, make_thumbnail(r.content, size["thumbnail"]))
+        return True
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(download, tmdb_id, image_path): tmdb_id for tmdb_id, image_path in todo}
+        for i, future in enumerate(as_completed(futures), start=1):
+            try:
+                summary["downloaded" if future.result() else "no_image"] += 1
+            except Exception as e:
+                summary["failed"] += 1
+                if verbose:
+                    print(f"⚠️ {kind} of TMDb ID {futures[future]}: {e}")
+            if verbose and (i % 100 == 0 or i == len(todo)):
+                print(f"{kind}s: {i}/{len(todo)}")
+    return summary
+
+
+def film_image_paths(df, kind="poster"):
+    """(tmdb_id, image path) pairs of the films in `df`, None where it has no path column or value."""
+    column = IMAGE_SIZES[kind]["column"]
+    paths = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+    return list(zip(df["tmdb_id"].astype(int), paths.where(paths.notna(), None)))
@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import COLUMN_DTYPES, MULTI_VALUE_COLUMNS, SINGLE_VALUE_COLUMNS, ValueIndex
+from src.helpers import add_decade_column
+
+# -----------------------------
+# Constants
+# -----------------------------
+# Processes preparing shards of the cache in `prepare_sharded`
+PREPARE_WORKERS = os.cpu_count() or 1
+
+# Shards per worker: smaller shards even out workers whose films have longer credits
+SHARDS_PER_WORKER = 4
+
+# -----------------------------
+# Functions
+# -----------------------------
+
+def prepare_movies(df):
+    """
+    Add the derived columns used by the dashboard to the TMDb metadata cache
+    and clean up known issues. Returns a new DataFrame.
+    """
+    df = add_decade_column(df).copy()
+
+    # Same dtype with or without missing dates, so every part of the cache is written alike
+    if "year" in df.columns:
+        df["year"] = df["year"].astype("Int64")
+
+    # Fix Jr. by removing the leading comma
+    df['actors'] = df['actors'].str.replace(', Jr.', ' Jr.')
+
+    # Add main production country (first country)
+    df["main_country"] = df["production_countries"].str.split(", ").str[0]
+
+    # Take the first language if multiple are listed
+    df["main_language"] = df["spoken_languages"].str.split(", ").str[0]
+
+    return df
+
+# -----------------------------
+# Sharded preparation
+# -----------------------------
+
+def shard_bounds(tmdb_ids, n_shards):
+    """
+    Split films into at most `n_shards` ranges of tmdb_id holding about as many films each.
+
+    Returns:
+        tuple: (positions of the films sorted by tmdb_id, start of every shard in it and the end);
+        films with the same tmdb_id are always in the same shard
+    """
+    ids = pd.to_numeric(pd.Series(tmdb_ids), errors="coerce").to_numpy(dtype=float)
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    cuts = np.linspace(0, len(ids), max(1, min(n_shards, len(ids))) + 1).astype(int)[1:-1]
+    cuts = np.searchsorted(sorted_ids, sorted_ids[cuts], side="left")  # move cuts to the first film of an id
+    bounds = np.unique(np.concatenate([[0], cuts, [len(ids)]]))
+    return order, bounds if len(bounds) > 1 else np.array([0, 0])
+
+
+def _prepare_shard(shard, part_file):
+    """
+    Prepare one shard into `part_file` (a CSV with header) and index it. Runs in a worker process.
+
+    The indexes are built from the written part with the dtypes `load_snapshot` reads, so
+    merged they equal the indexes of the whole file.
+    """
+    prepared = prepare_movies(shard)
+    prepared.to_csv(part_file, index=False)
+    columns = [c for c in SINGLE_VALUE_COLUMNS + MULTI_VALUE_COLUMNS if c in prepared.columns]
+    loaded = pd.read_csv(part_file, usecols=["tmdb_id"] + columns, dtype=COLUMN_DTYPES)
+    indexes = {}
+    for column in columns:
+        indexes[column] = ValueIndex.from_series(loaded[column], sep=", " if column in MULTI_VALUE_COLUMNS else None)
+    counts = {column: index.counts() for column, index in indexes.items()}
+    return loaded["tmdb_id"].to_numpy(), indexes, counts
+
+
+def _concat_parts(part_files, out_file):
+    """Write the CSV parts into one file with a single header, via a temporary file."""
+    out_file = Path(out_file)
+    tmp = out_file.with_name(out_file.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for i, part_file in enumerate(part_files):
+            with open(part_file, "rb") as part:
+                header = part.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(part, out)
+    os.replace(tmp, out_file)
+
+
+def _merge_counts(labels, parts):
+    """Sum per-shard counts (aligned with each shard's labels) into counts aligned with `labels`."""
+    total = np.zeros(len(labels), dtype=np.int64)
+    positions = pd.Index(labels)
+    for part_labels, counts in parts:
+        total[positions.get_indexer(part_labels)] += counts
+    return total
+
+
+class PreparedShards:
+    """
+    Result of `prepare_sharded`: the film order of the written file, the `ValueIndex` of every
+    filter/chart column of the whole file and the number of films per label of each column.
+    """
+
+    def __init__(self, tmdb_ids, indexes, counts):
+        self.tmdb_ids = tmdb_ids
+        self.indexes = indexes
+        self.counts = counts
+
+    def __len__(self):
+        return len(self.tmdb_ids)
+
+    def value_counts(self, column, top=None):
+        """Same output as `ValueIndex.value_counts()` of the column, from the merged counts."""
+        return self.indexes[column].counts_to_series(self.counts[column], top=top)
+
+
+def prepare_sharded(df, out_file, workers=PREPARE_WORKERS, n_shards=None, verbose=False):
+    """
+    Prepare the TMDb metadata cache `df` into `out_file` on a pool of processes.
+
+    The films are split into ranges of tmdb_id; every worker prepares a shard, writes it as
+    a CSV part and indexes it. The parts are then concatenated and the indexes and counts
+    merged, so the index columns are never parsed again. The file holds the films sorted by
+    tmdb_id, whatever the number of workers or shards.
+
+    Returns:
+        PreparedShards
+    """
+    out_file = Path(out_file)
+    order, bounds = shard_bounds(df["tmdb_id"], n_shards or workers * SHARDS_PER_WORKER)
+    parts_dir = Path(tempfile.mkdtemp(prefix=f"{out_file.name}.parts.", dir=out_file.parent))
+    try:
+        part_files = [parts_dir / f"part{i:05d}.csv" for i in range(len(bounds) - 1)]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_prepare_shard, df.iloc[order[start:stop]], part_file)
+                       for start, stop, part_file in zip(bounds[:-1], bounds[1:], part_files)]
+            shards = []
+            for future in futures:
+                shards.append(future.result())
+                if verbose:
+                    print(f"Prepared shards: {len(shards)}/{len(futures)}")
+        _concat_parts(part_files, out_file)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    indexes, counts = {}, {}
+    for column in shards[0][1] if shards else ():
+        indexes[column] = ValueIndex.concat([shard_indexes[column] for _, shard_indexes, _ in shards])
+        counts[column] = _merge_counts(indexes[column].labels, [(shard_indexes[column].labels, shard_counts[column])
+                                                               for _, shard_indexes, shard_counts in shards])
+    tmdb_ids = np.concatenate([ids for ids, _, _ in shards]) if shards else np.array([], dtype=np.int64)
+    return PreparedShards(tmdb_ids, indexes, counts)
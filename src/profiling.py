@@ -0,0 +1,120 @@
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+TRACE_FILE = ROOT_DIR / "data" / "processed" / "dashboard_trace.jsonl"
+
+# Set to 1 to show the debug panel in the dashboard for everyone (or open it with ?debug=1)
+DEBUG_ENV_VAR = "MOVIE_DASHBOARD_DEBUG"
+
+# Tracer of the current dashboard run (each Streamlit session runs in its own thread)
+_current = ContextVar("tracer", default=None)
+
+# -----------------------------
+# Tracer
+# -----------------------------
+
+class Tracer:
+    """
+    Collects timing spans (and optionally tracemalloc memory peaks) of one dashboard run.
+
+    Spans are grouped in stages: load, filter, aggregate and render. With
+    `track_memory`, every span records the peak traced memory above the memory in use
+    when it started. Nested spans share the peak of their outermost span (tracemalloc
+    keeps a single peak), so their memory is an upper bound.
+    """
+
+    def __init__(self, track_memory=False, **info):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.info = info
+        self.track_memory = track_memory
+        self.spans = []
+        self._depth = 0
+        self._start = time.perf_counter()
+        self._started_tracing = track_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name, stage, **info):
+        """Time the code in the `with` block as span `name` of `stage`."""
+        if self.track_memory:
+            if self._depth == 0:
+                tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            record = {"name": name, "stage": stage, "ms": round(elapsed * 1000, 3), "depth": self._depth, **info}
+            if self.track_memory:
+                record["peak_kb"] = round((tracemalloc.get_traced_memory()[1] - mem_start) / 1024, 1)
+            self.spans.append(record)
+
+    @property
+    def total_ms(self):
+        return round((time.perf_counter() - self._start) * 1000, 3)
+
+    def stop(self):
+        """Stop tracemalloc if this tracer started it (tracing slows down every allocation)."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def write(self, path=TRACE_FILE):
+        """Append the spans of this run to the JSONL trace log, one line per span."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        with open(path, "a", encoding="utf-8") as f:
+            for record in self.spans:
+                f.write(json.dumps({"run_id": self.run_id, "time": timestamp, **self.info, **record}) + "\n")
+            f.write(json.dumps({"run_id": self.run_id, "time": timestamp, **self.info,
+                                "name": "total", "stage": "run", "ms": self.total_ms, "depth": 0}) + "\n")
+
+
+def start_trace(tracer):
+    """Make `tracer` the tracer of the current run (None disables tracing)."""
+    _current.set(tracer)
+    return tracer
+
+
+def span(name, stage, **info):
+    """Span of the current run's tracer, or a no-op when tracing is off."""
+    tracer = _current.get()
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, stage, **info)
+
+
+def traced(name, stage):
+    """Decorator: run the function in a span of the current run's tracer."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def debug_enabled(query_params=None):
+    """Whether the debug panel is switched on, by environment variable or `?debug=1`."""
+    if os.getenv(DEBUG_ENV_VAR, "") not in ("", "0"):
+        return True
+    return bool(query_params) and query_params.get("debug") in ("1", "true")
@@ -0,0 +1,157 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import ValueIndex
+
+# -----------------------------
+# Constants
+# -----------------------------
+# Searchable columns and how their matches are shown
+SEARCH_FIELDS = {
+    "title": "Title",
+    "directors": "Director",
+    "actors": "Actor",
+    "screenwriters": "Screenwriter",
+    "cinematographers": "Cinematographer",
+}
+
+# Minimum share of the query's trigrams that a name must contain to match
+MIN_SCORE = 0.6
+
+# -----------------------------
+# Functions
+# -----------------------------
+
+def fold(text):
+    """Lowercase and strip accents, so 'Penélope' and 'penelope' are the same."""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def trigrams(folded):
+    """Set of 3-character substrings, padded with spaces to mark the start and end of words."""
+    padded = f" {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Inverted index from titles and people to films, with trigram fuzzy matching.
+
+    Every distinct title or person name is a term. Two CSR structures (offsets + flat
+    arrays) map trigram -> terms and term -> film rows, so a query only touches the
+    postings of its own trigrams; no column is scanned per keystroke.
+    """
+
+    def __init__(self, labels, fields, term_offsets, term_rows, gram_ids, gram_offsets, gram_terms, n_rows):
+        self.labels = labels                # display name per term
+        self.fields = fields                # searchable column per term
+        self.term_offsets = term_offsets    # rows of term t: term_rows[term_offsets[t]:term_offsets[t + 1]]
+        self.term_rows = term_rows
+        self.gram_ids = gram_ids            # trigram -> position in gram_offsets
+        self.gram_offsets = gram_offsets    # terms of trigram g: gram_terms[gram_offsets[g]:gram_offsets[g + 1]]
+        self.gram_terms = gram_terms
+        self.n_rows = n_rows
+        self.films = np.diff(term_offsets)  # number of films per term
+
+    @classmethod
+    def build(cls, snapshot):
+        labels, fields, term_ids, rows = [], [], [], []
+        n_terms = 0
+        for column in SEARCH_FIELDS:
+            if not snapshot.has_column(column):
+                continue
+            index = snapshot.index(column)
+            if index is None:
+                index = ValueIndex.from_series(snapshot.column(column).astype("string"))
+            labels.append(index.labels.astype(str))
+            fields.append(np.full(len(index.labels), column, dtype=object))
+            term_ids.append(index.codes.astype(np.int64) + n_terms)
+            rows.append(index.rows)
+            n_terms += len(index.labels)
+
+        labels = np.concatenate(labels) if labels else np.array([], dtype=str)
+        fields = np.concatenate(fields) if fields else np.array([], dtype=object)
+        term_ids = np.concatenate(term_ids) if term_ids else np.array([], dtype=np.int64)
+        rows = np.concatenate(rows) if rows else np.array([], dtype=np.int32)
+
+        # term -> rows
+        order = np.argsort(term_ids, kind="stable")
+        term_rows = rows[order].astype(np.int32)
+        term_offsets = np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=n_terms))])
+
+        # trigram -> terms
+        gram_list, gram_term_list = [], []
+        for term, label in enumerate(labels):
+            grams = trigrams(fold(label))
+            gram_list.extend(grams)
+            gram_term_list.extend([term] * len(grams))
+        gram_codes, gram_names = pd.factorize(pd.Series(gram_list, dtype=object))
+        gram_term_arr = np.asarray(gram_term_list, dtype=np.int32)
+        order = np.argsort(gram_codes, kind="stable")
+        gram_offsets = np.concatenate([[0], np.cumsum(np.bincount(gram_codes, minlength=len(gram_names)))])
+
+        return cls(
+            labels=labels,
+            fields=fields,
+            term_offsets=term_offsets,
+            term_rows=term_rows,
+            gram_ids={g: i for i, g in enumerate(gram_names)},
+            gram_offsets=gram_offsets,
+            gram_terms=gram_term_arr[order],
+            n_rows=len(snapshot.df),
+        )
+
+    def match_terms(self, query, min_score=MIN_SCORE):
+        """
+        Terms matching `query`, best first, as (term ids, scores).
+
+        The score is the share of the query's trigrams found in the term: 1.0 for a term
+        that contains the query, lower for typos. If some terms contain the full query,
+        only those are returned.
+        """
+        grams = trigrams(fold(query))
+        grams = [self.gram_ids[g] for g in grams if g in self.gram_ids]
+        if not grams or not query.strip():
+            return np.array([], dtype=np.int64), np.array([])
+
+        postings = np.concatenate([self.gram_terms[self.gram_offsets[g]:self.gram_offsets[g + 1]] for g in grams])
+        shared = np.bincount(postings, minlength=len(self.labels))
+        scores = shared / len(trigrams(fold(query)))
+
+        threshold = 1.0 if scores.max() >= 1.0 else min_score
+        terms = np.flatnonzero(scores >= threshold)
+        # best score first, then the names with the most films
+        terms = terms[np.lexsort((-self.films[terms], -scores[terms]))]
+        return terms, scores[terms]
+
+    def search(self, query, limit=10, min_score=MIN_SCORE):
+        """Best matching titles and people, as a frame with Name, Field, Films and Score."""
+        terms, scores = self.match_terms(query, min_score)
+        terms, scores = terms[:limit], scores[:limit]
+        return pd.DataFrame({
+            "Name": self.labels[terms],
+            "Field": [SEARCH_FIELDS[f] for f in self.fields[terms]],
+            "Films": self.films[terms],
+            "Score": scores.round(2),
+        })
+
+    def rows_mask(self, query, min_score=MIN_SCORE):
+        """Boolean row mask of the films with a title or person matching `query`."""
+        terms, _ = self.match_terms(query, min_score)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        if len(terms):
+            starts, ends = self.term_offsets[terms], self.term_offsets[terms + 1]
+            # gather all row ranges at once instead of looping over the terms
+            lengths = ends - starts
+            positions = np.repeat(starts - np.cumsum(np.concatenate([[0], lengths[:-1]])), lengths)
+            positions += np.arange(lengths.sum())
+            mask[self.term_rows[positions]] = True
+        return mask
+
+
+def get_search_index(snapshot):
+    """The search index of a snapshot, built on first use and shared by all sessions."""
+    return snapshot.cached("search", SearchIndex.build)
@@ -0,0 +1,274 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import ValueIndex, file_signature
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SIMILAR_FILE = ROOT_DIR / "data" / "processed" / "similar_index.npz"
+
+# Columns used as features, with the weight of their features relative to each other
+FEATURES = {
+    "genres": 1.0, "main_country": 0.5, "main_language": 0.5,
+    "directors": 1.0, "screenwriters": 0.7, "cinematographers": 0.5, "actors": 0.5,
+}
+
+# Number of features stored as a dense matrix: features shared by many films are cheaper in a
+# matrix product, rare features (most people) as postings that only touch the films they share
+DENSE_FEATURES = 512
+
+# Number of neighbours stored per film
+TOP_K = 10
+
+# Maximum number of similarity scores held in memory at once (block rows x films)
+BLOCK_CELLS = 10_000_000
+
+# -----------------------------
+# Features
+# -----------------------------
+
+def _feature_entries(df, indexes=None):
+    """
+    TF-IDF weights of the binary features of all `FEATURES` columns, as aligned arrays (row, feature, weight).
+    `indexes` are existing `ValueIndex` per column (e.g. from `prepare_sharded`), used instead of `df` columns.
+    """
+    rows, features, weights = [], [], []
+    n, n_features = len(df), 0
+    indexes = indexes or {}
+    for column, column_weight in FEATURES.items():
+        if column in indexes:
+            index = indexes[column]
+        elif column in df.columns:
+            sep = None if column in ("main_country", "main_language") else ", "
+            index = ValueIndex.from_series(df[column], sep=sep)
+        else:
+            continue
+        doc_freq = np.bincount(index.codes, minlength=len(index.labels))
+        idf = np.log((1 + n) / (1 + doc_freq)) + 1  # smoothed, so every feature counts a bit
+        rows.append(index.rows)
+        features.append(index.codes.astype(np.int64) + n_features)
+        weights.append(column_weight * idf[index.codes])
+        n_features += len(index.labels)
+
+    if not rows:
+        return np.array([], dtype=np.int32), np.array([], dtype=np.int64), np.array([]), 0
+    return np.concatenate(rows), np.concatenate(features), np.concatenate(weights), n_features
+
+
+def build_features(df, n_dense=DENSE_FEATURES, indexes=None):
+    """
+    Feature vectors of all films, normalized to unit length.
+
+    The `n_dense` most frequent features go into a dense matrix, the others stay sparse entries.
+
+    Returns:
+        tuple: (dense matrix n x d, sparse entries as (rows, features, weights))
+    """
+    n = len(df)
+    rows, feats, weights, n_features = _feature_entries(df, indexes)
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n))
+    norms[norms == 0] = 1
+    weights = (weights / norms[rows]).astype(np.float32)
+
+    doc_freq = np.bincount(feats, minlength=n_features)
+    frequent = np.argsort(-doc_freq, kind="stable")[:n_dense]
+    dense_column = np.full(n_features, -1, dtype=np.int64)
+    dense_column[frequent] = np.arange(len(frequent))
+
+    is_dense = dense_column[feats] >= 0
+    dense = np.zeros((n, len(frequent)), dtype=np.float32)
+    dense[rows[is_dense], dense_column[feats[is_dense]]] = weights[is_dense]
+    return dense, (rows[~is_dense], feats[~is_dense], weights[~is_dense])
+
+# -----------------------------
+# Neighbour search
+# -----------------------------
+
+def _csr(keys, n_keys, *values):
+    """Sort `values` by `keys` and return (offsets, sorted values...)."""
+    order = np.argsort(keys, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=n_keys))])
+    return (offsets,) + tuple(v[order] for v in values)
+
+
+def _expand(offsets, starts_of):
+    """Positions of all CSR entries of the keys `starts_of`, and the index of their key."""
+    lengths = offsets[starts_of + 1] - offsets[starts_of]
+    owner = np.repeat(np.arange(len(starts_of)), lengths)
+    first = np.repeat(offsets[starts_of] - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return first + np.arange(lengths.sum()), owner
+
+
+def _top_neighbours(arrays, start, stop, k, block_cells=BLOCK_CELLS, verbose=False):
+    """
+    Neighbours and scores of the films at rows `start` to `stop`, from the feature arrays of
+    `build_similar_index`. The similarity matrix is computed in blocks of rows so memory stays bounded.
+    """
+    dense, row_offsets, row_feats, row_weights = (arrays[name] for name in ("dense", "row_offsets", "row_feats",
+                                                                            "row_weights"))
+    feat_offsets, feat_rows, feat_weights = (arrays[name] for name in ("feat_offsets", "feat_rows", "feat_weights"))
+    n = len(dense)
+    neighbours = np.full((stop - start, k), -1, dtype=np.int32)
+    scores = np.zeros((stop - start, k), dtype=np.float16)
+    block = max(1, block_cells // max(n, 1))
+    report_every = max(1, (stop - start) // 10)  # rows between progress lines, about every tenth
+    next_report = start + report_every
+
+    for first in range(start, stop, block):
+        last = min(first + block, stop)
+        sims = dense[first:last] @ dense.T
+
+        # sparse part: for every (film in block, person) entry, add to all films of that person
+        entries, _ = _expand(row_offsets, np.arange(first, last))
+        entry_rows = np.repeat(np.arange(first, last), np.diff(row_offsets[first:last + 1])) - first
+        postings, owner = _expand(feat_offsets, row_feats[entries])
+        if len(postings):
+            flat = entry_rows[owner].astype(np.int64) * n + feat_rows[postings]
+            values = row_weights[entries][owner] * feat_weights[postings]
+            sims += np.bincount(flat, weights=values, minlength=(last - first) * n).reshape(last - first, n)
+
+        sims[np.arange(last - first), np.arange(first, last)] = -1  # a film is not its own neighbour
+        if k:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(sims, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+            neighbours[first - start:last - start] = np.where(top_scores > 0, top, -1)
+            scores[first - start:last - start] = np.clip(top_scores, 0, None)
+
+        if verbose and (last >= next_report or last == stop):
+            print(f"Similar films: {last}/{n}")
+            next_report = last + report_every
+    return neighbours, scores
+
+
+def _top_neighbours_of_files(folder, start, stop, k, block_cells):
+    """`_top_neighbours` on the arrays stored in `folder`, memory-mapped. Runs in a worker process."""
+    arrays = {path.stem: np.load(path, mmap_mode="r") for path in Path(folder).glob("*.npy")}
+    return _top_neighbours(arrays, start, stop, k, block_cells)
+
+
+def build_similar_index(df, k=TOP_K, block_cells=BLOCK_CELLS, verbose=False, workers=1, indexes=None):
+    """
+    Precompute the `k` most similar films of every film (cosine similarity of the features).
+
+    The similarity matrix is computed in blocks of rows so memory stays bounded:
+    the dense part is a matrix product, the sparse part adds the scores of every
+    pair of films sharing a person through the feature postings. With `workers` > 1
+    ranges of rows are scored by a pool of processes, which map the feature arrays
+    from a temporary folder instead of each receiving a copy.
+
+    Args:
+        indexes (dict, optional): Existing `ValueIndex` per column, used instead of the `df` columns.
+
+    Returns:
+        SimilarIndex
+    """
+    n = len(df)
+    dense, (s_rows, s_feats, s_weights) = build_features(df, indexes=indexes)
+    n_sparse = int(s_feats.max()) + 1 if len(s_feats) else 0
+
+    # films per person (feature -> rows) and people per film (row -> features)
+    feat_offsets, feat_rows, feat_weights = _csr(s_feats, n_sparse, s_rows, s_weights)
+    row_offsets, row_feats, row_weights = _csr(s_rows, n, s_feats, s_weights)
+    arrays = {"dense": dense, "feat_offsets": feat_offsets, "feat_rows": feat_rows, "feat_weights": feat_weights,
+              "row_offsets": row_offsets, "row_feats": row_feats, "row_weights": row_weights}
+    k = min(k, max(n - 1, 0))
+
+    if workers <= 1 or n < 2:
+        neighbours, scores = _top_neighbours(arrays, 0, n, k, block_cells, verbose)
+    else:
+        folder = tempfile.mkdtemp(prefix="similar.")
+        try:
+            for name, array in arrays.items():
+                np.save(Path(folder) / f"{name}.npy", array)
+            # several ranges per worker, so a worker that finishes early takes another one
+            bounds = np.linspace(0, n, min(n, workers * 4) + 1).astype(int)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_top_neighbours_of_files, folder, start, stop, k, block_cells)
+                           for start, stop in zip(bounds[:-1], bounds[1:])]
+                results = []
+                for future, stop in zip(futures, bounds[1:]):
+                    results.append(future.result())
+                    if verbose:
+                        print(f"Similar films: {stop}/{n}")
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        neighbours = np.concatenate([top for top, _ in results])
+        scores = np.concatenate([top_scores for _, top_scores in results])
+
+    tmdb_ids = df["tmdb_id"].to_numpy() if "tmdb_id" in df.columns else np.arange(n)
+    return SimilarIndex(tmdb_ids, neighbours, scores)
+
+
+class SimilarIndex:
+    """Precomputed neighbours: row -> `k` most similar rows (-1 if fewer) and their scores."""
+
+    def __init__(self, tmdb_ids, neighbours, scores):
+        self.tmdb_ids = tmdb_ids
+        self.neighbours = neighbours
+        self.scores = scores
+
+    def similar_rows(self, row):
+        """Rows and scores of the films most similar to the film at `row`, best first."""
+        keep = self.neighbours[row] >= 0
+        return self.neighbours[row][keep], self.scores[row][keep].astype(np.float32)
+
+    def save(self, path=SIMILAR_FILE):
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, tmdb_ids=self.tmdb_ids, neighbours=self.neighbours, scores=self.scores)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, tmdb_ids, path=SIMILAR_FILE):
+        """Read a stored index, or None if missing or built for different films."""
+        if not Path(path).exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if not np.array_equal(data["tmdb_ids"], np.asarray(tmdb_ids)):
+                return None
+            return cls(data["tmdb_ids"], data["neighbours"], data["scores"])
+
+
+def similar_index_state(tmdb_ids, path=SIMILAR_FILE):
+    """"missing" if no similar films index was built, "stale" if it was built for other films, else "current"."""
+    if not Path(path).exists():
+        return "missing"
+    with np.load(path, allow_pickle=False) as data:
+        return "current" if np.array_equal(data["tmdb_ids"], np.asarray(tmdb_ids)) else "stale"
+
+
+def get_similar_index(snapshot):
+    """The stored similar films index of a snapshot, or None if it was not built for its films."""
+    def load(snapshot):
+        if "tmdb_id" not in snapshot.df.columns:
+            return None
+        return SimilarIndex.load(snapshot.df["tmdb_id"].to_numpy())
+
+    # without one (or a published one), look again whenever the file changed: a background
+    # refresh rebuilds the index after the films changed, without a new snapshot
+    return (snapshot.cached("similar", load)
+            or snapshot.cached(f"similar {file_signature(SIMILAR_FILE)}", load))
+
+
+def similar_films(snapshot, row, columns=("title", "year", "directors", "genres")):
+    """Frame of the films most similar to the film at `row`, with a Similarity column."""
+    index = get_similar_index(snapshot)
+    if index is None:
+        return None
+    rows, scores = index.similar_rows(row)
+    result = snapshot.frame(columns).iloc[rows].reset_index(drop=True)
+    result["Similarity"] = pd.Series(scores).round(2)
+    return result
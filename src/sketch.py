@@ -0,0 +1,182 @@
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Constants
+# -----------------------------
+# Default sketch size: estimates are at most EPSILON * total too high, with probability 1 - DELTA
+EPSILON = 0.0005
+DELTA = 0.001
+
+# Number of candidate heavy hitters tracked next to the sketch
+CAPACITY = 1000
+
+# Rows of the CSV read at once
+CHUNKSIZE = 200_000
+
+# -----------------------------
+# Count-Min sketch
+# -----------------------------
+
+class CountMinSketch:
+    """
+    Count-Min sketch: approximate counts of strings in `depth` x `width` counters.
+
+    Estimates never undercount. They overcount by at most `epsilon * total` with
+    probability `1 - delta`, where epsilon = e / width and delta = exp(-depth).
+    Sketches with the same width, depth and seed can be merged by adding their counters,
+    so chunks and worker processes can each fill their own sketch.
+    """
+
+    def __init__(self, width=2 ** 14, depth=7, seed=0):
+        if width & (width - 1):
+            raise ValueError("width must be a power of two")
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.total = 0
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+        # multiply-shift hashing: one odd multiplier and offset per row
+        rng = np.random.default_rng(seed)
+        self._mult = rng.integers(1, 2 ** 63, size=depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._add = rng.integers(0, 2 ** 63, size=depth, dtype=np.uint64)
+        self._shift = np.uint64(64 - int(math.log2(width)))
+
+    @classmethod
+    def from_error(cls, epsilon=EPSILON, delta=DELTA, seed=0):
+        """Smallest sketch with the given error bounds."""
+        width = 2 ** math.ceil(math.log2(math.e / epsilon))
+        depth = math.ceil(math.log(1 / delta))
+        return cls(width=width, depth=depth, seed=seed)
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    def _buckets(self, keys):
+        hashes = pd.util.hash_array(np.asarray(keys, dtype=object))
+        return ((self._mult[:, None] * hashes[None, :] + self._add[:, None]) >> self._shift).astype(np.int64)
+
+    def update(self, keys, counts=None):
+        """Add `counts` (default 1 each) for the strings `keys`."""
+        if len(keys) == 0:
+            return
+        counts = np.ones(len(keys), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        for row, buckets in enumerate(self._buckets(keys)):
+            self.table[row] += np.bincount(buckets, weights=counts, minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+
+    def estimate(self, keys):
+        """Estimated counts of the strings `keys` (never lower than the true counts)."""
+        if len(keys) == 0:
+            return np.array([], dtype=np.int64)
+        buckets = self._buckets(keys)
+        return self.table[np.arange(self.depth)[:, None], buckets].min(axis=0)
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same width, depth and seed."""
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("Only sketches with the same width, depth and seed can be merged")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+# -----------------------------
+# Heavy hitters
+# -----------------------------
+
+class HeavyHitters:
+    """
+    Bounded-memory top-k: a Count-Min sketch plus the `capacity` strings with the
+    highest estimates seen so far as candidates. Mergeable like the sketch itself.
+    """
+
+    def __init__(self, capacity=CAPACITY, epsilon=EPSILON, delta=DELTA, seed=0):
+        self.capacity = capacity
+        self.sketch = CountMinSketch.from_error(epsilon, delta, seed)
+        self.candidates = np.array([], dtype=object)
+
+    def update(self, values):
+        """Count a chunk of values (one per occurrence, e.g. an exploded people column)."""
+        chunk_counts = pd.Series(values).value_counts()
+        self.sketch.update(chunk_counts.index.to_numpy(dtype=object), chunk_counts.to_numpy())
+        self._keep_top(chunk_counts.index[:self.capacity].to_numpy(dtype=object))
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self._keep_top(other.candidates)
+        return self
+
+    def _keep_top(self, new_candidates):
+        candidates = pd.unique(np.concatenate([self.candidates, new_candidates]))
+        if len(candidates) > self.capacity:
+            estimates = self.sketch.estimate(candidates)
+            candidates = candidates[np.argpartition(-estimates, self.capacity - 1)[:self.capacity]]
+        self.candidates = np.asarray(candidates, dtype=object)
+
+    def top(self, n=10):
+        """The `n` candidates with the highest estimated counts, as a Series."""
+        estimates = pd.Series(self.sketch.estimate(self.candidates), index=self.candidates, name="count")
+        return estimates.sort_values(ascending=False, kind="stable").head(n)
+
+# -----------------------------
+# Streaming top-k of a people column
+# -----------------------------
+
+def _explode(series, sep=", "):
+    values = series.dropna().astype(str).str.split(sep).explode().str.strip()
+    return values[values != ""]
+
+
+def _sketch_chunk(args):
+    series, capacity, epsilon, delta = args
+    hitters = HeavyHitters(capacity, epsilon, delta)
+    hitters.update(_explode(series))
+    return hitters
+
+
+def stream_top_people(csv_path, column, top_n=10, exact=True, workers=1, chunksize=CHUNKSIZE,
+                      capacity=CAPACITY, epsilon=EPSILON, delta=DELTA):
+    """
+    Most frequent people of a comma-separated column of a (large) CSV, in bounded memory.
+
+    The first pass streams the column in chunks through mergeable heavy-hitter sketches,
+    optionally filled by `workers` processes (a few chunks in flight per worker). With `exact=True` a second pass recounts
+    only the candidates exactly, so the result is exact as long as the true top-n are
+    among the `capacity` candidates.
+
+    Returns:
+        pd.Series: count per person, largest first.
+    """
+    chunks = (chunk[column] for chunk in pd.read_csv(csv_path, usecols=[column], chunksize=chunksize))
+    tasks = ((series, capacity, epsilon, delta) for series in chunks)
+
+    hitters = HeavyHitters(capacity, epsilon, delta)
+    if workers > 1:
+        # at most 2 chunks per worker submitted at once (pool.map would read the whole file up front)
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for task in tasks:
+                if len(pending) >= 2 * workers:
+                    hitters.merge(pending.popleft().result())
+                pending.append(pool.submit(_sketch_chunk, task))
+            while pending:
+                hitters.merge(pending.popleft().result())
+    else:
+        for task in tasks:
+            hitters.merge(_sketch_chunk(task))
+
+    if not exact:
+        return hitters.top(top_n)
+
+    candidates = set(hitters.candidates)
+    counts = pd.Series(dtype="int64")
+    for chunk in pd.read_csv(csv_path, usecols=[column], chunksize=chunksize):
+        values = _explode(chunk[column])
+        counts = counts.add(values[values.isin(candidates)].value_counts(), fill_value=0)
+    return counts.astype("int64").sort_values(ascending=False, kind="stable").head(top_n).rename("count")
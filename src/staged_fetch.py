@@ -0,0 +1,230 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from src.config import CACHE_DIR
+from src.pipeline import append_csv
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Raw /movie/{id} responses, one <tmdb_id>.json per film, to rebuild the cache without fetching
+PAYLOAD_DIR = CACHE_DIR / "payloads"
+
+# Threads waiting on the network (or disk) for payloads; requests to TMDb are further
+# limited by the adaptive limiter of src/tmdb_api.py, which finds how many TMDb accepts
+IO_WORKERS = 32
+
+# Processes decoding payloads and extracting their fields
+PARSE_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+# Payloads parsed (and records appended) at once
+BATCH_SIZE = 200
+
+# Payloads waiting for a parser: the I/O workers block when it is full
+QUEUE_SIZE = 1000
+
+_DONE = object()
+
+# -----------------------------
+# Sources
+# -----------------------------
+
+def http_source(payload_dir=None):
+    """
+    Payload source fetching /movie/{id} from TMDb; `payload_dir` also stores every response,
+    so the cache can be rebuilt from disk later. Returns None for films TMDb does not have.
+    """
+    from requests.exceptions import HTTPError
+
+    from src.tmdb_api import fetch_movie_payload
+
+    def fetch(tmdb_id):
+        try:
+            payload = fetch_movie_payload(tmdb_id)
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+        if payload_dir is not None:
+            path = Path(payload_dir) / f"{tmdb_id}.json"
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(payload)
+            os.replace(tmp, path)
+        return payload
+    return fetch
+
+
+def disk_source(payload_dir=PAYLOAD_DIR):
+    """Payload source reading the responses stored by `http_source`."""
+    def read(tmdb_id):
+        path = Path(payload_dir) / f"{tmdb_id}.json"
+        return path.read_bytes() if path.exists() else None
+    return read
+
+
+def stored_payload_ids(payload_dir=PAYLOAD_DIR):
+    return sorted(int(path.stem) for path in Path(payload_dir).glob("*.json") if path.stem.isdigit())
+
+# -----------------------------
+# Parsing (runs in worker processes)
+# -----------------------------
+
+def _json_loads():
+    # orjson is optional: much faster on large credits lists, same result as json.loads
+    try:
+        import orjson
+        return orjson.loads
+    except ImportError:
+        import json
+        return json.loads
+
+
+def parse_payloads(batch):
+    """
+    Decode a batch of (tmdb_id, payload bytes) and extract their cache records.
+    Returns (records, tmdb_ids whose payload could not be parsed).
+    """
+    from src.tmdb_api import extract_movie_fields
+
+    loads = _json_loads()
+    records, failed = [], []
+    for tmdb_id, payload in batch:
+        try:
+            records.append(extract_movie_fields(loads(payload), tmdb_id=tmdb_id))
+        except Exception:
+            failed.append(tmdb_id)
+    return records, failed
+
+# -----------------------------
+# Pipeline
+# -----------------------------
+
+def run_staged(tmdb_ids, source, out_file, io_workers=IO_WORKERS, parse_workers=PARSE_WORKERS,
+               batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE, verbose=True):
+    """
+    Fetch (or read) the payloads of `tmdb_ids`, parse them and append the records to `out_file`.
+
+    Three stages with bounded buffers in between, so a slow stage slows down the ones
+    before it instead of filling the memory:
+      1. `io_workers` threads call `source(tmdb_id)` and put the payload bytes on a queue
+         of `queue_size` (they block when it is full),
+      2. batches of `batch_size` payloads are decoded and extracted in `parse_workers`
+         processes (at most two batches per process in flight),
+      3. one writer appends every parsed block to `out_file` with `append_csv`.
+
+    Returns:
+        dict: number of films written, not found, and failed (request or parse errors)
+    """
+    payloads = queue.Queue(maxsize=queue_size)
+    ids = iter(tmdb_ids)
+    ids_lock = threading.Lock()
+    stop = threading.Event()  # set when the writer fails: no more IDs are taken
+    summary = {"written": 0, "not_found": 0, "failed": 0}
+    counts_lock = threading.Lock()
+
+    def count(key, n=1):
+        with counts_lock:
+            summary[key] += n
+
+    # -- stage 1: I/O --
+    def io_worker():
+        while True:
+            with ids_lock:
+                tmdb_id = None if stop.is_set() else next(ids, None)
+            if tmdb_id is None:
+                return
+            try:
+                payload = source(tmdb_id)
+            except Exception as e:
+                count("failed")
+                if verbose:
+                    print(f"⚠️ TMDb ID {tmdb_id}: {e}")
+                continue
+            if payload is None:
+                count("not_found")
+            else:
+                payloads.put((tmdb_id, payload))  # blocks while the parsers are behind
+
+    io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="fetch")
+    io_futures = [io_pool.submit(io_worker) for _ in range(io_workers)]
+
+    def close_queue():
+        for future in io_futures:
+            future.result()
+        payloads.put(_DONE)
+    threading.Thread(target=close_queue, name="fetch-closer", daemon=True).start()
+
+    # -- stage 2: parse in processes --
+    in_flight = threading.BoundedSemaphore(2 * parse_workers)
+    parsed = queue.Queue()  # (future, batch size) in submission order, then _DONE
+    start = time.perf_counter()
+
+    try:
+        # spawn: the I/O threads are already running, and forking a process with threads is not safe
+        with ProcessPoolExecutor(max_workers=parse_workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as parse_pool:
+            def batcher():
+                batch = []
+                while True:
+                    item = payloads.get()
+                    if stop.is_set():
+                        return
+                    if item is not _DONE:
+                        batch.append(item)
+                    if batch and (len(batch) == batch_size or item is _DONE):
+                        in_flight.acquire()  # blocks while enough batches are being parsed
+                        try:
+                            future = parse_pool.submit(parse_payloads, batch)
+                        except RuntimeError:  # the pool was shut down after a write error
+                            return
+                        future.add_done_callback(lambda _: in_flight.release())
+                        parsed.put((future, len(batch)))
+                        batch = []
+                    if item is _DONE:
+                        parsed.put(_DONE)
+                        return
+            threading.Thread(target=batcher, name="parse-batcher", daemon=True).start()
+
+            # -- stage 3: write in this thread --
+            while True:
+                item = parsed.get()
+                if item is _DONE:
+                    break
+                _write(*item, out_file, count, verbose)
+                if verbose:
+                    done = sum(summary.values())
+                    print(f"💾 {done} films ({done / (time.perf_counter() - start):.0f}/s)")
+    finally:
+        # after a write error the I/O threads may be blocked on the full queue: stop them
+        # taking IDs and drain the queue until they returned, or the process would hang
+        stop.set()
+        while not all(future.done() for future in io_futures):
+            try:
+                while True:
+                    payloads.get_nowait()
+            except queue.Empty:
+                time.sleep(0.05)
+        io_pool.shutdown()
+    return summary
+
+
+def _write(future, batch_size, out_file, count, verbose):
+    try:
+        records, failed = future.result()
+    except Exception as e:
+        count("failed", batch_size)
+        if verbose:
+            print(f"⚠️ A batch of {batch_size} payloads could not be parsed: {e}")
+        return
+    if records:
+        append_csv(pd.DataFrame(records), out_file)
+        count("written", len(records))
+    if failed:
+        count("failed", len(failed))
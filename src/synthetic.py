@@ -0,0 +1,249 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Constants / Default paths
+# -----------------------------
+# Root folder
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SYNTHETIC_DIR = ROOT_DIR / "data" / "synthetic"
+
+# Named dataset sizes used by scripts/generate_data.py and scripts/benchmark.py
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+
+# Films generated at once. Every chunk has its own random generator, so the data only
+# depends on the number of films and the seed, not on how it is written.
+CHUNK_SIZE = 100_000
+
+# Columns of the TMDb metadata cache (data/cache/tmdb_data.csv), in order
+CACHE_COLUMNS = [
+    "tmdb_id", "title", "release_date", "actors", "directors", "screenwriters",
+    "cinematographers", "runtime", "genres", "spoken_languages", "production_countries",
+]
+
+# TMDb genres with the share of films that have them (films have 1 to 4 genres)
+GENRES = {
+    "Drama": 0.45, "Comedy": 0.27, "Thriller": 0.15, "Romance": 0.13, "Action": 0.12,
+    "Crime": 0.10, "Horror": 0.09, "Documentary": 0.08, "Adventure": 0.07, "Family": 0.05,
+    "Mystery": 0.05, "Fantasy": 0.05, "Science Fiction": 0.05, "Animation": 0.05,
+    "History": 0.04, "Music": 0.04, "War": 0.03, "TV Movie": 0.03, "Western": 0.02,
+}
+
+# Production countries with their share of films and main spoken language
+COUNTRIES = {
+    "United States of America": (0.40, "English"), "United Kingdom": (0.08, "English"),
+    "France": (0.08, "French"), "Japan": (0.05, "Japanese"), "Germany": (0.04, "German"),
+    "Italy": (0.04, "Italian"), "Canada": (0.03, "English"), "India": (0.03, "Hindi"),
+    "Spain": (0.025, "Spanish"), "South Korea": (0.02, "Korean"), "China": (0.02, "Mandarin"),
+    "Hong Kong": (0.015, "Cantonese"), "Soviet Union": (0.015, "Russian"), "Sweden": (0.012, "Swedish"),
+    "Mexico": (0.012, "Spanish"), "Brazil": (0.012, "Portuguese"), "Denmark": (0.01, "Danish"),
+    "Australia": (0.01, "English"), "Iran": (0.008, "Persian"), "Poland": (0.008, "Polish"),
+    "Belgium": (0.008, "French"), "Netherlands": (0.008, "Dutch"), "Argentina": (0.007, "Spanish"),
+    "Taiwan": (0.006, "Mandarin"), "Czech Republic": (0.006, "Czech"), "Norway": (0.005, "Norwegian"),
+    "Finland": (0.005, "Finnish"), "Turkey": (0.005, "Turkish"), "Greece": (0.004, "Greek"),
+    "Senegal": (0.002, "Wolof"),
+}
+
+# Name parts of synthetic people and titles (with accents, and some ", Jr." as in TMDb credits)
+FIRST_NAMES = [
+    "James", "Mary", "Jean", "Marie", "Hiroshi", "Yuki", "Hans", "Greta", "Giulia", "Marco",
+    "José", "Penélope", "Zoë", "Björn", "Søren", "Chloé", "Małgorzata", "Ingrid", "Raj", "Priya",
+    "Wei", "Mei", "Kim", "Ana", "Luis", "Olga", "Ivan", "Abbas", "Leila", "Kwame", "Aïssa",
+    "Emma", "Noah", "Liam", "Olivia", "Agnès", "François", "Jiří", "Renée", "Andrés",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Martin", "Dubois", "Tanaka", "Suzuki", "Müller", "Schmidt", "Rossi", "Bianchi",
+    "García", "Fernández", "Nielsen", "Andersson", "Kowalski", "Nowak", "Kapoor", "Sharma", "Wang", "Chen",
+    "Park", "Lee", "Silva", "Santos", "Ivanov", "Petrova", "Kiarostami", "Mensah", "Diop", "Brown",
+    "Varda", "Truffaut", "Forman", "Bergman", "Kurosawa", "Ozu", "Fellini", "Almodóvar", "Wong", "Jones",
+]
+TITLE_WORDS = [
+    "Night", "Summer", "Été", "Lost", "City", "River", "Shadow", "Love", "Last", "Red", "Silent",
+    "Garden", "Journey", "Mirror", "Stranger", "Winter", "Dream", "Blue", "House", "Return",
+    "Café", "Empire", "Wild", "Rain", "Moon", "Secret", "Island", "Fire", "Story", "Kingdom",
+]
+
+# -----------------------------
+# People
+# -----------------------------
+
+def person_names(n):
+    """`n` distinct synthetic names; the first ones are the most common combinations."""
+    n_first, n_last = len(FIRST_NAMES), len(LAST_NAMES)
+    names = []
+    for i in range(n):
+        name = f"{FIRST_NAMES[i % n_first]} {LAST_NAMES[(i // n_first) % n_last]}"
+        extra = i // (n_first * n_last)
+        if extra:
+            # middle initials make every further name unique: A., B., ..., AA., ...
+            initials = ""
+            while extra:
+                extra, letter = divmod(extra - 1, 26)
+                initials = chr(65 + letter) + initials
+            name = name.replace(" ", f" {initials}. ", 1)
+        if i % 997 == 5:
+            name += ", Jr."
+        names.append(name)
+    return np.array(names, dtype=object)
+
+
+class RolePool:
+    """People of one role, drawn with Zipf-like popularity: few people appear in many films."""
+
+    def __init__(self, size, offset, n_people, exponent=0.6):
+        weights = 1.0 / np.arange(1, size + 1) ** exponent
+        self.cdf = np.cumsum(weights) / weights.sum()
+        self.offset = offset
+        self.n_people = n_people
+
+    def draw(self, rng, size):
+        ranks = np.minimum(np.searchsorted(self.cdf, rng.random(size)), len(self.cdf) - 1)
+        return (ranks + self.offset) % self.n_people
+
+
+def _people_lists(rng, pool, counts, names):
+    """Comma-separated names per film with `counts` distinct people each (None for 0)."""
+    n = len(counts)
+    owner = np.repeat(np.arange(n, dtype=np.int64), counts)
+    people = pool.draw(rng, len(owner))
+    keys = np.sort(owner * pool.n_people + people)
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]  # drop people drawn twice for a film
+    return _join(keys // pool.n_people, names[keys % pool.n_people], n)
+
+
+def _join(owner, values, n):
+    """Join the string `values` of each owner row (sorted by owner) with ", "; None for rows without values."""
+    result = np.full(n, None, dtype=object)
+    if len(values) == 0:
+        return result
+    starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+    joined = np.add.reduceat(values + ", ", starts)
+    result[owner[starts]] = [s[:-2] for s in joined]
+    return result
+
+# -----------------------------
+# Films
+# -----------------------------
+
+class MovieGenerator:
+    """
+    Deterministic generator of synthetic films shaped like the TMDb metadata cache.
+
+    Cast sizes are log-normal (median around 12 actors), people follow a Zipf-like
+    popularity per role, genres and countries follow the skew of a real library,
+    spoken languages follow the production country, and about 1-5% of the values
+    of every optional column are missing.
+    """
+
+    def __init__(self, n, seed=0):
+        self.n = n
+        self.seed = seed
+        n_people = max(1000, int(n * 1.5))
+        self.names = person_names(n_people)
+        self.directors = RolePool(max(100, n // 3), 0, n_people, exponent=0.6)
+        self.writers = RolePool(max(100, n // 2), n_people // 10, n_people, exponent=0.6)
+        self.cinematographers = RolePool(max(50, n // 8), n_people // 2, n_people, exponent=0.7)
+        self.actors = RolePool(n_people, n_people // 5, n_people, exponent=0.6)
+
+        self.genres = np.array(list(GENRES), dtype=object)
+        self.genre_share = np.array(list(GENRES.values()))
+        self.countries = np.array(list(COUNTRIES), dtype=object)
+        country_share = np.array([share for share, _ in COUNTRIES.values()])
+        self.country_cdf = np.cumsum(country_share) / country_share.sum()
+        self.languages = np.array([language for _, language in COUNTRIES.values()], dtype=object)
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        """Yield the films as DataFrames of `chunk_size` rows (the last one may be shorter)."""
+        for start in range(0, self.n, CHUNK_SIZE):
+            chunk = self._chunk(start, min(start + CHUNK_SIZE, self.n))
+            for offset in range(0, len(chunk), chunk_size):
+                yield chunk.iloc[offset:offset + chunk_size].reset_index(drop=True)
+
+    def frame(self):
+        return pd.concat(list(self.chunks()), ignore_index=True)
+
+    def _chunk(self, start, stop):
+        rng = np.random.default_rng([self.seed, start // CHUNK_SIZE])
+        n = stop - start
+        rows = np.arange(start, stop, dtype=np.int64)
+
+        # release dates: more recent films are more common
+        year = np.clip(2025 - rng.exponential(22, n).astype(int), 1895, 2025)
+        month, day = rng.integers(1, 13, n), rng.integers(1, 29, n)
+        release_date = pd.Series([f"{y}-{m:02d}-{d:02d}" for y, m, d in zip(year, month, day)], dtype=object)
+        release_date[rng.random(n) < 0.01] = None
+
+        # title from two or three words, unique thanks to the number of some sequels
+        words = np.array(TITLE_WORDS, dtype=object)
+        title = words[rng.integers(0, len(words), n)] + " " + words[rng.integers(0, len(words), n)]
+        sequel = rng.random(n) < 0.1
+        title[sequel] = title[sequel] + " " + (rows[sequel] % 5 + 2).astype(str).astype(object)
+
+        runtime = np.clip(rng.normal(100, 22, n), 1, 400).round()
+        runtime[rng.random(n) < 0.02] = np.nan
+
+        # people: cast size log-normal, films without cast (animation, documentaries) are None
+        cast = np.clip(rng.lognormal(np.log(12), 0.8, n), 0, 150).astype(np.int64)
+        cast[rng.random(n) < 0.05] = 0
+        n_directors = 1 + (rng.random(n) < 0.1)
+        n_writers = rng.choice([0, 1, 2, 3], size=n, p=[0.05, 0.45, 0.35, 0.15])
+        n_cinematographers = (rng.random(n) > 0.04).astype(np.int64)
+
+        # genres: each genre with its share, at least one, a few films without any
+        has_genre = rng.random((n, len(self.genres))) < self.genre_share
+        has_genre[~has_genre.any(axis=1), 0] = True
+        has_genre[rng.random(n) < 0.02] = False
+        genre_rows, genre_cols = np.nonzero(has_genre)
+        genres = _join(genre_rows, self.genres[genre_cols], n)
+
+        # countries: 1 to 3, the first one decides the main spoken language
+        n_countries = rng.choice([1, 2, 3], size=n, p=[0.72, 0.2, 0.08])
+        owner = np.repeat(np.arange(n), n_countries)
+        country = np.searchsorted(self.country_cdf, rng.random(len(owner)))
+        first = np.r_[True, owner[1:] != owner[:-1]]
+        # drop countries drawn twice for a film, keeping the order (first occurrences)
+        keep = np.sort(np.unique(owner * len(self.countries) + country, return_index=True)[1])
+        production_countries = _join(owner[keep], self.countries[country[keep]], n)
+        production_countries[rng.random(n) < 0.01] = None
+
+        main_language = self.languages[country[first]]
+        english = (main_language != "English") & (rng.random(n) < 0.3)
+        spoken_languages = main_language.copy()
+        spoken_languages[english] = spoken_languages[english] + ", English"
+        spoken_languages[rng.random(n) < 0.02] = None
+
+        return pd.DataFrame({
+            "tmdb_id": rows * 3 + rng.integers(1, 4, n),
+            "title": title,
+            "release_date": release_date,
+            "actors": _people_lists(rng, self.actors, cast, self.names),
+            "directors": _people_lists(rng, self.directors, n_directors, self.names),
+            "screenwriters": _people_lists(rng, self.writers, n_writers, self.names),
+            "cinematographers": _people_lists(rng, self.cinematographers, n_cinematographers, self.names),
+            "runtime": runtime,
+            "genres": genres,
+            "spoken_languages": spoken_languages,
+            "production_countries": production_countries,
+        }, columns=CACHE_COLUMNS)
+
+
+def generate_movies(n, seed=0):
+    """DataFrame of `n` synthetic films shaped like the TMDb metadata cache."""
+    return MovieGenerator(n, seed).frame()
+
+
+def write_movies(path, n, seed=0, verbose=False):
+    """Write `n` synthetic films to a CSV like data/cache/tmdb_data.csv, chunk by chunk."""
+    generator = MovieGenerator(n, seed)
+    for i, chunk in enumerate(generator.chunks()):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        if verbose:
+            print(f"Generated {min((i + 1) * CHUNK_SIZE, n)}/{n} films")
+    return path
+
+
+def synthetic_file(size, seed=0):
+    """Path of the generated cache for a named size, e.g. data/synthetic/tmdb_data_100k_seed0.csv."""
+    return SYNTHETIC_DIR / f"tmdb_data_{size}_seed{seed}.csv"
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import deque
+
+from src import metrics
+
+# -----------------------------
+# Constants
+# -----------------------------
+# Requests in flight at the start, and the bounds of the window
+INITIAL_WINDOW = 4
+MIN_WINDOW = 1
+MAX_WINDOW = 32
+
+# Multiplicative decrease on 429, 5xx, timeouts and latency spikes
+BACKOFF_FACTOR = 0.5
+
+# A response slower than this multiple of the unloaded latency (and at least LATENCY_FLOOR) is a spike
+LATENCY_SPIKE = 3.0
+LATENCY_FLOOR = 0.25
+
+# The unloaded latency is the lowest one of the last 1-2 periods, so a slower network becomes the new normal
+BASE_LATENCY_PERIOD = 30.0
+
+# Pause after a 429 without Retry-After header, in seconds
+DEFAULT_RETRY_AFTER = 1.0
+
+# Decisions kept for logs and the summary of scripts
+HISTORY_SIZE = 200
+
+# -----------------------------
+# AIMD limiter
+# -----------------------------
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease limit of concurrent requests, like TCP congestion control.
+
+    `acquire` blocks while `window` requests are in flight (or during a pause asked by a 429);
+    `release` reports how the request went. Every healthy response of a full window adds
+    1 / window, so the window grows by one per window of successes, but only while callers
+    actually use all of it; a 429, a 5xx, a timeout or a latency spike
+    multiplies it by `backoff`, but only for requests sent after the last decrease, so one
+    burst of errors only counts once. Thread-safe.
+
+    Decisions are kept in `history`, passed to `on_decision` (e.g. print) and exported to `metrics`.
+    """
+
+    def __init__(self, initial=INITIAL_WINDOW, minimum=MIN_WINDOW, maximum=MAX_WINDOW, backoff=BACKOFF_FACTOR,
+                 latency_spike=LATENCY_SPIKE, on_decision=None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_spike = latency_spike
+        self.on_decision = on_decision
+        self.window = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self.latency = None  # moving average of healthy responses, in seconds
+        self._lowest = [None, None]  # lowest healthy latency of the previous and the current period
+        self._period_start = time.monotonic()
+        self.history = deque(maxlen=HISTORY_SIZE)  # (unix time, decision, window, reason)
+        self.decisions = {"increase": 0, "decrease": 0}
+        self._saturated = False  # were all slots in use since the last increase (or since idle)?
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        metrics.set_concurrency_window(int(self.window))
+
+    def set_maximum(self, maximum):
+        """Lower (or raise) the largest window, clamping the current window and the minimum to it."""
+        with self._cond:
+            self.maximum = max(1, maximum)
+            self.minimum = min(self.minimum, self.maximum)
+            self.window = min(self.window, float(self.maximum))
+            metrics.set_concurrency_window(int(self.window))
+            self._cond.notify_all()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.window):
+                    self.in_flight += 1
+                    self._saturated = self._saturated or self.in_flight >= int(self.window)
+                    return
+                self._cond.wait(timeout=pause if pause > 0 else None)
+
+    def release(self, seconds, status, retry_after=None):
+        """
+        Report a finished request: `status` is the HTTP status code, "timeout" / "connection",
+        or "error" for any other failure (neither healthy nor congestion: the window stays).
+        Returns the decision taken: "increase", "decrease" or None.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            decision = None
+            reason = None if status == "error" else self._congestion(seconds, status)
+            if status == "error":
+                pass
+            elif reason is None:
+                if isinstance(status, int) and status < 400:
+                    self._observe(seconds)
+                # while callers use fewer slots than allowed, a success says nothing about a larger window
+                if self._saturated:
+                    before = int(self.window)
+                    self.window = min(self.maximum, self.window + 1 / self.window)
+                    if int(self.window) > before:
+                        self._saturated = False  # grow again once the new window is used up
+                        decision = self._decide("increase", f"{int(self.window)} healthy responses")
+            else:
+                now = time.monotonic()
+                if reason == "throttled" or retry_after:
+                    self._paused_until = max(self._paused_until, now + (retry_after or DEFAULT_RETRY_AFTER))
+                # requests sent before the last decrease report the same congestion: count it once
+                if now - seconds >= self._last_decrease:
+                    self._last_decrease = now
+                    self.window = max(self.minimum, self.window * self.backoff)
+                    decision = self._decide("decrease", reason)
+            if self.in_flight == 0:
+                self._saturated = False
+            self._cond.notify_all()
+            return decision
+
+    @property
+    def base_latency(self):
+        """Latency without queueing: the lowest healthy one of the last 1-2 periods, or None."""
+        lowest = [seconds for seconds in self._lowest if seconds is not None]
+        return min(lowest) if lowest else None
+
+    def _observe(self, seconds):
+        self.latency = seconds if self.latency is None else 0.9 * self.latency + 0.1 * seconds
+        now = time.monotonic()
+        if now - self._period_start >= BASE_LATENCY_PERIOD:
+            self._lowest = [self._lowest[1], None]
+            self._period_start = now
+        self._lowest[1] = seconds if self._lowest[1] is None else min(self._lowest[1], seconds)
+
+    def _congestion(self, seconds, status):
+        if status == 429:
+            return "throttled"
+        if status in ("timeout", "connection"):
+            return status
+        if isinstance(status, int) and status >= 500:
+            return "server_error"
+        base = self.base_latency
+        if base is not None and seconds > max(self.latency_spike * base, LATENCY_FLOOR):
+            return "latency"
+        return None
+
+    def _decide(self, decision, reason):
+        self.history.append((time.time(), decision, int(self.window), reason))
+        self.decisions[decision] += 1
+        metrics.count_concurrency_decision(decision, reason if decision == "decrease" else "healthy")
+        metrics.set_concurrency_window(int(self.window))
+        if self.on_decision:
+            self.on_decision(decision, int(self.window), reason)
+        return decision
+
+    def summary(self):
+        with self._cond:
+            return {"window": int(self.window), "in_flight": self.in_flight,
+                    "latency_ms": None if self.latency is None else round(self.latency * 1000, 1),
+                    "increases": self.decisions["increase"], "decreases": self.decisions["decrease"]}
@@ -1,10 +1,26 @@
+import os
+import time
 import requests
 from requests.exceptions import ConnectionError, HTTPError, Timeout
 from pathlib import Path
-from src.config import TMDB_API_KEY
+from src import metrics
+from src.config import get_api_key
+from src.throttle import AdaptiveLimiter
 
-# TMDb constants
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+# TMDb constants; TMDB_API_BASE_URL points the requests somewhere else (e.g. scripts/stub_tmdb.py)
+TMDB_BASE_URL = os.getenv("TMDB_API_BASE_URL", "https://api.themoviedb.org/3").rstrip("/")
+
+# Times a request is sent again after a 429 or 503 (once the limiter's pause is over)
+MAX_RETRIES = 3
+
+# Concurrent requests of this process, adapted to how TMDb responds (see src/throttle.py)
+limiter = AdaptiveLimiter()
+
+# Fields of the records returned by search_movie, i.e. the columns of tmdb_data.csv
+CACHE_COLUMNS = [
+    "tmdb_id", "title", "release_date", "actors", "directors", "screenwriters", "cinematographers",
+    "runtime", "genres", "spoken_languages", "production_countries", "poster_path", "backdrop_path",
+]
 
 # caching folder
 ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -12,7 +28,121 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 # -----------------------------
 # Functions
 # -----------------------------
-def search_movie(title=None, year=None, tmdb_id=None):
+def _get(url, params, endpoint):
+    """
+    GET a TMDb endpoint and raise for bad status codes, recording the request in `metrics`.
+    Requests wait for a slot of `limiter`; a 429 or 503 is sent again up to MAX_RETRIES times.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        start = time.perf_counter()
+        outcome, retry_after = "error", None  # e.g. TooManyRedirects, or not a requests error
+        try:
+            r = requests.get(url, params=params, timeout=5)
+            outcome, retry_after = r.status_code, _retry_after(r)
+        except Timeout:
+            outcome = "timeout"
+            raise
+        except ConnectionError:
+            outcome = "connection"
+            raise
+        finally:
+            # the slot is given back whatever happened, or the limiter would block for good
+            elapsed = time.perf_counter() - start
+            limiter.release(elapsed, outcome, retry_after=retry_after)
+            metrics.observe_request(endpoint, elapsed, outcome)
+        if r.status_code not in (429, 503) or attempt == MAX_RETRIES:
+            break
+        metrics.count_retry("throttled" if r.status_code == 429 else "unavailable")
+    r.raise_for_status()  # Raises HTTPError for bad status codes
+    return r
+
+
+def _retry_after(r):
+    """Seconds asked by a Retry-After header, or None."""
+    try:
+        return float(r.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_movie_fields(details, tmdb_id=None):
+    """
+    The cache record of a movie from its /movie/{id}?append_to_response=credits response
+    (decoded JSON). Pure function, so stored payloads can be parsed in worker processes
+    (see src/staged_fetch.py).
+    """
+    # Extract actor(s) from credits
+    actors = None
+    if "credits" in details and "cast" in details["credits"]:
+        acting_credits = details["credits"]
+        cast = [c["name"] for c in acting_credits.get("cast", []) if c.get("name")]
+        if cast:
+            actors = ", ".join(filter(None, cast))  # filter out any None values
+
+    # Extract director(s) from credits
+    director = None
+    if "credits" in details and "crew" in details["credits"]:
+        directors = [c["name"] for c in details["credits"]["crew"] if c.get("job") == "Director"]
+        if directors:
+            director = ", ".join(filter(None, directors))  # filter out any None values
+
+    # Extract screenwriters from credits
+    writer_jobs = {"Writer", "Screenplay", "Story", "Novel", "Adaptation"}
+    writer = None
+    if "credits" in details and "crew" in details["credits"]:
+        writers = [c["name"] for c in details["credits"]["crew"] if c.get("job") in writer_jobs]
+        writers = list(dict.fromkeys(writers)) # remove duplicates
+        if writers:
+            writer = ", ".join(filter(None, writers))  # filter out any None values
+
+    # Extract cinematographers from credits
+    cinematographer_jobs = {"Director of Photography", "Cinematography"}
+    cinematographer = None
+    if "credits" in details and "crew" in details["credits"]:
+        cinematographers = [c["name"] for c in details["credits"]["crew"] if c.get("job") in cinematographer_jobs]
+        if cinematographers:
+            cinematographer = ", ".join(filter(None, cinematographers))  # filter out any None values
+
+    # Extract runtime
+    runtime = details.get("runtime")
+
+    # Extract genres as a comma-separated string
+    genres_list = details.get("genres")
+    genres = ", ".join(filter(None, [g.get("name") for g in genres_list])) if genres_list else None
+
+    # Extract spoken languages as a comma-separated string
+    spoken = details.get("spoken_languages")
+    if spoken:
+        spoken_languages = ", ".join(
+            l.get("english_name") for l in spoken if l.get("english_name")
+        )
+    else:
+        spoken_languages = None
+
+    # Extract production countries
+    countries = details.get("production_countries")
+    production_countries = ", ".join(filter(None, [c.get("name") for c in countries])) if countries else None
+
+    # Return the final dictionary
+    return {
+        "tmdb_id": details.get("id") if tmdb_id is None else tmdb_id,
+        "title": details.get("title"),
+        "release_date": details.get("release_date"),
+        "actors": actors,
+        "directors": director,
+        "screenwriters": writer,
+        "cinematographers": cinematographer,
+        "runtime": runtime,
+        "genres": genres,
+        "spoken_languages": spoken_languages,
+        "production_countries": production_countries,
+        "poster_path": details.get("poster_path"),      # image paths, see src/posters.py
+        "backdrop_path": details.get("backdrop_path"),
+    }
+
+
+def search_movie(title=None, year=None, tmdb_id=None, raise_errors=False):
     """
     Search TMDb for a movie by title (and optionally year) OR fetch directly by TMDB ID.
     Returns the first match as a dict, or None if not found or an error occurs.
@@ -21,12 +151,16 @@ def search_movie(title=None, year=None, tmdb_id=None):
         title (str, optional): Movie title (used if tmdb_id is not given)
         year (int, optional): Release year (used if tmdb_id is not given)
         tmdb_id (int, optional): TMDb movie ID (skips title/year search if provided)
+        raise_errors (bool): Raise request errors instead of returning None, so callers can
+            tell "not found" from "try again later"
 
     Notes:
         - the first API call (/search/movie) only returns basic info: id, title, release date.
         It does NOT include runtime, genres, spoken_languages, or credits (director, cast, crew).
         - Therefore, I make a second API call to /movie/{id} with append_to_response=credits to get these extra details.
     """
+    api_key = get_api_key()  # raises ValueError if missing, instead of failing every film
+
     try:
         # If tmdb_id is provided, skip search and go straight to details
         if tmdb_id is not None:
@@ -36,27 +170,27 @@ def search_movie(title=None, year=None, tmdb_id=None):
             # Otherwise, perform search as before
             url = f"{TMDB_BASE_URL}/search/movie"
             params = {
-                "api_key": TMDB_API_KEY,
+                "api_key": api_key,
                 "query": title,
             }
             if year:
                 params["year"] = year
 
             # First API call, search for movie by title and year
-            r = requests.get(url, params=params, timeout=5)
-            r.raise_for_status()  # Raises HTTPError for bad status codes
+            r = _get(url, params, endpoint="search")
             results = r.json().get("results")
 
             # Retry without year if nothing was found
             if not results and year:
                 print(f"Retrying without year for '{title}'...")
+                metrics.count_retry("without_year")
                 params.pop("year")
-                r = requests.get(url, params=params, timeout=5)
-                r.raise_for_status()
+                r = _get(url, params, endpoint="search")
                 results = r.json().get("results")
 
             if not results:
                 print(f"⚠️ Movie not found: '{title}' (year={year})")
+                metrics.count_error("not_found")
                 return None
 
             movie_id = results[0]["id"]
@@ -64,92 +198,73 @@ def search_movie(title=None, year=None, tmdb_id=None):
         # Second API call: get detailed info including runtime, genres, spoken languages, and director
         details_url = f"{TMDB_BASE_URL}/movie/{movie_id}"
         details_params = {
-            "api_key": TMDB_API_KEY,
+            "api_key": api_key,
             "append_to_response": "credits"  # needed for director info
         }
-        r_details = requests.get(details_url, params=details_params, timeout=5)
-        r_details.raise_for_status()
+        r_details = _get(details_url, details_params, endpoint="details")
         details = r_details.json()
 
-        # Extract actor(s) from credits
-        actors = None
-        if "credits" in details and "cast" in details["credits"]:
-            acting_credits = details["credits"]
-            cast = [c["name"] for c in acting_credits.get("cast", []) if c.get("name")]
-            if cast:
-                actors = ", ".join(filter(None, cast))  # filter out any None values
-
-        # Extract director(s) from credits
-        director = None
-        if "credits" in details and "crew" in details["credits"]:
-            directors = [c["name"] for c in details["credits"]["crew"] if c.get("job") == "Director"]
-            if directors:
-                director = ", ".join(filter(None, directors))  # filter out any None values
-
-        # Extract screenwriters from credits
-        writer_jobs = {"Writer", "Screenplay", "Story", "Novel", "Adaptation"}
-        writer = None
-        if "credits" in details and "crew" in details["credits"]:
-            writers = [c["name"] for c in details["credits"]["crew"] if c.get("job") in writer_jobs]
-            writers = list(dict.fromkeys(writers)) # remove duplicates
-            if writers:
-                writer = ", ".join(filter(None, writers))  # filter out any None values
-
-        # Extract cinematographers from credits
-        cinematographer_jobs = {"Director of Photography", "Cinematography"}
-        cinematographer = None
-        if "credits" in details and "crew" in details["credits"]:
-            cinematographers = [c["name"] for c in details["credits"]["crew"] if c.get("job") in cinematographer_jobs]
-            if cinematographers:
-                cinematographer = ", ".join(filter(None, cinematographers))  # filter out any None values
-
-        # Extract runtime
-        runtime = details.get("runtime")
-
-        # Extract genres as a comma-separated string
-        genres_list = details.get("genres")
-        genres = ", ".join(filter(None, [g.get("name") for g in genres_list])) if genres_list else None
-
-        # Extract spoken languages as a comma-separated string
-        spoken = details.get("spoken_languages")
-        if spoken:
-            spoken_languages = ", ".join(
-                l.get("english_name") for l in spoken if l.get("english_name")
-            )
-        else:
-            spoken_languages = None
-
-        # Extract production countries
-        countries = details.get("production_countries")
-        production_countries = ", ".join(filter(None, [c.get("name") for c in countries])) if countries else None
-
-        # Return the final dictionary
-        return {
-            "tmdb_id": movie_id,
-            "title": details.get("title"),
-            "release_date": details.get("release_date"),
-            "actors": actors,
-            "directors": director,
-            "screenwriters": writer,
-            "cinematographers": cinematographer,
-            "runtime": runtime,
-            "genres": genres,
-            "spoken_languages": spoken_languages,
-            "production_countries": production_countries,
-        }
+        return extract_movie_fields(details, tmdb_id=movie_id)
 
     except ConnectionError as conn_err:
         print(f"Connection Error for '{title}': {conn_err}")
+        metrics.count_error("connection")
+        if raise_errors:
+            raise
     except HTTPError as http_err:
         print(f"HTTP Error for '{title}': {http_err}")
+        not_found = http_err.response is not None and http_err.response.status_code == 404
+        metrics.count_error("not_found" if not_found else "http")
+        if raise_errors and not not_found:
+            raise
     except Timeout as timeout_err:
         print(f"Timeout Error for '{title}': {timeout_err}")
+        metrics.count_error("timeout")
+        if raise_errors:
+            raise
     except Exception as e:
         print(f"Unexpected error for '{title}': {e}")
+        metrics.count_error("unexpected")
+        if raise_errors:
+            raise
 
     # Return None if any error occurs or no results found
     return None
 
+def fetch_movie_payload(tmdb_id):
+    """
+    The raw /movie/{id}?append_to_response=credits response (bytes) that `extract_movie_fields`
+    turns into a cache record. Raises on request errors (HTTPError 404: no such movie).
+    """
+    url = f"{TMDB_BASE_URL}/movie/{tmdb_id}"
+    r = _get(url, {"api_key": get_api_key(), "append_to_response": "credits"}, endpoint="details")
+    return r.content
+
+def find_by_imdb_id(imdb_id):
+    """
+    Look up the TMDb ID of a movie by its IMDb ID (e.g. "tt0062622") with the /find endpoint.
+    Returns the TMDb ID, None if TMDb has no movie for it, and raises on request errors
+    (so callers can retry later instead of remembering a failed lookup as "not found").
+    """
+    api_key = get_api_key()
+    url = f"{TMDB_BASE_URL}/find/{imdb_id}"
+    r = _get(url, {"api_key": api_key, "external_source": "imdb_id"}, endpoint="find")
+    results = r.json().get("movie_results")
+    if not results:
+        metrics.count_error("not_found")
+        return None
+    return results[0]["id"]
+
+def get_image_paths(tmdb_id):
+    """
+    Poster and backdrop paths of a movie (for films cached before search_movie kept them).
+    Returns a dict with poster_path and backdrop_path (None if TMDb has no image), raises on request errors.
+    """
+    api_key = get_api_key()
+    r = _get(f"{TMDB_BASE_URL}/movie/{tmdb_id}", {"api_key": api_key}, endpoint="images")
+    details = r.json()
+    return {"poster_path": details.get("poster_path"), "backdrop_path": details.get("backdrop_path")}
+
 # -----------------------------
 # Quick test / run code
 # -----------------------------
@@ -161,3 +276,6 @@ if __name__ == "__main__":
     # search movie with tmdb id
     print(search_movie(tmdb_id=11104))
 
+    # find tmdb id by imdb id
+    print(find_by_imdb_id("tt0109424"))
+
@@ -1,7 +1,7 @@
 # -- TMDB EXPLORE --
 # helper functions to explore the tmdb API
 import requests
-from src.config import TMDB_API_KEY
+from src.config import get_api_key
 from pathlib import Path
 
 # TMDb constants
@@ -16,7 +16,7 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 def search_movies_raw(title, year=None):
     url = f"{TMDB_BASE_URL}/search/movie"
     params = {
-        "api_key": TMDB_API_KEY,
+        "api_key": get_api_key(),
         "query": title,
     }
     if year:
@@ -29,7 +29,7 @@ def search_movies_raw(title, year=None):
     return results
 
 def get_movie_details_raw(movie_id, append_credits=True):
-    params = {"api_key": TMDB_API_KEY}
+    params = {"api_key": get_api_key()}
     if append_credits:
         params['append_to_response'] = 'credits'
     details_url = f"{TMDB_BASE_URL}/movie/{movie_id}"
@@ -39,7 +39,7 @@ def get_movie_details_raw(movie_id, append_credits=True):
     return details
 
 def get_credits_raw(movie_id):
-    params = {"api_key": TMDB_API_KEY}
+    params = {"api_key": get_api_key()}
     credits_url = f"{TMDB_BASE_URL}/movie/{movie_id}/credits"
     r = requests.get(credits_url, params=params, timeout=5)
     r.raise_for_status()